@@ -0,0 +1,67 @@
+import os
+import shutil
+import time
+import uuid
+
+# Versioned artifact directories for files that are memory-mapped while serving
+# (compiled forest arrays, fare surface tables). A published file is never written
+# again: every save goes into a new version directory, and a small CURRENT file
+# naming it is swapped in with os.replace. Processes that mapped an earlier version
+# keep reading its unchanged files until they reload.
+#
+#   ml/model_arrays/CURRENT                          "20261018T101500-3f2a9c1e"
+#   ml/model_arrays/20261018T101500-3f2a9c1e/        manifest.json, *.npy
+#
+# Directories written before versioning (manifest.json directly inside) still load.
+
+POINTER = "CURRENT"
+
+
+def resolve(directory: str):
+    """Directory holding the current version, or None if nothing was published there."""
+    try:
+        with open(os.path.join(directory, POINTER), "r") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        if os.path.exists(os.path.join(directory, "manifest.json")):
+            return directory
+        return None
+    return os.path.join(directory, name)
+
+
+def publish(directory: str, write, keep: int = 2) -> str:
+    """
+    Have write(path) fill a new, empty directory, then make it the current version.
+
+    Returns the version directory. Versions beyond the newest `keep` are deleted;
+    on POSIX, processes still mapping one keep their pages after the unlink.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    staging = os.path.join(directory, f".{name}.tmp")
+    os.makedirs(staging)
+    try:
+        write(staging)
+        os.rename(staging, os.path.join(directory, name))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    pointer = os.path.join(directory, f".{POINTER}.{name}.tmp")
+    with open(pointer, "w") as f:
+        f.write(name + "\n")
+    os.replace(pointer, os.path.join(directory, POINTER))
+
+    _prune(directory, name, keep)
+    return os.path.join(directory, name)
+
+
+def _prune(directory: str, current: str, keep: int):
+    versions = []
+    for entry in os.scandir(directory):
+        if entry.is_dir() and not entry.name.startswith(".") and entry.name != current:
+            versions.append((entry.stat().st_mtime, entry.name))
+    versions.sort(reverse=True)
+    for _, name in versions[max(keep - 1, 0):]:
+        # Windows refuses to delete mapped files; those go on a later publish
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
@@ -0,0 +1,288 @@
+import json
+import os
+import numpy as np
+from app.core import artifact_store
+
+FORMAT_VERSION = 1
+ARRAY_NAMES = ("feature", "threshold", "children", "value", "roots")
+
+# Layout of the packed arrays (all trees concatenated, node ids are global):
+#   feature[n]          -> feature index tested at node n (0 for leaves)
+#   threshold[n]        -> float32 split threshold, rounded *down* from sklearn's float64
+#   children[2n], [2n+1] -> right / left child (leaves point back to themselves)
+#   value[n]            -> node output (mean target of the node's samples), float64
+#                          unless compacted to float32
+#   roots[t]            -> global id of tree t's root node
+#
+# Because leaves loop onto themselves, every row can be walked exactly `max_depth`
+# steps without any per-row branching: children[2 * node + (x <= threshold)].
+
+
+class CompiledForest:
+    """Flat-array, vectorized replacement for RandomForestRegressor.predict."""
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.value, self.roots))
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Pack the fitted trees of a single-output RandomForestRegressor."""
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        trees = [est.tree_ for est in model.estimators_]
+        counts = np.array([t.node_count for t in trees], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        total = int(counts.sum())
+        if total >= np.iinfo(np.int32).max // 2:
+            raise ValueError("Forest too large for int32 node ids")
+
+        feature = np.zeros(total, dtype=np.int16 if model.n_features_in_ < 2**15 else np.int32)
+        threshold = np.zeros(total, dtype=np.float32)
+        children = np.empty(2 * total, dtype=np.int32)
+        value = np.empty(total, dtype=np.float64)
+
+        for tree, offset in zip(trees, offsets):
+            n = tree.node_count
+            ids = np.arange(offset, offset + n, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            feature[ids] = np.where(is_leaf, 0, tree.feature)
+            threshold[ids] = np.where(is_leaf, 0.0, _round_down_to_float32(tree.threshold))
+            children[2 * ids] = np.where(is_leaf, ids, tree.children_right + offset)
+            children[2 * ids + 1] = np.where(is_leaf, ids, tree.children_left + offset)
+            value[ids] = tree.value[:, 0, 0]
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            children=children,
+            value=value,
+            roots=offsets.astype(np.int32),
+            max_depth=max(t.max_depth for t in trees),
+            n_features=model.n_features_in_,
+        )
+
+    def predict(self, X) -> np.ndarray:
+        """Average of all tree outputs; bit-for-bit sklearn's for full-precision forests."""
+        # sklearn evaluates trees on float32 input, so do the same
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        # Add tree by tree, in float64 even when the leaf values are stored as float32.
+        # That is the order sklearn accumulates in, and a running sum gives every row
+        # the same result in any batch (sum() switches to pairwise adds for one row).
+        return np.add.accumulate(self._leaves(X), axis=0, dtype=np.float64)[-1] / self.n_trees
+
+    def tree_predictions(self, X) -> np.ndarray:
+        """Per-tree outputs, shape (n_trees, n_samples)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return self._leaves(X).astype(np.float64)
+
+    def _leaves(self, X) -> np.ndarray:
+        rows = np.arange(X.shape[0])[None, :]
+        # One column per row, one row per tree: (n_trees, n_samples)
+        nodes = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_left]
+        return self.value[nodes]
+
+    # Compaction. Each method returns a new, smaller forest and leaves this one untouched.
+
+    def select_trees(self, indices):
+        """Forest made of the given trees, in the given order."""
+        return self._repack(indices, self.children)
+
+    def truncate(self, max_depth: int):
+        """
+        Depth-limited forest: nodes at `max_depth` become leaves. Internal nodes
+        already hold the mean target of their samples, so no refit is needed.
+        """
+        children = self.children.copy()
+        for root in self.roots:
+            for depth, level in enumerate(self._levels(root, self.children)):
+                if depth == max_depth:
+                    children[2 * level] = level
+                    children[2 * level + 1] = level
+                    break
+        return self._repack(range(self.n_trees), children)
+
+    def merge_leaves(self, tolerance: float):
+        """
+        Collapse every subtree whose leaf outputs all lie within `tolerance` of each
+        other into a single leaf, so no tree's output moves by more than `tolerance`.
+        """
+        ids = np.arange(self.n_nodes)
+        is_leaf = self.children[0::2] == ids
+        low = np.where(is_leaf, self.value, np.inf)
+        high = np.where(is_leaf, self.value, -np.inf)
+
+        # Bottom-up, deepest level first, so children are final before their parent
+        levels = []
+        for root in self.roots:
+            for depth, level in enumerate(self._levels(root, self.children)):
+                if depth == len(levels):
+                    levels.append([])
+                levels[depth].append(level)
+        for level in reversed(levels):
+            nodes = np.concatenate(level)
+            nodes = nodes[~is_leaf[nodes]]
+            right, left = self.children[2 * nodes], self.children[2 * nodes + 1]
+            low[nodes] = np.minimum(low[left], low[right])
+            high[nodes] = np.maximum(high[left], high[right])
+
+        mergeable = ~is_leaf & (high - low <= tolerance)
+        children = self.children.copy()
+        children[2 * ids[mergeable]] = ids[mergeable]
+        children[2 * ids[mergeable] + 1] = ids[mergeable]
+        return self._repack(range(self.n_trees), children)
+
+    def astype(self, value_dtype):
+        """Same forest with leaf values stored as `value_dtype` (e.g. np.float32)."""
+        return CompiledForest(
+            feature=self.feature,
+            threshold=self.threshold,
+            children=self.children,
+            value=self.value.astype(value_dtype),
+            roots=self.roots,
+            max_depth=self.max_depth,
+            n_features=self.n_features,
+        )
+
+    @staticmethod
+    def _levels(root, children):
+        """Node ids of one tree, level by level from the root."""
+        level = np.array([root], dtype=np.int64)
+        while len(level):
+            yield level
+            internal = level[children[2 * level] != level]
+            level = np.concatenate((children[2 * internal + 1], children[2 * internal])).astype(np.int64)
+
+    def _repack(self, tree_ids, children):
+        """New forest of the given trees holding only the nodes reachable through `children`."""
+        parts = []
+        roots = []
+        max_depth = 0
+        offset = 0
+        for t in tree_ids:
+            levels = list(self._levels(self.roots[t], children))
+            max_depth = max(max_depth, len(levels) - 1)
+            # Sorting keeps sklearn's preorder numbering (root first, parents before children)
+            nodes = np.sort(np.concatenate(levels))
+            parts.append((nodes, offset))
+            roots.append(offset)
+            offset += len(nodes)
+
+        feature = np.zeros(offset, dtype=self.feature.dtype)
+        threshold = np.zeros(offset, dtype=self.threshold.dtype)
+        new_children = np.empty(2 * offset, dtype=self.children.dtype)
+        value = np.empty(offset, dtype=self.value.dtype)
+        for nodes, start in parts:
+            new_ids = np.arange(start, start + len(nodes))
+            is_leaf = children[2 * nodes] == nodes
+            right = start + np.searchsorted(nodes, children[2 * nodes])
+            left = start + np.searchsorted(nodes, children[2 * nodes + 1])
+
+            feature[new_ids] = np.where(is_leaf, 0, self.feature[nodes])
+            threshold[new_ids] = np.where(is_leaf, 0.0, self.threshold[nodes])
+            new_children[2 * new_ids] = np.where(is_leaf, new_ids, right)
+            new_children[2 * new_ids + 1] = np.where(is_leaf, new_ids, left)
+            value[new_ids] = self.value[nodes]
+
+        return CompiledForest(
+            feature=feature,
+            threshold=threshold,
+            children=new_children,
+            value=value,
+            roots=np.array(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=self.n_features,
+        )
+
+    def save(self, directory: str) -> str:
+        """
+        Write one raw .npy file per array plus manifest.json as a new version of
+        `directory` (see app/core/artifact_store.py) and return its path.
+
+        Plain .npy files can be memory-mapped, so every worker process that loads
+        the directory shares a single page-cache copy of the forest. Files already
+        published are never rewritten, so running workers are unaffected by a save.
+        """
+        return artifact_store.publish(directory, self._write)
+
+    def _write(self, path: str):
+        arrays = {}
+        for name in ARRAY_NAMES:
+            array = np.ascontiguousarray(getattr(self, name))
+            np.save(os.path.join(path, f"{name}.npy"), array)
+            arrays[name] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+
+        manifest = {
+            "format": "compiled_forest",
+            "version": FORMAT_VERSION,
+            "n_trees": self.n_trees,
+            "n_nodes": self.n_nodes,
+            "n_features": self.n_features,
+            "max_depth": self.max_depth,
+            "arrays": arrays,
+        }
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=4)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = "r"):
+        """Open the current version of a saved forest; arrays are memory-mapped unless mmap_mode is None."""
+        path = artifact_store.resolve(directory)
+        if path is None:
+            raise FileNotFoundError(f"No compiled forest in {directory}")
+        directory = path
+        with open(os.path.join(directory, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != "compiled_forest" or manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model artifact in {directory}")
+
+        arrays = {}
+        for name in ARRAY_NAMES:
+            array = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            spec = manifest["arrays"][name]
+            if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+                raise ValueError(f"{name}.npy does not match manifest")
+            arrays[name] = array
+
+        return cls(max_depth=manifest["max_depth"], n_features=manifest["n_features"], **arrays)
+
+
+def _round_down_to_float32(threshold: np.ndarray) -> np.ndarray:
+    """Largest float32 <= each float64 threshold.
+
+    For float32 inputs x, `x <= t` and `x <= round_down(t)` are then equivalent,
+    so storing thresholds in float32 does not change a single split decision.
+    """
+    t32 = threshold.astype(np.float32)
+    too_big = t32.astype(np.float64) > threshold
+    t32[too_big] = np.nextafter(t32[too_big], np.float32(-np.inf))
+    return t32
@@ -0,0 +1,196 @@
+import json
+import os
+import numpy as np
+from app.core import artifact_store
+
+FORMAT_VERSION = 1
+
+# A fitted model whose only numeric input is distance is, for each combination of
+# categorical values, a function of distance alone. FareSurface tabulates it:
+#   table[combo, k]  -> model output at distance start + k * step
+# and answers with a linear interpolation between the two surrounding knots.
+# combo is a mixed-radix index over the known categories of each column.
+#
+# Tree ensembles are constant beyond their outermost distance thresholds, so
+# clamping distances into [start, end] is exact. Inside the range the model is a
+# step function: between two knots where it changes little, interpolation is
+# close, but across a jump it can be off by the whole jump. So where the two knots
+# differ by more than `tolerance`, lookup returns None and the ride goes to the
+# model. `check` measures the error (and the share of rides answered).
+
+
+class FareSurface:
+    """O(1) fare lookup tabulated from a fitted model."""
+
+    def __init__(self, columns, categories, start, step, table, max_error=None, p99_error=None,
+                 tolerance=None, coverage=None):
+        # columns: categorical columns in index order; categories: list of value lists
+        self.columns = list(columns)
+        self.categories = [list(values) for values in categories]
+        self.index = [{value: i for i, value in enumerate(values)} for values in self.categories]
+        self.strides = np.cumprod([1] + [len(values) for values in self.categories[:0:-1]])[::-1].tolist()
+        self.start = float(start)
+        self.step = float(step)
+        self.table = table
+        self.max_error = max_error
+        self.p99_error = p99_error
+        # None answers every ride by interpolation
+        self.tolerance = tolerance
+        self.coverage = coverage
+
+    @property
+    def n_knots(self) -> int:
+        return self.table.shape[1]
+
+    @property
+    def end(self) -> float:
+        return self.start + (self.n_knots - 1) * self.step
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    @classmethod
+    def build(cls, predict, encoder, start: float, end: float, step: float, tolerance: float = None,
+              batch_rows: int = 65536, dtype=np.float32):
+        """
+        Tabulate `predict` (a model's predict on encoded rows) for every category
+        combination of `encoder` on knots covering [start, end].
+        """
+        if len(encoder.numeric) != 1:
+            raise ValueError("A fare surface needs exactly one numeric feature")
+        if end <= start or step <= 0:
+            raise ValueError("Invalid distance range for a fare surface")
+        _, num_idx, mean, scale = encoder.numeric[0]
+        columns = [col for col, _ in encoder.categorical]
+        categories = [list(table) for _, table in encoder.categorical]
+        surface = cls(columns, categories, start, step, table=None, tolerance=tolerance)
+
+        n_knots = int(np.ceil((end - start) / step)) + 1
+        knots = start + step * np.arange(n_knots)
+        # Same float64 arithmetic as the encoder
+        scaled = (knots - mean) / scale
+        n_combos = int(np.prod([len(values) for values in categories]))
+        table = np.empty((n_combos, n_knots), dtype=dtype)
+
+        combos_per_batch = max(1, batch_rows // n_knots)
+        for first in range(0, n_combos, combos_per_batch):
+            combos = np.arange(first, min(first + combos_per_batch, n_combos))
+            X = np.zeros((len(combos) * n_knots, encoder.n_features), dtype=np.float64)
+            X[:, num_idx] = np.tile(scaled, len(combos))
+            for (col, mapping), values, stride in zip(encoder.categorical, categories, surface.strides):
+                positions = (combos // stride) % len(values)
+                output_cols = np.array([mapping[v] for v in values])[positions]
+                X[np.arange(len(X)), np.repeat(output_cols, n_knots)] = 1.0
+            table[combos] = np.asarray(predict(X)).reshape(len(combos), n_knots)
+
+        surface.table = table
+        return surface
+
+    def combo(self, ride: dict):
+        """Table row for the ride's categories, or None if any of them is unknown."""
+        combo = 0
+        for col, index, stride in zip(self.columns, self.index, self.strides):
+            i = index.get(ride.get(col))
+            if i is None:
+                return None
+            combo += i * stride
+        return combo
+
+    def lookup(self, combo: int, distance: float):
+        position = (min(max(distance, self.start), self.end) - self.start) / self.step
+        k = min(int(position), self.n_knots - 2)
+        frac = position - k
+        low, high = float(self.table[combo, k]), float(self.table[combo, k + 1])
+        if self.tolerance is not None and abs(high - low) > self.tolerance:
+            return None
+        return low + (high - low) * frac
+
+    def predict_one(self, ride: dict):
+        """Interpolated fare, or None when the ride has to go to the full model."""
+        combo = self.combo(ride)
+        distance = ride.get('distance')
+        if combo is None or distance is None or not np.isfinite(distance):
+            return None
+        return self.lookup(combo, float(distance))
+
+    def predict(self, rides: list):
+        """(fares, known) for many rides; fares[~known] must come from the full model."""
+        combos = np.array([self.combo(r) for r in rides], dtype=object)
+        distances = np.array([r.get('distance') for r in rides], dtype=np.float64)
+        known = (combos != None) & np.isfinite(distances)  # noqa: E711
+        fares = np.zeros(len(rides), dtype=np.float64)
+        if known.any():
+            rows = combos[known].astype(np.int64)
+            position = (np.clip(distances[known], self.start, self.end) - self.start) / self.step
+            k = np.minimum(position.astype(np.int64), self.n_knots - 2)
+            frac = position - k
+            low = self.table[rows, k].astype(np.float64)
+            high = self.table[rows, k + 1].astype(np.float64)
+            fares[known] = low + (high - low) * frac
+            if self.tolerance is not None:
+                known[np.flatnonzero(known)[np.abs(high - low) > self.tolerance]] = False
+        return fares, known
+
+    def check(self, predict, encoder, n_points: int = 20000, seed: int = 0) -> dict:
+        """Compare against the model at random (combination, distance) points the surface answers."""
+        rng = np.random.default_rng(seed)
+        rides = []
+        for _ in range(n_points):
+            ride = {col: values[rng.integers(len(values))] for col, values in zip(self.columns, self.categories)}
+            ride['distance'] = float(rng.uniform(self.start, self.end))
+            rides.append(ride)
+        expected = np.asarray(predict(encoder.transform(rides)), dtype=np.float64)
+        actual, known = self.predict(rides)
+        errors = np.abs(actual - expected)[known] if known.any() else np.zeros(1)
+        self.max_error = float(errors.max())
+        self.p99_error = float(np.percentile(errors, 99))
+        self.coverage = float(known.mean())
+        return {"max_error": self.max_error, "p99_error": self.p99_error, "coverage": self.coverage, "points": n_points}
+
+    def save(self, directory: str, source_version: str = None) -> str:
+        """table.npy plus manifest.json as a new version of `directory`, like CompiledForest.save."""
+        return artifact_store.publish(directory, lambda path: self._write(path, source_version))
+
+    def _write(self, path: str, source_version: str):
+        np.save(os.path.join(path, "table.npy"), np.ascontiguousarray(self.table))
+        manifest = {
+            "format": "fare_surface",
+            "version": FORMAT_VERSION,
+            "source_version": source_version,
+            "columns": self.columns,
+            "categories": self.categories,
+            "start": self.start,
+            "step": self.step,
+            "max_error": self.max_error,
+            "p99_error": self.p99_error,
+            "tolerance": self.tolerance,
+            "coverage": self.coverage,
+            "table": {"dtype": self.table.dtype.str, "shape": list(self.table.shape)},
+        }
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=4)
+
+    @classmethod
+    def load(cls, directory: str, source_version: str = None, mmap_mode: str = "r"):
+        """Current saved surface, or None if missing or built from a different model version."""
+        directory = artifact_store.resolve(directory)
+        if directory is None:
+            return None
+        manifest_path = os.path.join(directory, "manifest.json")
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != "fare_surface" or manifest.get("version") != FORMAT_VERSION:
+            return None
+        if source_version is not None and manifest.get("source_version") != source_version:
+            return None
+
+        table = np.load(os.path.join(directory, "table.npy"), mmap_mode=mmap_mode)
+        spec = manifest["table"]
+        if table.dtype.str != spec["dtype"] or list(table.shape) != spec["shape"]:
+            raise ValueError("table.npy does not match manifest")
+        return cls(
+            manifest["columns"], manifest["categories"], manifest["start"], manifest["step"], table,
+            max_error=manifest.get("max_error"), p99_error=manifest.get("p99_error"),
+            tolerance=manifest.get("tolerance"), coverage=manifest.get("coverage"),
+        )
@@ -0,0 +1,137 @@
+import numpy as np
+
+
+class FastEncoder:
+    """
+    Serve-time replacement for the fitted ColumnTransformer.
+
+    Holds the StandardScaler mean/scale and a {category: output column} table per
+    one-hot feature, and writes ride dicts straight into NumPy rows. The output is
+    bit-for-bit identical to `preprocessor.transform`, including the
+    handle_unknown='ignore' behaviour (unknown categories encode as all zeros).
+    """
+
+    def __init__(self, numeric, categorical, n_features):
+        # numeric: list of (column, output index, mean, scale)
+        # categorical: list of (column, {category: output index})
+        self.numeric = numeric
+        self.categorical = categorical
+        self.n_features = n_features
+
+    @classmethod
+    def from_column_transformer(cls, preprocessor):
+        """Build lookup tables from a fitted StandardScaler + OneHotEncoder ColumnTransformer."""
+        numeric = []
+        categorical = []
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == 'remainder':
+                if transformer != 'drop':
+                    raise ValueError("Only remainder='drop' is supported")
+                continue
+
+            start = preprocessor.output_indices_[name].start
+            kind = type(transformer).__name__
+
+            if kind == 'StandardScaler':
+                for i, col in enumerate(columns):
+                    mean = transformer.mean_[i] if transformer.with_mean else 0.0
+                    scale = transformer.scale_[i] if transformer.with_std else 1.0
+                    numeric.append((col, start + i, float(mean), float(scale)))
+
+            elif kind == 'OneHotEncoder':
+                if transformer.drop is not None or getattr(transformer, '_infrequent_enabled', False):
+                    raise ValueError("OneHotEncoder with drop/infrequent categories is not supported")
+                if transformer.handle_unknown not in ('ignore', 'infrequent_if_exist'):
+                    raise ValueError("Only handle_unknown='ignore' is supported")
+                offset = start
+                for col, cats in zip(columns, transformer.categories_):
+                    categorical.append((col, {cat: offset + j for j, cat in enumerate(cats.tolist())}))
+                    offset += len(cats)
+
+            else:
+                raise ValueError(f"Unsupported transformer for fast encoding: {kind}")
+
+        n_features = sum(s.stop - s.start for s in preprocessor.output_indices_.values())
+        return cls(numeric, categorical, n_features)
+
+    def transform_one(self, ride: dict, out: np.ndarray = None) -> np.ndarray:
+        """Encode a single ride into a (1, n_features) float64 row."""
+        if out is None:
+            out = np.zeros((1, self.n_features), dtype=np.float64)
+        else:
+            out.fill(0.0)
+        row = out[0]
+
+        for col, idx, mean, scale in self.numeric:
+            value = ride.get(col)
+            # Same arithmetic as StandardScaler.transform: (x - mean) / scale in float64
+            row[idx] = (np.float64(np.nan if value is None else value) - mean) / scale
+
+        for col, table in self.categorical:
+            idx = table.get(ride.get(col))
+            if idx is not None:
+                row[idx] = 1.0
+
+        return out
+
+    def transform(self, rides: list, out: np.ndarray = None) -> np.ndarray:
+        """Encode many rides into a (n, n_features) float64 matrix."""
+        n = len(rides)
+        if out is None:
+            out = np.zeros((n, self.n_features), dtype=np.float64)
+        else:
+            out.fill(0.0)
+
+        for col, idx, mean, scale in self.numeric:
+            values = np.array([r.get(col) for r in rides], dtype=np.float64)
+            values -= mean
+            values /= scale
+            out[:, idx] = values
+
+        rows = np.arange(n)
+        for col, table in self.categorical:
+            cols = np.fromiter((table.get(r.get(col), -1) for r in rides), dtype=np.intp, count=n)
+            known = cols >= 0
+            out[rows[known], cols[known]] = 1.0
+
+        return out
+
+    def transform_frame(self, frame, out: np.ndarray = None) -> np.ndarray:
+        """
+        Encode a pandas DataFrame column by column. Categorical columns are mapped
+        through their category codes (one table lookup per distinct value), and `out`
+        may be any float dtype, e.g. a slice of a preallocated float32 training matrix.
+        """
+        n = len(frame)
+        if out is None:
+            out = np.zeros((n, self.n_features), dtype=np.float64)
+        else:
+            out.fill(0.0)
+
+        for col, idx, mean, scale in self.numeric:
+            # Scale in float64 like transform(); the cast to out's dtype happens on assignment
+            out[:, idx] = (frame[col].to_numpy(dtype=np.float64) - mean) / scale
+
+        rows = np.arange(n)
+        for col, table in self.categorical:
+            cat = frame[col].astype('category').cat
+            # Trailing -1 is what missing values (code -1) index into
+            lookup = np.array([table.get(c, -1) for c in cat.categories.tolist()] + [-1], dtype=np.intp)
+            cols = lookup[cat.codes.to_numpy()]
+            known = cols >= 0
+            out[rows[known], cols[known]] = 1.0
+
+        return out
+
+    def sample_rides(self) -> list:
+        """Rides covering every known category plus an unknown one, for parity checks."""
+        width = max([len(table) for _, table in self.categorical] + [1]) + 1
+        rides = []
+        for i in range(width):
+            ride = {col: 1.5 + 7.25 * i for col, _, _, _ in self.numeric}
+            for col, table in self.categorical:
+                cats = list(table)
+                ride[col] = cats[i] if i < len(cats) else '__unknown__'
+            rides.append(ride)
+        return rides
@@ -0,0 +1,35 @@
+import os
+import httpx
+
+# Shared keep-alive connection pool for outbound calls (ORS, Nominatim, OSRM, OpenWeather).
+# Created in the FastAPI lifespan; every call still passes its own timeout.
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT_SECONDS", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+
+_client = None
+
+
+def init_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared client; created on first use if the lifespan hasn't run (e.g. scripts)."""
+    return _client if _client is not None else init_http_client()
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
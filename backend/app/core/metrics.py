@@ -0,0 +1,212 @@
+import bisect
+import math
+import threading
+import time
+
+# Minimal in-process Prometheus metrics (text exposition format 0.0.4), so there is no
+# client library to install. Recording a sample is a dict lookup and a few additions
+# under a lock, cheap enough to leave on for every request.
+# Served at GET /metrics (see app/main.py), together with the cache and writer stats.
+
+# Seconds; fine at the low end for cache hits and the model, coarse up to the HTTP timeout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]; cumulated on render
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, **labels) -> _Timer:
+        """Context manager that observes the seconds spent inside it."""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(tuple(labels[name] for name in self.labelnames))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self, stats: dict = None) -> str:
+        """
+        Every registered metric, then `stats` ({group: stats dict}) as gauges named
+        fare_<group>_<key> for each numeric value.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for group, values in (stats or {}).items():
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                elif not isinstance(value, (int, float)):
+                    continue
+                name = f"fare_{group}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Stages of smart_predict, predict_fare and get_route_data, e.g. (smart_predict, weather)
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "fare_stage_seconds", "Time spent in each stage of a request", ("operation", "stage"),
+))
+# Whole route lookups, by the strategy that produced the answer (cache, ors, osrm, mock, default)
+ROUTE_SECONDS = REGISTRY.register(Histogram(
+    "fare_route_lookup_seconds", "Route lookup time by the strategy that answered", ("strategy",),
+))
+UPSTREAM_SECONDS = REGISTRY.register(Histogram(
+    "fare_upstream_request_seconds", "Calls to external providers", ("provider",),
+))
+UPSTREAM_FAILURES = REGISTRY.register(Counter(
+    "fare_upstream_failures_total", "Provider calls that raised or returned an error status", ("provider",),
+))
+# Time predictions wait for a free inference worker (app/services/inference_executor.py)
+INFERENCE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "fare_inference_wait_seconds", "Time spent waiting for an inference worker",
+))
+# Rows per model call made by the micro-batcher (app/core/micro_batcher.py)
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "fare_inference_batch_size", "Single predictions grouped into one model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+))
+FALLBACKS = REGISTRY.register(Counter(
+    "fare_fallbacks_total", "Inputs replaced by a fallback value", ("operation", "kind"),
+))
+
+
+def stage(operation: str, name: str) -> _Timer:
+    return STAGE_SECONDS.time(operation=operation, stage=name)
+
+
+class upstream_call:
+    """
+    Times one provider call. A call fails if it raises or `check` sees an error status:
+
+        with upstream_call("osrm") as call:
+            res = call.check(requests.get(url))
+    """
+    __slots__ = ("provider", "start", "failed")
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.failed = False
+
+    def check(self, response):
+        if response.status_code >= 400:
+            self.failed = True
+        return response
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        UPSTREAM_SECONDS.observe(time.perf_counter() - self.start, provider=self.provider)
+        if self.failed or exc_type is not None:
+            UPSTREAM_FAILURES.inc(provider=self.provider)
+        return False
+
+
+def render(stats: dict = None) -> str:
+    return REGISTRY.render(stats)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Adaptive micro-batching for async callers of a vectorized function.
+#
+# Callers submit one item and await its result. Items of the same group (e.g. the
+# model version the caller pinned) are flushed as one call to `predict_many` when:
+#   - nothing is in flight: on the next event loop iteration, so a lone request
+#     never waits, while requests that arrived in the same tick still share a batch;
+#   - a batch is already running: after at most `max_wait` seconds, or as soon as
+#     the running batch finishes, whichever comes first;
+#   - `max_size` items of a group are pending.
+# Under load batches grow by themselves (more requests arrive while one runs), and
+# when traffic is light every request goes out alone with no added delay.
+
+
+class MicroBatcher:
+    def __init__(self, predict_many, max_size: int = 64, max_wait: float = 0.002, on_batch=None):
+        # predict_many: async callable, (group, list of items) -> results in the same order
+        self.predict_many = predict_many
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.on_batch = on_batch
+        self._pending = {}  # group -> [(item, future)]
+        self._handle = None  # scheduled flush (call_soon or call_later)
+        # Running batches; the loop only keeps weak references to tasks
+        self._tasks = set()
+        self.inflight = 0
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item, group=None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(group, [])
+        pending.append((item, future))
+        if len(pending) >= self.max_size:
+            self._flush()
+        elif self._handle is None:
+            if self.inflight == 0:
+                self._handle = loop.call_soon(self._flush)
+            else:
+                self._handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        pending, self._pending = self._pending, {}
+        for group, entries in pending.items():
+            for start in range(0, len(entries), self.max_size):
+                # Callers that gave up (cancelled) don't need a prediction
+                batch = [(item, future) for item, future in entries[start:start + self.max_size] if not future.done()]
+                if batch:
+                    self.inflight += 1
+                    task = asyncio.ensure_future(self._run(group, batch))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Micro-batch failed: {task.exception()!r}")
+
+    async def _run(self, group, batch):
+        try:
+            results = await self.predict_many(group, [item for item, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.inflight -= 1
+            self.batches += 1
+            self.items += len(batch)
+            if self.on_batch is not None:
+                self.on_batch(len(batch))
+            # Whatever queued up behind this batch goes out now
+            if self._pending and self._handle is None:
+                self._handle = asyncio.get_running_loop().call_soon(self._flush)
+
+    async def stop(self):
+        """Send out anything still pending and wait for running batches (lifespan shutdown)."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": sum(len(entries) for entries in self._pending.values()),
+            "inflight": self.inflight,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
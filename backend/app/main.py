@@ -1,25 +1,60 @@
 import os
+import asyncio
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Import routes
-from app.routes import predict, dashboard, route_info, context, smart_predict, distance
+from app.routes import predict, dashboard, route_info, context, smart_predict, distance, history, admin
 
 from contextlib import asynccontextmanager
 from app.services.ml_service import ml_service
+from app.core.http_clients import init_http_client, close_http_client
+from app.services.prediction_writer import prediction_writer
+from app.services.inference_executor import inference_executor
+from app.services.rollup_service import rollup_backfill
+from app.services import archive_service, geocode_cache, route_cache, weather_service
+from app.core import metrics
 
 # Load env early
 load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Load ML models on startup
-    print("Startup: Loading ML models...")
-    ml_service.load_model()
+    # Load ML models in the background so the port binds immediately (see /ready)
+    print("Startup: Loading ML models in the background...")
+    model_task = ml_service.load_in_background()
+    # Worker pool for model calls, so inference doesn't block the event loop
+    inference_executor.start()
+    # Backfill dashboard rollups in the background if this database predates them
+    rollup_task = rollup_backfill.start()
+    # Shared keep-alive pool for routing/geocoding/weather calls
+    init_http_client()
+    # Background bulk writer for prediction logs; it writes once the backfill is done
+    await prediction_writer.start(after=rollup_task)
+    # Optional scheduled archival of old predictions to Parquet, also after the backfill
+    archive_after_days = os.getenv("ARCHIVE_AFTER_DAYS")
+    archive_task = None
+    if archive_after_days:
+        async def _archive():
+            await asyncio.wait({rollup_task})
+            await archive_service.run_periodically(int(archive_after_days))
+        archive_task = asyncio.create_task(_archive())
+    # Optional hot reload when the files in ml/ change
+    reload_poll = float(os.getenv("ML_RELOAD_POLL_SECONDS", "0"))
+    watch_task = asyncio.create_task(ml_service.watch(reload_poll)) if reload_poll > 0 else None
     yield
     # Shutdown logic if needed
     print("Shutting down...")
+    for task in (model_task, archive_task, watch_task):
+        if task is not None:
+            task.cancel()
+    # Finish batched model calls, then drain queued predictions before the process exits
+    await ml_service.batcher.stop()
+    await prediction_writer.stop()
+    await close_http_client()
+    inference_executor.shutdown()
 
 app = FastAPI(
     title="Smart Fare Predictor API",
@@ -32,6 +67,31 @@ app = FastAPI(
 async def health():
     return {"status": "healthy", "memory_optimized": True}
 
+# Readiness probe: 200 once the model is loaded, 503 while loading or after a failed load.
+# Routing, context and dashboard endpoints serve before that; model endpoints answer 503.
+# The rollup backfill is reported alongside; rollup dashboards answer 503 until it is done.
+@app.get("/ready")
+async def ready():
+    info = {**ml_service.readiness(), "rollups": rollup_backfill.status()}
+    return JSONResponse(info, status_code=200 if info["status"] == "ready" else 503)
+
+# Prometheus scrape target: stage timings, upstream failures and fallbacks (app/core/metrics.py)
+# plus the cache and write-behind counters
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    stats = {
+        "route_cache": route_cache.stats(),
+        "geocode_cache": geocode_cache.stats(),
+        "weather_cache": weather_service.stats(),
+        "prediction_writer": prediction_writer.stats(),
+        "inference": inference_executor.stats(),
+        "micro_batcher": ml_service.batcher.stats(),
+        "model": ml_service.status(),
+    }
+    if ml_service.bundle is not None:
+        stats["prediction_cache"] = ml_service.cache.stats()
+    return PlainTextResponse(metrics.render(stats), media_type="text/plain; version=0.0.4")
+
 # 2. Production CORS Setup
 origins = [
     "http://localhost:5173",
@@ -56,6 +116,8 @@ app.include_router(route_info.router, prefix="/api", tags=["Route Info"])
 app.include_router(context.router, prefix="/api", tags=["Context"])
 app.include_router(smart_predict.router, prefix="/api", tags=["Smart Prediction"])
 app.include_router(distance.router, prefix="/api", tags=["Distance"])
+app.include_router(history.router, prefix="/api", tags=["History"])
+app.include_router(admin.router, prefix="/api", tags=["Admin"])
 
 @app.get("/")
 async def root():
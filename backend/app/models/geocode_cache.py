@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Float, Boolean, DateTime
+from app.database import Base
+
+class GeocodeCacheEntry(Base):
+    __tablename__ = "geocode_cache"
+
+    # Normalized place string + country code the lookup was restricted to
+    place = Column(String, primary_key=True)
+    country = Column(String, primary_key=True)
+
+    # NULL coordinates with found=False is a cached "no such place"
+    lat = Column(Float, nullable=True)
+    lon = Column(Float, nullable=True)
+    found = Column(Boolean, default=True)
+
+    expires_at = Column(DateTime, index=True)
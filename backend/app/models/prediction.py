@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Index
 from app.database import Base
 from datetime import datetime
 
@@ -20,3 +20,22 @@ class Prediction(Base):
     final_fare = Column(Float)
     
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Time-windowed dashboard queries: range on created_at, then group (covering final_fare).
+    # Each starts with created_at, so range scans and history pages need no index of its own.
+    __table_args__ = (
+        Index("ix_predictions_created_at_demand_level", "created_at", "demand_level", "final_fare"),
+        Index("ix_predictions_created_at_time_of_day", "created_at", "time_of_day", "final_fare"),
+        Index("ix_predictions_created_at_ride_type", "created_at", "ride_type"),
+    )
+
+class PredictionRollup(Base):
+    """Running count / fare sum per day for each dashboard dimension, kept in step with predictions."""
+    __tablename__ = "prediction_rollups"
+
+    day = Column(Date, primary_key=True)
+    dimension = Column(String, primary_key=True) # 'demand_level', 'time_of_day' or 'ride_type'
+    value = Column(String, primary_key=True)
+
+    count = Column(Integer, default=0)
+    fare_sum = Column(Float, default=0.0)
@@ -0,0 +1,29 @@
+import os
+import asyncio
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from app.services.ml_service import ml_service
+
+router = APIRouter()
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@router.get("/admin/model", dependencies=[Depends(require_admin)])
+def get_model_status():
+    return ml_service.status()
+
+@router.post("/admin/model/reload", dependencies=[Depends(require_admin)])
+async def reload_model(force: bool = False):
+    # Loads next to the serving model in a worker thread; predictions keep flowing meanwhile
+    try:
+        return await asyncio.to_thread(ml_service.reload_model, force)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -1,26 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_read_db, ReadSessionLocal
 from app.services.analytics_service import AnalyticsService
+from app.services.ml_service import ml_service
+from app.services.prediction_writer import prediction_writer
+from app.services.rollup_service import rollup_backfill
 
 router = APIRouter()
 
-@router.get("/dashboard/demand-trend")
-def get_demand_trend(db: Session = Depends(get_db)):
+# Aggregates read the rollup tables, which are incomplete until the startup backfill is done
+def rollups_ready():
+    if not rollup_backfill.ready:
+        raise HTTPException(status_code=503, detail="Dashboard rollups are still being built")
+
+# Optional [from, to) window (ISO datetimes) shared by the aggregate endpoints
+def time_window(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to")
+):
+    # Stored timestamps are naive UTC
+    start, end = [
+        v.astimezone(timezone.utc).replace(tzinfo=None) if v and v.tzinfo else v
+        for v in (start, end)
+    ]
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    return start, end
+
+@router.get("/dashboard/demand-trend", dependencies=[Depends(rollups_ready)])
+def get_demand_trend(window: tuple = Depends(time_window), db: Session = Depends(get_read_db)):
     service = AnalyticsService(db)
-    return service.get_demand_trend()
+    return service.get_demand_trend(*window)
 
-@router.get("/dashboard/time-price")
-def get_time_price(db: Session = Depends(get_db)):
+@router.get("/dashboard/time-price", dependencies=[Depends(rollups_ready)])
+def get_time_price(window: tuple = Depends(time_window), db: Session = Depends(get_read_db)):
     service = AnalyticsService(db)
-    return service.get_time_price_trend()
+    return service.get_time_price_trend(*window)
 
-@router.get("/dashboard/ride-distribution")
-def get_ride_distribution(db: Session = Depends(get_db)):
+@router.get("/dashboard/ride-distribution", dependencies=[Depends(rollups_ready)])
+def get_ride_distribution(window: tuple = Depends(time_window), db: Session = Depends(get_read_db)):
     service = AnalyticsService(db)
-    return service.get_ride_distribution()
+    return service.get_ride_distribution(*window)
 
 @router.get("/dashboard/model-metrics")
-def get_model_metrics(db: Session = Depends(get_db)):
+def get_model_metrics(db: Session = Depends(get_read_db)):
     service = AnalyticsService(db)
     return service.get_model_metrics()
+
+@router.get("/dashboard/summary", dependencies=[Depends(rollups_ready)])
+def get_summary(request: Request, response: Response, window: tuple = Depends(time_window)):
+    """
+    All dashboard aggregates in one response. The ETag changes only when a prediction
+    is written or a different model is loaded, so polling clients mostly get a 304
+    without a database session being opened.
+    """
+    start, end = window
+    etag = 'W/"{}-{}-{}-{}"'.format(
+        prediction_writer.last_prediction_id(),
+        ml_service.model_version,
+        start.isoformat() if start else "",
+        end.isoformat() if end else "",
+    )
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    db = ReadSessionLocal()
+    try:
+        summary = AnalyticsService(db).get_summary(start, end)
+    finally:
+        db.close()
+    response.headers.update(headers)
+    return summary
@@ -0,0 +1,58 @@
+import base64
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database import get_read_db
+from app.models.prediction import Prediction
+from app.routes.dashboard import time_window
+from app.schemas.prediction_schema import PredictionHistoryResponse
+
+router = APIRouter()
+
+MAX_PAGE_SIZE = 500
+
+def _encode_cursor(row: Prediction) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/predictions/history", response_model=PredictionHistoryResponse)
+def get_prediction_history(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    window: tuple = Depends(time_window),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Newest-first prediction history with keyset pagination on (created_at, id).
+    Each page is an index range scan, so its cost doesn't grow with the table.
+    """
+    start, end = window
+    query = db.query(Prediction)
+    if start is not None:
+        query = query.filter(Prediction.created_at >= start)
+    if end is not None:
+        query = query.filter(Prediction.created_at < end)
+    if cursor:
+        created_at, row_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            Prediction.created_at < created_at,
+            and_(Prediction.created_at == created_at, Prediction.id < row_id)
+        ))
+
+    rows = query.order_by(Prediction.created_at.desc(), Prediction.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": rows,
+        "next_cursor": _encode_cursor(rows[-1]) if has_more else None
+    }
@@ -1,13 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+import os
+import time
+from typing import List
+import numpy as np
+from fastapi import APIRouter, HTTPException
 from app.schemas.ride_schema import RideRequest, RideResponse
-from app.services.ml_service import ml_service
-from app.services.surge_service import calculate_surge_multiplier, calculate_final_fare
-from app.database import get_db, engine
-from app.models.prediction import Prediction, Base
+from app.services.ml_service import ml_service, ModelNotReady
+from app.services.inference_executor import inference_executor, InferenceOverloaded
+from app.services.surge_service import calculate_surge_multiplier, calculate_surge_multipliers, calculate_final_fare
+from app.services.prediction_writer import prediction_writer
+from app.core import metrics
+from sqlalchemy import text
+from app.database import engine
+from app.models.prediction import Base, Prediction
 
 # Create tables if they don't exist
 Base.metadata.create_all(bind=engine)
+# create_all skips indexes on tables that already exist
+for index in Prediction.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+# Redundant with the composite indexes above; created by earlier versions
+with engine.begin() as conn:
+    conn.execute(text("DROP INDEX IF EXISTS ix_predictions_created_at"))
 
 router = APIRouter()
 
@@ -17,10 +30,14 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upper bound on rides per /predict/batch call
+MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "1000"))
+
 # ... (previous imports)
 
 @router.post("/predict", response_model=RideResponse)
-async def predict_fare(request: RideRequest, db: Session = Depends(get_db)):
+async def predict_fare(request: RideRequest):
+    started = time.perf_counter()
     try:
         logger.info(f"Received prediction request: {request.model_dump()}")
         
@@ -38,42 +55,35 @@ async def predict_fare(request: RideRequest, db: Session = Depends(get_db)):
             final_fare = base_fare * multiplier
         else:
             # City Logic (ML Model)
-            base_fare = ml_service.predict_base_fare(request_dict)
-            
-            # 2. Calculate Surge Multiplier
-            multiplier = calculate_surge_multiplier(
-                demand_level=request.demand_level,
-                time_of_day=request.time_of_day,
-                traffic_condition=request.traffic_condition,
-                weather_condition=request.weather_condition
-            )
+            with metrics.stage("predict_fare", "model"):
+                base_fare = await ml_service.predict_base_fare_async(request_dict)
             
-            # 3. Calculate Final Fare
-            final_fare = calculate_final_fare(base_fare, multiplier)
+            with metrics.stage("predict_fare", "surge"):
+                # 2. Calculate Surge Multiplier
+                multiplier = calculate_surge_multiplier(
+                    demand_level=request.demand_level,
+                    time_of_day=request.time_of_day,
+                    traffic_condition=request.traffic_condition,
+                    weather_condition=request.weather_condition
+                )
+
+                # 3. Calculate Final Fare
+                final_fare = calculate_final_fare(base_fare, multiplier)
             
         # Ensure 2 decimal precision
         final_fare = round(final_fare, 2)
             
         logger.info(f"Prediction success: Base={base_fare}, Surge={multiplier}, Final={final_fare}")
         
-        # 4. Save to Database
-        # ... (rest of code)
-        db_prediction = Prediction(
-            ride_type=request.ride_type,
-            distance=request.distance,
-            time_of_day=request.time_of_day,
-            day_type=request.day_type,
-            demand_level=request.demand_level,
-            traffic_condition=request.traffic_condition,
-            weather_condition=request.weather_condition,
-            pickup_zone=request.pickup_zone,
-            base_fare=round(base_fare, 2),
-            surge_multiplier=multiplier,
-            final_fare=final_fare
-        )
-        db.add(db_prediction)
-        db.commit()
-        db.refresh(db_prediction)
+        # 4. Save to Database (write-behind: flushed in bulk off the request path)
+        with metrics.stage("predict_fare", "log"):
+            await prediction_writer.submit({
+                **request_dict,
+                "base_fare": round(base_fare, 2),
+                "surge_multiplier": multiplier,
+                "final_fare": final_fare
+            })
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, operation="predict_fare", stage="total")
         
         return RideResponse(
             base_fare=round(base_fare, 2),
@@ -81,6 +91,84 @@ async def predict_fare(request: RideRequest, db: Session = Depends(get_db)):
             final_fare=final_fare
         )
         
+    except (ModelNotReady, InferenceOverloaded) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/predict/cache-stats")
+def get_prediction_cache_stats():
+    # Hit/miss/eviction counters for sizing PREDICTION_CACHE_SIZE / PREDICTION_CACHE_TTL
+    return {
+        **ml_service.cache.stats(),
+        "distance_step": ml_service.cache_distance_step,
+    }
+
+@router.get("/predict/writer-stats")
+def get_prediction_writer_stats():
+    # Write-behind queue depth and flush counters
+    return prediction_writer.stats()
+
+@router.post("/predict/batch", response_model=List[RideResponse])
+async def predict_fare_batch(requests: List[RideRequest]):
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BATCH_SIZE} rides)")
+    if not requests:
+        return []
+
+    try:
+        rides = [r.model_dump() for r in requests]
+        logger.info(f"Received batch prediction request for {len(rides)} rides")
+
+        distance = np.array([r['distance'] for r in rides], dtype=np.float64)
+
+        # 1. Hybrid Pricing Logic, same rules as /predict applied column-wise
+        # Inter-city rides (> 50km) use ₹10 per km with no surge; the rest go through the model
+        long_distance = distance > 50
+        base_fares = distance * 10
+        city_idx = np.flatnonzero(~long_distance)
+        if city_idx.size:
+            base_fares[city_idx] = await inference_executor.predict_base_fares([rides[i] for i in city_idx])
+
+        # 2. Surge Multipliers
+        multipliers = np.where(
+            long_distance,
+            1.0,
+            calculate_surge_multipliers(
+                [r['demand_level'] for r in rides],
+                [r['time_of_day'] for r in rides],
+                [r['traffic_condition'] for r in rides],
+                [r['weather_condition'] for r in rides],
+            )
+        )
+
+        # 3. Final Fares (python round keeps results identical to /predict)
+        final_fares = [round(v, 2) for v in (base_fares * multipliers).tolist()]
+        base_fares = [round(v, 2) for v in base_fares.tolist()]
+        multipliers = multipliers.tolist()
+
+        # 4. Save to Database (the whole batch goes out in one bulk insert)
+        rows = [
+            {
+                **ride,
+                "base_fare": base,
+                "surge_multiplier": multiplier,
+                "final_fare": final,
+            }
+            for ride, base, multiplier, final in zip(rides, base_fares, multipliers, final_fares)
+        ]
+        await prediction_writer.submit_many(rows)
+
+        logger.info(f"Batch prediction success: {len(rows)} rides")
+
+        return [
+            RideResponse(base_fare=base, surge_multiplier=multiplier, final_fare=final)
+            for base, multiplier, final in zip(base_fares, multipliers, final_fares)
+        ]
+
+    except (ModelNotReady, InferenceOverloaded) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,18 +1,27 @@
+import os
+import time
+import asyncio
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
-from app.services.location_service import get_route_data
-from app.services.weather_service import get_real_weather
+from app.services.location_service import get_route_data_async
+from app.services.weather_service import get_real_weather_async
 from app.services.traffic_service import estimate_traffic
 from app.services.demand_service import predict_demand
 from app.services.ml_service import ml_service
 from app.services.surge_service import calculate_surge_multiplier, calculate_final_fare
+from app.core import metrics
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Overall deadline for the routing + weather fan-out; late branches fall back
+CONTEXT_BUDGET_SECONDS = float(os.getenv("SMART_PREDICT_BUDGET_SECONDS", "4"))
+# Used when routing fails or misses the budget
+FALLBACK_ROUTE = {"distance": 10, "duration": 15}
+
 class SmartPredictRequest(BaseModel):
     pickup: str
     drop: str
@@ -26,9 +35,26 @@ class SmartPredictResponse(BaseModel):
     surge_multiplier: float
     context: dict
     explanation: dict
+    fallbacks: List[str] = [] # inputs that used a fallback value ("route", "weather", "model")
+
+def _task_result(task, done, label):
+    """Result of a context lookup, or None if it failed or ran past the budget."""
+    if task not in done:
+        logger.warning(f"{label} exceeded {CONTEXT_BUDGET_SECONDS}s budget, using fallback")
+        return None
+    if task.exception() is not None:
+        logger.error(f"{label} failed: {task.exception()}")
+        return None
+    return task.result()
+
+async def _timed(coro, stage):
+    # Routing and weather overlap, so each branch is timed on its own
+    with metrics.stage("smart_predict", stage):
+        return await coro
 
 @router.post("/smart-predict", response_model=SmartPredictResponse)
 async def smart_predict(request: SmartPredictRequest):
+    started = time.perf_counter()
     try:
         # 1. Temporal Context (Time & Day)
         now = datetime.now()
@@ -45,24 +71,36 @@ async def smart_predict(request: SmartPredictRequest):
         p_coords = tuple(request.pickup_coords) if request.pickup_coords and len(request.pickup_coords) == 2 else None
         d_coords = tuple(request.drop_coords) if request.drop_coords and len(request.drop_coords) == 2 else None
 
-        # 2. Location Context (Distance & Duration)
-        # Pass coords to service for accurate routing
-        try:
-            route_data = get_route_data(request.pickup, request.drop, p_coords, d_coords)
-        except Exception as e:
-            logger.error(f"Routing failed: {e}")
+        # 2 & 3. Location (Distance & Duration) and Environmental (Weather) Context
+        # Routing and weather are independent, so run them concurrently under one deadline.
+        # Pass coords to service for accurate routing; use coords for weather if available.
+        route_task = asyncio.ensure_future(
+            _timed(get_route_data_async(request.pickup, request.drop, p_coords, d_coords), "route")
+        )
+        if p_coords:
+            weather_task = asyncio.ensure_future(_timed(get_real_weather_async(lat=p_coords[0], lon=p_coords[1]), "weather"))
+        else:
+            weather_task = asyncio.ensure_future(_timed(get_real_weather_async(location=request.pickup), "weather"))
+
+        with metrics.stage("smart_predict", "context"):
+            done, pending = await asyncio.wait({route_task, weather_task}, timeout=CONTEXT_BUDGET_SECONDS)
+        for task in pending:
+            task.cancel()
+
+        fallbacks = []
+        route_data = _task_result(route_task, done, "Routing")
+        if route_data is None or "note" in route_data:
+            fallbacks.append("route")
+        if route_data is None:
             # Fallback to simple distance if route service fails completely
-            route_data = {"distance": 10, "duration": 15}
+            route_data = dict(FALLBACK_ROUTE)
 
         distance = route_data.get('distance', 10)
         duration = route_data.get('duration', 15)
-        
-        # 3. Environmental Context (Weather)
-        # Use coords for weather if available
-        if p_coords:
-            weather = get_real_weather(lat=p_coords[0], lon=p_coords[1])
-        else:
-            weather = get_real_weather(location=request.pickup)
+
+        weather, weather_fallback = _task_result(weather_task, done, "Weather") or ("Clear", True)
+        if weather_fallback:
+            fallbacks.append("weather")
         
         # 4. Derived Context (Traffic & Demand)
         traffic = estimate_traffic(duration, distance, time_of_day)
@@ -86,13 +124,20 @@ async def smart_predict(request: SmartPredictRequest):
         }
         
         # 6. Prediction
-        try:
-            base_fare = ml_service.predict_base_fare(ml_input)
-        except:
-            base_fare = 50 + (distance * 12) # Fallback formula
+        with metrics.stage("smart_predict", "model"):
+            try:
+                base_fare = await ml_service.predict_base_fare_async(ml_input)
+            except:
+                base_fare = 50 + (distance * 12) # Fallback formula
+                fallbacks.append("model")
+
+        with metrics.stage("smart_predict", "surge"):
+            multiplier = calculate_surge_multiplier(demand, time_of_day, ml_traffic, ml_weather)
+            final_fare = calculate_final_fare(base_fare, multiplier)
 
-        multiplier = calculate_surge_multiplier(demand, time_of_day, ml_traffic, ml_weather)
-        final_fare = calculate_final_fare(base_fare, multiplier)
+        for kind in fallbacks:
+            metrics.FALLBACKS.inc(operation="smart_predict", kind=kind)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, operation="smart_predict", stage="total")
         
         return {
             "base_fare": round(base_fare, 2),
@@ -111,7 +156,8 @@ async def smart_predict(request: SmartPredictRequest):
                 "traffic_impact": f"{traffic} traffic",
                 "weather_impact": f"{weather} conditions",
                 "demand_impact": f"{demand} demand"
-            }
+            },
+            "fallbacks": fallbacks
         }
 
     except Exception as e:
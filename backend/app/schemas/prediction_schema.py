@@ -0,0 +1,25 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
+from datetime import datetime
+
+class PredictionRecord(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    ride_type: Optional[str] = None
+    distance: Optional[float] = None
+    time_of_day: Optional[str] = None
+    day_type: Optional[str] = None
+    demand_level: Optional[str] = None
+    traffic_condition: Optional[str] = None
+    weather_condition: Optional[str] = None
+    pickup_zone: Optional[str] = None
+    base_fare: Optional[float] = None
+    surge_multiplier: Optional[float] = None
+    final_fare: Optional[float] = None
+    created_at: Optional[datetime] = None
+
+class PredictionHistoryResponse(BaseModel):
+    items: List[PredictionRecord]
+    # Pass back as `cursor` to get the next (older) page; null on the last page
+    next_cursor: Optional[str] = None
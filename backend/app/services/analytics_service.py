@@ -1,52 +1,181 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from app.models.prediction import Prediction
+from collections import defaultdict, namedtuple
+from datetime import datetime, time
+from app.models.prediction import Prediction, PredictionRollup
+from app.services.rollup_service import ROLLUP_DIMENSIONS
+from app.services.ml_service import ml_service
+from app.services.archive_service import archived_until, aggregate_archive
+import json
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+_Total = namedtuple('_Total', ['value', 'count', 'fare_sum'])
+
+# model_metrics.json is rewritten together with the model, so it is read once per model version
+_metrics_cache = {}
+
+def _is_midnight(value: datetime) -> bool:
+    return value is None or value.time() == time(0)
+
+def _demand_trend(results):
+    return [{"demand_level": r.value, "avg_fare": round(r.fare_sum / r.count, 2)} for r in results if r.count]
+
+def _time_price_trend(results):
+    # Sort order roughly
+    order = {"Morning": 1, "Afternoon": 2, "Evening": 3, "Night": 4}
+    data = [{"time_of_day": r.value, "avg_fare": round(r.fare_sum / r.count, 2)} for r in results if r.count]
+    data.sort(key=lambda x: order.get(x['time_of_day'], 100))
+    return data
+
+def _ride_distribution(results):
+    return [{"ride_type": r.value, "count": r.count} for r in results]
+
 class AnalyticsService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, include_archive: bool = True):
         self.db = db
+        # Raw-scan windows reaching back before the hot table also read archived Parquet
+        # (rollups are kept when rows are archived, so whole-day windows never need it)
+        self.include_archive = include_archive
+
+    def _archive_groups(self, start: datetime = None, end: datetime = None):
+        """Archived (demand_level, time_of_day, ride_type, count, fare_sum) groups in the window."""
+        if not self.include_archive:
+            return []
+        until = archived_until()
+        if until is None or (start is not None and start >= until):
+            return []
+        try:
+            return aggregate_archive(start, end)
+        except RuntimeError as e:
+            logger.warning(f"Skipping archived predictions: {str(e)}")
+            return []
+
+    def _rollup_totals(self, dimension: str, start: datetime = None, end: datetime = None):
+        # Reads the pre-aggregated rollups: cost is O(groups x days), not O(predictions)
+        query = self.db.query(
+            PredictionRollup.value,
+            func.sum(PredictionRollup.count).label('count'),
+            func.sum(PredictionRollup.fare_sum).label('fare_sum')
+        ).filter(PredictionRollup.dimension == dimension)
+        if start is not None:
+            query = query.filter(PredictionRollup.day >= start.date())
+        if end is not None:
+            query = query.filter(PredictionRollup.day < end.date())
+        return query.group_by(PredictionRollup.value).all()
+
+    def _raw_totals(self, dimension: str, start: datetime = None, end: datetime = None):
+        # Range scan on the (created_at, dimension, ...) index: cost follows the window size
+        column = getattr(Prediction, dimension)
+        query = self.db.query(
+            column.label('value'),
+            func.count(Prediction.id).label('count'),
+            func.sum(Prediction.final_fare).label('fare_sum')
+        )
+        if start is not None:
+            query = query.filter(Prediction.created_at >= start)
+        if end is not None:
+            query = query.filter(Prediction.created_at < end)
+        results = query.group_by(column).all()
+
+        archived = self._archive_groups(start, end)
+        if not archived:
+            return results
+        totals = defaultdict(lambda: [0, 0.0])
+        for r in results:
+            totals[r.value] = [r.count, r.fare_sum or 0.0]
+        index = ROLLUP_DIMENSIONS.index(dimension)
+        for *values, count, fare_sum in archived:
+            entry = totals[values[index]]
+            entry[0] += count
+            entry[1] += fare_sum
+        return [_Total(value, count, fare_sum) for value, (count, fare_sum) in totals.items()]
 
-    def get_demand_trend(self):
+    def _totals(self, dimension: str, start: datetime = None, end: datetime = None):
+        """Count and fare sum per value in [start, end); whole-day windows come from the rollups."""
+        if _is_midnight(start) and _is_midnight(end):
+            return self._rollup_totals(dimension, start, end)
+        return self._raw_totals(dimension, start, end)
+
+    def get_demand_trend(self, start: datetime = None, end: datetime = None):
         # Average fare per demand level
-        results = self.db.query(
-            Prediction.demand_level, 
-            func.avg(Prediction.final_fare).label('avg_fare')
-        ).group_by(Prediction.demand_level).all()
-        
-        return [{"demand_level": r.demand_level, "avg_fare": round(r.avg_fare, 2)} for r in results]
-
-    def get_time_price_trend(self):
+        return _demand_trend(self._totals('demand_level', start, end))
+
+    def get_time_price_trend(self, start: datetime = None, end: datetime = None):
         # Average fare per time of day
-        results = self.db.query(
-            Prediction.time_of_day, 
-            func.avg(Prediction.final_fare).label('avg_fare')
-        ).group_by(Prediction.time_of_day).all()
-        
-        # Sort order roughly
-        order = {"Morning": 1, "Afternoon": 2, "Evening": 3, "Night": 4}
-        data = [{"time_of_day": r.time_of_day, "avg_fare": round(r.avg_fare, 2)} for r in results]
-        data.sort(key=lambda x: order.get(x['time_of_day'], 100))
-        return data
-
-    def get_ride_distribution(self):
+        return _time_price_trend(self._totals('time_of_day', start, end))
+
+    def get_ride_distribution(self, start: datetime = None, end: datetime = None):
         # Count of rides by type
-        results = self.db.query(
-            Prediction.ride_type, 
-            func.count(Prediction.id).label('count')
-        ).group_by(Prediction.ride_type).all()
-        
-        return [{"ride_type": r.ride_type, "count": r.count} for r in results]
+        return _ride_distribution(self._totals('ride_type', start, end))
+
+    def _all_totals(self, start: datetime = None, end: datetime = None):
+        """{dimension: [_Total]} for every rollup dimension from a single query."""
+        totals = {dimension: defaultdict(lambda: [0, 0.0]) for dimension in ROLLUP_DIMENSIONS}
+        if _is_midnight(start) and _is_midnight(end):
+            query = self.db.query(
+                PredictionRollup.dimension,
+                PredictionRollup.value,
+                func.sum(PredictionRollup.count).label('count'),
+                func.sum(PredictionRollup.fare_sum).label('fare_sum')
+            ).filter(PredictionRollup.dimension.in_(ROLLUP_DIMENSIONS))
+            if start is not None:
+                query = query.filter(PredictionRollup.day >= start.date())
+            if end is not None:
+                query = query.filter(PredictionRollup.day < end.date())
+            for r in query.group_by(PredictionRollup.dimension, PredictionRollup.value):
+                totals[r.dimension][r.value] = [r.count, r.fare_sum]
+        else:
+            # One scan grouped by all three columns, folded per dimension below
+            columns = [getattr(Prediction, dimension) for dimension in ROLLUP_DIMENSIONS]
+            query = self.db.query(
+                *columns,
+                func.count(Prediction.id).label('count'),
+                func.sum(Prediction.final_fare).label('fare_sum')
+            )
+            if start is not None:
+                query = query.filter(Prediction.created_at >= start)
+            if end is not None:
+                query = query.filter(Prediction.created_at < end)
+            for *values, count, fare_sum in [*query.group_by(*columns), *self._archive_groups(start, end)]:
+                for dimension, value in zip(ROLLUP_DIMENSIONS, values):
+                    entry = totals[dimension][value]
+                    entry[0] += count
+                    entry[1] += fare_sum or 0.0
+
+        return {
+            dimension: [_Total(value, count, fare_sum) for value, (count, fare_sum) in values.items()]
+            for dimension, values in totals.items()
+        }
+
+    def get_summary(self, start: datetime = None, end: datetime = None):
+        """Everything the dashboard shows, in the same shapes as the individual endpoints."""
+        totals = self._all_totals(start, end)
+        return {
+            "demand_trend": _demand_trend(totals['demand_level']),
+            "time_price": _time_price_trend(totals['time_of_day']),
+            "ride_distribution": _ride_distribution(totals['ride_type']),
+            "model_metrics": self.get_model_metrics(),
+        }
 
     def get_model_metrics(self):
+        version = ml_service.model_version
+        if version is not None and version in _metrics_cache:
+            return _metrics_cache[version]
+
         try:
             base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
             metrics_path = os.path.join(base_dir, 'ml', 'model_metrics.json')
             
             if os.path.exists(metrics_path):
-                import json
                 with open(metrics_path, 'r') as f:
-                    return json.load(f)
+                    metrics = json.load(f)
+                if version is not None:
+                    _metrics_cache.clear()
+                    _metrics_cache[version] = metrics
+                return metrics
         except Exception:
             pass
             
@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+from app.models.prediction import Prediction
+from app.services.rollup_service import ROLLUP_DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Cold storage for old predictions: day-partitioned Parquet files under ARCHIVE_DIR,
+#   day=YYYY-MM-DD/part-<first id>-<last id>.parquet
+# Parts are named by the prediction ids they hold, so archiving the same rows again
+# (after a run stopped before deleting them) replaces the file instead of adding a
+# copy. Only whole UTC days are archived. Dashboard rollups are kept, so whole-day windows
+# still cover archived days; raw (sub-day) windows read the archive for those days.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(BASE_DIR, "data", "archive", "predictions"))
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "5000"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+COLUMNS = [column.name for column in Prediction.__table__.columns]
+PART_NAME = re.compile(r"part-(\d+)-(\d+)\.parquet$")
+
+
+def _pyarrow():
+    """pyarrow is optional: only archival and archive reads need it."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet archival requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def _schema(pa):
+    types = {
+        "id": pa.int64(),
+        "distance": pa.float64(),
+        "base_fare": pa.float64(),
+        "surge_multiplier": pa.float64(),
+        "final_fare": pa.float64(),
+        "created_at": pa.timestamp("us"),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in COLUMNS])
+
+
+def _partition_days(directory: str = ARCHIVE_DIR) -> list:
+    """Sorted days that have an archive partition."""
+    if not os.path.isdir(directory):
+        return []
+    days = []
+    for name in os.listdir(directory):
+        if name.startswith("day="):
+            try:
+                days.append(date.fromisoformat(name[4:]))
+            except ValueError:
+                continue
+    return sorted(days)
+
+
+def _partition_files(start: datetime = None, end: datetime = None, directory: str = ARCHIVE_DIR) -> list:
+    """Parquet files for the partitions overlapping [start, end)."""
+    files = []
+    for day in _partition_days(directory):
+        if start is not None and day < start.date():
+            continue
+        if end is not None and datetime.combine(day, datetime.min.time()) >= end:
+            continue
+        folder = os.path.join(directory, f"day={day.isoformat()}")
+        files.extend(
+            os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.endswith(".parquet")
+        )
+    return files
+
+
+def archived_until(directory: str = ARCHIVE_DIR):
+    """Exclusive upper bound of archived time (midnight after the newest partition), or None."""
+    days = _partition_days(directory)
+    if not days:
+        return None
+    return datetime.combine(days[-1] + timedelta(days=1), datetime.min.time())
+
+
+def _write_part(pa, rows: list, folder: str, name: str):
+    table = pa.Table.from_pylist(rows, schema=_schema(pa))
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    # Write under a temporary name so readers never see a partial file
+    pa.parquet.write_table(table, path + ".tmp", compression="zstd")
+    os.replace(path + ".tmp", path)
+
+
+def _part_name(rows: list) -> str:
+    return f"part-{rows[0]['id']:012d}-{rows[-1]['id']:012d}.parquet"
+
+
+def _remove_unfinished_parts(db: Session, directory: str):
+    """
+    Delete parts written by a run that stopped before committing the delete of their
+    rows. A chunk's delete commits all at once, so a part whose first row is still in
+    the table was never finished; its rows are archived again by this run.
+    """
+    lowest = db.query(func.min(Prediction.id)).scalar()
+    if lowest is None:
+        return
+    for day in _partition_days(directory):
+        folder = os.path.join(directory, f"day={day.isoformat()}")
+        for name in os.listdir(folder):
+            match = PART_NAME.match(name)
+            if match is None or int(match.group(2)) < lowest:
+                continue
+            row = db.query(Prediction.created_at).filter(Prediction.id == int(match.group(1))).first()
+            # Same day too: SQLite may hand out the ids of archived rows again once the table is empty
+            if row is not None and row.created_at.date() == day:
+                logger.info(f"Removing unfinished archive part {name} (day {day})")
+                os.remove(os.path.join(folder, name))
+
+
+def archive_predictions(db: Session, older_than_days: int, chunk_size: int = ARCHIVE_CHUNK_SIZE,
+                        directory: str = ARCHIVE_DIR) -> int:
+    """
+    Move predictions from before midnight UTC `older_than_days` days ago into the archive.
+
+    Rows are read in keyset-paginated chunks of `chunk_size`, so memory use does not
+    depend on table size. Each chunk's Parquet files are written before its rows are
+    deleted and committed, and a rerun after an interrupted run archives every row
+    exactly once. Returns the number of rows archived.
+    """
+    pa = _pyarrow()
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=older_than_days), datetime.min.time())
+    _remove_unfinished_parts(db, directory)
+    columns = [getattr(Prediction, name) for name in COLUMNS]
+
+    archived = 0
+    last_id = 0
+    while True:
+        results = (
+            db.query(*columns)
+            .filter(Prediction.created_at < cutoff, Prediction.id > last_id)
+            .order_by(Prediction.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not results:
+            break
+
+        by_day = defaultdict(list)
+        for r in results:
+            by_day[r.created_at.date()].append(dict(r._mapping))
+        for day, rows in by_day.items():
+            folder = os.path.join(directory, f"day={day.isoformat()}")
+            _write_part(pa, rows, folder, _part_name(rows))
+
+        ids = [r.id for r in results]
+        db.execute(delete(Prediction).where(Prediction.id.in_(ids)))
+        db.commit()
+
+        archived += len(results)
+        last_id = ids[-1]
+        logger.info(f"Archived {archived} predictions older than {cutoff.date()}...")
+    return archived
+
+
+def read_archive(columns: list = None, start: datetime = None, end: datetime = None,
+                 directory: str = ARCHIVE_DIR):
+    """Archived predictions in [start, end) as a pyarrow Table (empty if there are none)."""
+    pa = _pyarrow()
+    import pyarrow.compute as pc
+
+    schema = _schema(pa)
+    if columns is not None:
+        schema = pa.schema([schema.field(name) for name in columns])
+    files = _partition_files(start, end, directory)
+    if not files:
+        return schema.empty_table()
+
+    read_columns = list(schema.names)
+    if "created_at" not in read_columns and (start is not None or end is not None):
+        read_columns.append("created_at")
+    table = pa.concat_tables(pa.parquet.read_table(path, columns=read_columns) for path in files)
+    if start is not None:
+        table = table.filter(pc.greater_equal(table["created_at"], pa.scalar(start, pa.timestamp("us"))))
+    if end is not None:
+        table = table.filter(pc.less(table["created_at"], pa.scalar(end, pa.timestamp("us"))))
+    return table.select(schema.names)
+
+
+def iter_archive_batches(columns: list = None, batch_size: int = 65536, directory: str = ARCHIVE_DIR):
+    """Yield archived rows as pyarrow RecordBatches of at most `batch_size` rows."""
+    pa = _pyarrow()
+    for path in _partition_files(directory=directory):
+        yield from pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns)
+
+
+def aggregate_archive(start: datetime = None, end: datetime = None, directory: str = ARCHIVE_DIR) -> list:
+    """
+    (demand_level, time_of_day, ride_type, count, fare_sum) groups for archived rows
+    in [start, end). Reads one partition at a time to bound memory.
+    """
+    pa = _pyarrow()
+    import pyarrow.compute as pc
+
+    totals = defaultdict(lambda: [0, 0.0])
+    columns = list(ROLLUP_DIMENSIONS) + ["final_fare", "created_at"]
+    for path in _partition_files(start, end, directory):
+        table = pa.parquet.read_table(path, columns=columns)
+        if start is not None:
+            table = table.filter(pc.greater_equal(table["created_at"], pa.scalar(start, pa.timestamp("us"))))
+        if end is not None:
+            table = table.filter(pc.less(table["created_at"], pa.scalar(end, pa.timestamp("us"))))
+        if table.num_rows == 0:
+            continue
+        grouped = table.group_by(list(ROLLUP_DIMENSIONS), use_threads=False).aggregate(
+            [("created_at", "count"), ("final_fare", "sum")]
+        )
+        for row in grouped.to_pylist():
+            entry = totals[tuple(row[d] for d in ROLLUP_DIMENSIONS)]
+            entry[0] += row["created_at_count"]
+            entry[1] += row["final_fare_sum"] or 0.0
+    return [(*key, count, fare_sum) for key, (count, fare_sum) in totals.items()]
+
+
+def aggregate_archive_days(directory: str = ARCHIVE_DIR):
+    """Yield (day, aggregate_archive groups for that day) for every archived day."""
+    for day in _partition_days(directory):
+        start = datetime.combine(day, datetime.min.time())
+        yield day, aggregate_archive(start, start + timedelta(days=1), directory)
+
+
+async def run_periodically(older_than_days: int, interval: float = ARCHIVE_INTERVAL_SECONDS):
+    """Lifespan task: archive every `interval` seconds until cancelled."""
+    from app.database import SessionLocal
+
+    def _run_once():
+        db = SessionLocal()
+        try:
+            return archive_predictions(db, older_than_days)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            count = await asyncio.to_thread(_run_once)
+            if count:
+                logger.info(f"Archived {count} predictions.")
+        except RuntimeError as e:
+            # pyarrow missing: nothing will change on the next run either
+            logger.error(f"Prediction archival disabled: {str(e)}")
+            return
+        except Exception as e:
+            logger.error(f"Prediction archival failed: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal, engine, Base
+
+    parser = argparse.ArgumentParser(description="Move old predictions into day-partitioned Parquet files.")
+    parser.add_argument("--older-than-days", type=int, default=int(os.getenv("ARCHIVE_AFTER_DAYS", "30")),
+                        help="archive rows from before midnight UTC this many days ago (default: 30)")
+    parser.add_argument("--chunk-size", type=int, default=ARCHIVE_CHUNK_SIZE, help="rows per read/delete chunk")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help=f"archive directory (default: {ARCHIVE_DIR})")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        count = archive_predictions(session, args.older_than_days, args.chunk_size, args.dir)
+        print(f"Archived {count} predictions to {args.dir}.")
+    finally:
+        session.close()
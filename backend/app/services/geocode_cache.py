@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from app.core.ttl_cache import TTLCache
+from app.database import SessionLocal, ReadSessionLocal, engine
+from app.models.geocode_cache import GeocodeCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Two-tier geocode cache: in-process LRU in front of the geocode_cache table.
+# Users type the same few hundred place names, so most quotes skip Nominatim/ORS entirely.
+GEOCODE_COUNTRY = os.getenv("GEOCODE_COUNTRY", "in")
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL", "3600"))
+
+_memory = TTLCache(maxsize=int(os.getenv("GEOCODE_CACHE_SIZE", "2048")))
+_table_ready = False
+_table_lock = threading.Lock()
+_MISS = object()
+
+
+def normalize_place(place: str) -> str:
+    return " ".join(place.lower().split())
+
+
+def _ensure_table():
+    global _table_ready
+    if _table_ready:
+        return
+    # Concurrent pickup/drop lookups may both get here first
+    with _table_lock:
+        if not _table_ready:
+            GeocodeCacheEntry.__table__.create(bind=engine, checkfirst=True)
+            _table_ready = True
+
+
+def _read_db(key):
+    """(hit, coords) from the table; expired rows count as misses."""
+    try:
+        _ensure_table()
+        db = ReadSessionLocal()
+        try:
+            row = db.get(GeocodeCacheEntry, key)
+        finally:
+            db.close()
+    except Exception as e:
+        logger.warning(f"Geocode cache read failed: {str(e)}")
+        return False, None
+
+    if row is None:
+        return False, None
+    remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+    if remaining <= 0:
+        return False, None
+
+    coords = (row.lat, row.lon) if row.found else None
+    # Promote into memory for the rest of the row's lifetime
+    _memory.set(key, coords, ttl=remaining)
+    return True, coords
+
+
+def _write_db(key, coords, ttl):
+    try:
+        _ensure_table()
+        db = SessionLocal()
+        try:
+            db.merge(GeocodeCacheEntry(
+                place=key[0],
+                country=key[1],
+                lat=coords[0] if coords else None,
+                lon=coords[1] if coords else None,
+                found=coords is not None,
+                expires_at=datetime.utcnow() + timedelta(seconds=ttl),
+            ))
+            db.commit()
+        finally:
+            db.close()
+    except Exception as e:
+        logger.warning(f"Geocode cache write failed: {str(e)}")
+
+
+def get(place: str, country: str = GEOCODE_COUNTRY):
+    """
+    Returns (hit, coords). coords is (lat, lon), or None for a cached failed lookup.
+    """
+    key = (normalize_place(place), country)
+    coords = _memory.get(key, _MISS)
+    if coords is not _MISS:
+        return True, coords
+    return _read_db(key)
+
+
+def put(place: str, coords, country: str = GEOCODE_COUNTRY):
+    """Cache a lookup result; pass coords=None to remember that the place was not found."""
+    key = (normalize_place(place), country)
+    ttl = GEOCODE_CACHE_TTL if coords is not None else GEOCODE_NEGATIVE_TTL
+    _memory.set(key, coords, ttl=ttl)
+    _write_db(key, coords, ttl)
+
+
+async def get_async(place: str, country: str = GEOCODE_COUNTRY):
+    """get() that keeps the SQLite tier off the event loop."""
+    key = (normalize_place(place), country)
+    coords = _memory.get(key, _MISS)
+    if coords is not _MISS:
+        return True, coords
+    return await asyncio.to_thread(_read_db, key)
+
+
+async def put_async(place: str, coords, country: str = GEOCODE_COUNTRY):
+    key = (normalize_place(place), country)
+    ttl = GEOCODE_CACHE_TTL if coords is not None else GEOCODE_NEGATIVE_TTL
+    _memory.set(key, coords, ttl=ttl)
+    await asyncio.to_thread(_write_db, key, coords, ttl)
+
+
+def stats() -> dict:
+    return _memory.stats()
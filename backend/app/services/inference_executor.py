@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.core import metrics
+from app.services.ml_service import ml_service
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloaded(RuntimeError):
+    """More predictions are waiting for a worker than INFERENCE_MAX_QUEUE allows."""
+
+
+def _init_worker():
+    # Process workers: load the model once per process. Forked workers inherit the
+    # parent's loaded model (and its memory-mapped arrays), so this is a no-op for them.
+    ml_service.load_model()
+
+
+def _call(method: str, args: tuple):
+    return getattr(ml_service, method)(*args)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class InferenceExecutor:
+    """
+    Runs MLService predictions off the event loop.
+
+    mode "thread" uses a thread pool sharing the loaded model (NumPy releases the
+    GIL for much of a batch), "process" a process pool with the model loaded in
+    each worker, and "inline" calls the model on the event loop as before. "auto"
+    is "thread", also on a single core, so a slow prediction never stalls the event
+    loop; "inline" is only used when asked for. Pools default to one worker per
+    available CPU.
+
+    At most `workers` predictions run at once; up to `max_queue` more wait for a
+    slot, and anything beyond that fails fast with InferenceOverloaded (503) instead
+    of piling up behind a saturated CPU. Process pools are recreated after a model
+    reload, so workers never serve a different version than the API reports.
+    """
+
+    def __init__(self, mode: str = "auto", workers: int = 0, max_queue: int = 1000):
+        cpus = _available_cpus()
+        if mode == "auto":
+            mode = "thread"
+        self.mode = mode
+        if workers <= 0:
+            workers = max(1, cpus)
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = None
+        self._pool_version = None
+        self._slots = asyncio.Semaphore(workers)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def start(self):
+        # Semaphores bind to the running event loop on first use, so make one per lifespan
+        self._slots = asyncio.Semaphore(self.workers)
+
+    def _make_pool(self):
+        if self.mode == "process":
+            # fork shares the parent's loaded model copy-on-write; spawn (Windows, macOS
+            # default) starts clean processes that load it in _init_worker
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+            pool = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker)
+            # Start every worker now rather than on the first requests
+            for _ in range(self.workers):
+                pool.submit(_ping)
+            return pool
+        return ThreadPoolExecutor(self.workers, thread_name_prefix="inference")
+
+    def _current_pool(self):
+        version = ml_service.model_version
+        if self._pool is None or (self.mode == "process" and self._pool_version != version):
+            previous = self._pool
+            self._pool = self._make_pool()
+            self._pool_version = version
+            if previous is not None:
+                # Jobs already running on the old workers finish; the processes then exit
+                previous.shutdown(wait=False)
+                self.restarts += 1
+                logger.info(f"Inference workers restarted for model version {version}.")
+        return self._pool
+
+    async def run(self, method: str, *args):
+        """Await ml_service.<method>(*args) on a worker."""
+        if self.mode == "inline" or ml_service.bundle is None:
+            # Not loaded yet: raises ModelNotReady (or loads inline in scripts), as a direct call would
+            return _call(method, args)
+
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise InferenceOverloaded(f"Inference queue is full ({self.max_queue} waiting)")
+
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        metrics.INFERENCE_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+        self.running += 1
+        try:
+            pool = self._current_pool()
+            return await asyncio.get_running_loop().run_in_executor(pool, _call, method, args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    async def predict_base_fare(self, ride_data: dict) -> float:
+        return await self.run("predict_base_fare", ride_data)
+
+    async def predict_base_fares(self, rides: list):
+        return await self.run("predict_base_fares", rides)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_version = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
+
+
+inference_executor = InferenceExecutor(
+    mode=os.getenv("INFERENCE_EXECUTOR", "auto").lower(),
+    workers=int(os.getenv("INFERENCE_WORKERS", "0")),
+    max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", "1000")),
+)
@@ -1,179 +1,365 @@
 import os
+import asyncio
+import time
 import requests
 import math
 from dotenv import load_dotenv
+from app.core import metrics
+from app.core.http_clients import get_http_client, HTTP_TIMEOUT
+from app.core.metrics import upstream_call
+from app.services import geocode_cache, route_cache
 
 load_dotenv()
 
 ORS_API_KEY = os.getenv("OPENROUTESERVICE_API_KEY", "your_key_here")
 
+ORS_GEOCODE_URL = "https://api.openrouteservice.org/geocode/search"
+ORS_DIRECTIONS_URL = "https://api.openrouteservice.org/v2/directions/driving-car"
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+OSRM_URL = "http://router.project-osrm.org/route/v1/driving"
+NOMINATIM_HEADERS = {'User-Agent': 'SmartFarePredictor/1.0'}
+
+# MOCK DATA FALLBACK (Only for specific known routes if needed)
+MOCK_ROUTES = {
+    ("coimbatore", "pollachi"): {"distance": 42, "duration": 75},
+    ("ukkadam", "valparai"): {"distance": 105, "duration": 180},
+}
+# Known routes are answered from the route cache without any network call
+route_cache.seed(MOCK_ROUTES)
+
+class GeocodeNotFound(Exception):
+    """The provider answered, but has no match for the place (safe to cache)."""
+
 def haversine(coord1, coord2):
     """
-    Calculate the great circle distance between two points 
+    Calculate the great circle distance between two points
     on the earth (specified in decimal degrees)
     """
     R = 6371  # Earth radius in km
     lat1, lon1 = coord1
     lat2, lon2 = coord2
-    
+
     phi1, phi2 = math.radians(lat1), math.radians(lat2)
     dphi = math.radians(lat2 - lat1)
     dlambda = math.radians(lon2 - lon1)
-    
+
     a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
     c = 2*math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
+
     return R * c
 
+# --- Request/response helpers shared by the sync and async variants ---
+
+def _validate_coords(p_coords, d_coords):
+    """
+    Returns (p_coords, d_coords, error). Bad coordinates are dropped so the
+    caller falls back to geocoding; unrealistic distances produce an error response.
+    """
+    if not (p_coords and d_coords):
+        return p_coords, d_coords, None
+
+    # Check if coordinates are valid numbers
+    try:
+        p_coords = (float(p_coords[0]), float(p_coords[1]))
+        d_coords = (float(d_coords[0]), float(d_coords[1]))
+    except (ValueError, TypeError):
+        print("DEBUG: Invalid coordinate format")
+        # Continue to geocoding fallback if coords are bad
+        return None, None, None
+
+    # Calculate straight-line distance
+    crow_dist = haversine(p_coords, d_coords)
+    print(f"DEBUG: Haversine distance: {crow_dist:.2f} km")
+
+    # Sanity Checks
+    if crow_dist > 1000:
+        print("DEBUG: Distance > 1000km, rejecting.")
+        return p_coords, d_coords, {"distance": 0, "duration": 0, "error": "Locations too far apart"}
+
+    if crow_dist < 0.1:
+        print("DEBUG: Distance < 0.1km, rejecting.")
+        return p_coords, d_coords, {"distance": 0, "duration": 0, "error": "Locations too close"}
+
+    return p_coords, d_coords, None
+
+def _ors_headers():
+    return {"Authorization": ORS_API_KEY}
+
+def _ors_geocode_params(place: str):
+    return {"text": place, "boundary.country": geocode_cache.GEOCODE_COUNTRY.upper()}
+
+def _parse_ors_geocode(res, place: str):
+    """(lat, lon) from an ORS geocode response (which returns lon, lat)."""
+    if res.status_code >= 400: raise Exception(f"Geocode API error {res.status_code}")
+    features = res.json().get('features', [])
+    if not features: raise GeocodeNotFound(f"Geocode failed for {place}")
+    c = features[0]['geometry']['coordinates']
+    return c[1], c[0]
+
+def _ors_directions_params(start, end):
+    # ORS expects lon,lat for coordinates
+    return {"start": f"{start[1]},{start[0]}", "end": f"{end[1]},{end[0]}"}
+
+def _parse_ors_route(res):
+    if res.status_code != 200:
+        return None
+    summary = res.json()['features'][0]['properties']['segments'][0]
+    return {
+        "distance": round(summary['distance'] / 1000, 1),
+        "duration": round(summary['duration'] / 60, 0)
+    }
+
+def _nominatim_params(place: str):
+    return {"q": place, "format": "json", "limit": 1, "countrycodes": geocode_cache.GEOCODE_COUNTRY}
+
+def _parse_nominatim(res, place: str):
+    if res.status_code >= 400: raise Exception(f"Geocode API error {res.status_code}")
+    data_list = res.json()
+    if not data_list: raise GeocodeNotFound(f"Geocode failed for {place}")
+    data = data_list[0]
+    return float(data['lat']), float(data['lon'])
+
+def _osrm_route_url(start, end):
+    # Endpoint expects: {lon},{lat};{lon},{lat}
+    return f"{OSRM_URL}/{start[1]},{start[0]};{end[1]},{end[0]}?overview=false"
+
+def _parse_osrm_route(res):
+    if res.status_code >= 400: raise Exception("OSRM Routing failed")
+
+    routes = res.json().get('routes', [])
+    if not routes: raise Exception("No route found by OSRM")
+
+    dist_m = routes[0]['distance']
+    dur_s = routes[0]['duration']
+
+    return {
+        "distance": round(dist_m / 1000, 1),
+        "duration": round(dur_s / 60, 0)
+    }
+
+def _fallback_route(pickup: str, drop: str):
+    # STRATEGY 3: Mock Fallback (Last Resort for Demo)
+    mock_val = MOCK_ROUTES.get((pickup.lower().strip(), drop.lower().strip()))
+    if mock_val:
+        return mock_val
+
+    # If everything fails, return basic/default or raise error
+    # For safety in demo, return a safe default but log error
+    print("DEBUG: All routing failed. Using safe default.")
+    return {"distance": 15, "duration": 30, "note": "Estimated due to routing error"}
+
+def _record_route(strategy: str, start: float):
+    """Lookup time by the strategy that answered; anything after ORS is a fallback."""
+    metrics.ROUTE_SECONDS.observe(time.perf_counter() - start, strategy=strategy)
+    if strategy in ("mock", "default") or (strategy == "osrm" and ORS_API_KEY != "your_key_here"):
+        metrics.FALLBACKS.inc(operation="get_route_data", kind=strategy)
+
+def _fallback_strategy(route: dict) -> str:
+    return "default" if "note" in route else "mock"
+
+def _cached_coords(hit, coords, place):
+    if hit and coords is None:
+        raise GeocodeNotFound(f"Geocode failed for {place} (cached)")
+    return coords if hit else None
+
+# --- Blocking variant (sync endpoints run it in the threadpool) ---
+
+def _geocode(place: str, fetch, *args, remember_miss: bool = True):
+    """
+    Resolve through the geocode cache; only definitive misses are negatively cached.
+    Providers with a fallback after them pass remember_miss=False, so the negative
+    entry is written only once the last provider has missed too.
+    """
+    coords = _cached_coords(*geocode_cache.get(place), place)
+    if coords:
+        return coords
+    try:
+        coords = fetch(place, *args)
+    except GeocodeNotFound:
+        if remember_miss:
+            geocode_cache.put(place, None)
+        raise
+    geocode_cache.put(place, coords)
+    return coords
+
+def _geocode_ors(place: str):
+    with upstream_call("ors_geocode") as call:
+        res = call.check(requests.get(ORS_GEOCODE_URL, params=_ors_geocode_params(place), headers=_ors_headers(), timeout=HTTP_TIMEOUT))
+    return _parse_ors_geocode(res, place)
+
+def _geocode_nominatim(place: str, label: str):
+    try:
+        with upstream_call("nominatim") as call:
+            res = call.check(requests.get(NOMINATIM_URL, params=_nominatim_params(place), headers=NOMINATIM_HEADERS, timeout=HTTP_TIMEOUT))
+        return _parse_nominatim(res, place)
+    except Exception as e:
+        print(f"DEBUG: Geocoding {label} failed: {e}")
+        raise e
+
 def get_route_data(pickup: str, drop: str, p_coords: tuple = None, d_coords: tuple = None):
     """
     Fetches distance (km) and duration (min) between two locations.
     Includes validation to prevent unrealistic distances.
     p_coords, d_coords should be (lat, lon) tuples.
     """
-    
-    # Validation Logic
-    if p_coords and d_coords:
-        # Check if coordinates are valid numbers
-        try:
-            p_coords = (float(p_coords[0]), float(p_coords[1]))
-            d_coords = (float(d_coords[0]), float(d_coords[1]))
-        except (ValueError, TypeError):
-             print("DEBUG: Invalid coordinate format")
-             # Continue to geocoding fallback if coords are bad
-             p_coords = None
-             d_coords = None
-
-        if p_coords and d_coords:
-            # Calculate straight-line distance
-            crow_dist = haversine(p_coords, d_coords)
-            print(f"DEBUG: Haversine distance: {crow_dist:.2f} km")
-            
-            # Sanity Checks
-            if crow_dist > 1000:
-                print("DEBUG: Distance > 1000km, rejecting.")
-                return {"distance": 0, "duration": 0, "error": "Locations too far apart"}
-                
-            if crow_dist < 0.1:
-                print("DEBUG: Distance < 0.1km, rejecting.")
-                return {"distance": 0, "duration": 0, "error": "Locations too close"}
-
-    # MOCK DATA FALLBACK (Only for specific known routes if needed)
-    mock_routes = {
-        ("coimbatore", "pollachi"): {"distance": 42, "duration": 75},
-        ("ukkadam", "valparai"): {"distance": 105, "duration": 180},
-    }
-    p_key = pickup.lower().strip()
-    d_key = drop.lower().strip()
+    start = time.perf_counter()
+    route, strategy = _route_data(pickup, drop, p_coords, d_coords)
+    _record_route(strategy, start)
+    return route
+
+def _route_data(pickup: str, drop: str, p_coords: tuple = None, d_coords: tuple = None):
+    """(route, strategy that produced it)"""
+    p_coords, d_coords, error = _validate_coords(p_coords, d_coords)
+    if error:
+        return error, "invalid"
+
+    cache_key = route_cache.route_key(pickup, drop, p_coords, d_coords)
+    cached = route_cache.get(cache_key)
+    if cached:
+        return cached, "cache"
 
     # STRATEGY 1: OpenRouteService (Needs Key)
     if ORS_API_KEY != "your_key_here":
         try:
-            headers = {"Authorization": ORS_API_KEY}
-            
-            start_str = ""
-            end_str = ""
-            
-            # Helper: ORS expects lon,lat for coordinates
-            if p_coords:
-                start_str = f"{p_coords[1]},{p_coords[0]}"
-            else:
-                # Geocode
-                geo_url = "https://api.openrouteservice.org/geocode/search"
-                p_res = requests.get(geo_url, params={"text": pickup}, headers=headers)
-                c = p_res.json()['features'][0]['geometry']['coordinates']
-                start_str = f"{c[0]},{c[1]}"
-                
-            if d_coords:
-                end_str = f"{d_coords[1]},{d_coords[0]}"
-            else:
-                d_res = requests.get(geo_url, params={"text": drop}, headers=headers)
-                c = d_res.json()['features'][0]['geometry']['coordinates']
-                end_str = f"{c[0]},{c[1]}"
-            
+            with metrics.stage("get_route_data", "geocode"):
+                # Nominatim is tried next, so an ORS miss is not cached
+                start = p_coords or _geocode(pickup, _geocode_ors, remember_miss=False)
+                end = d_coords or _geocode(drop, _geocode_ors, remember_miss=False)
+
             # Get Directions
-            dir_url = f"https://api.openrouteservice.org/v2/directions/driving-car?start={start_str}&end={end_str}"
-            route_res = requests.get(dir_url, headers=headers)
-            
-            if route_res.status_code == 200:
-                data = route_res.json()
-                summary = data['features'][0]['properties']['segments'][0]
-                return {
-                    "distance": round(summary['distance'] / 1000, 1),
-                    "duration": round(summary['duration'] / 60, 0)
-                }
+            with metrics.stage("get_route_data", "directions"), upstream_call("ors_directions") as call:
+                route_res = call.check(requests.get(
+                    ORS_DIRECTIONS_URL, params=_ors_directions_params(start, end),
+                    headers=_ors_headers(), timeout=HTTP_TIMEOUT
+                ))
+            route = _parse_ors_route(route_res)
+            if route:
+                route_cache.put(cache_key, route)
+                return route, "ors"
         except Exception as e:
             print(f"DEBUG: ORS Failed ({e}). Trying OSRM fallback...")
 
     # STRATEGY 2: OSRM + Nominatim (Free, No Key)
     try:
         print("DEBUG: Attempting Free OSRM + Nominatim Routing...")
-        headers = {'User-Agent': 'SmartFarePredictor/1.0'}
-        
-        # Resolve Coords if missing
-        lat1, lon1 = 0.0, 0.0
-        lat2, lon2 = 0.0, 0.0
-        
-        if p_coords:
-            lat1, lon1 = p_coords
-        else:
-            # Fallback Geocoding (Nominatim)
-            nom_url = "https://nominatim.openstreetmap.org/search"
-            try:
-                res = requests.get(nom_url, params={"q": pickup, "format": "json", "limit": 1, "countrycodes": "in"}, headers=headers, timeout=5)
-                if not res.ok: raise Exception(f"Geocode API error {res.status_code}")
-                data_list = res.json()
-                if not data_list: raise Exception(f"Geocode failed for {pickup}")
-                data = data_list[0]
-                lat1, lon1 = float(data['lat']), float(data['lon'])
-            except Exception as e:
-                print(f"DEBUG: Geocoding pickup failed: {e}")
-                raise e
-
-        if d_coords:
-            lat2, lon2 = d_coords
-        else:
-            nom_url = "https://nominatim.openstreetmap.org/search"
-            try:
-                res = requests.get(nom_url, params={"q": drop, "format": "json", "limit": 1, "countrycodes": "in"}, headers=headers, timeout=5)
-                if not res.ok: raise Exception(f"Geocode API error {res.status_code}")
-                data_list = res.json()
-                if not data_list: raise Exception(f"Geocode failed for {drop}")
-                data = data_list[0]
-                lat2, lon2 = float(data['lat']), float(data['lon'])
-            except Exception as e:
-                 print(f"DEBUG: Geocoding drop failed: {e}")
-                 raise e
-            
-        print(f"DEBUG: OSRM Routing: {lat1},{lon1} -> {lat2},{lon2}")
+
+        # Resolve Coords if missing (Fallback Geocoding via Nominatim)
+        with metrics.stage("get_route_data", "geocode"):
+            start = p_coords or _geocode(pickup, _geocode_nominatim, "pickup")
+            end = d_coords or _geocode(drop, _geocode_nominatim, "drop")
+
+        print(f"DEBUG: OSRM Routing: {start[0]},{start[1]} -> {end[0]},{end[1]}")
 
         # OSRM Routing
-        # Endpoint expects: {lon},{lat};{lon},{lat}
-        osrm_url = f"http://router.project-osrm.org/route/v1/driving/{lon1},{lat1};{lon2},{lat2}?overview=false"
-        r_res = requests.get(osrm_url, timeout=5)
-        
-        if not r_res.ok: raise Exception("OSRM Routing failed")
-        
-        routes = r_res.json().get('routes', [])
-        if not routes: raise Exception("No route found by OSRM")
-        
-        dist_m = routes[0]['distance']
-        dur_s = routes[0]['duration']
-        
-        return {
-            "distance": round(dist_m / 1000, 1),
-            "duration": round(dur_s / 60, 0)
-        }
+        with metrics.stage("get_route_data", "directions"), upstream_call("osrm") as call:
+            r_res = call.check(requests.get(_osrm_route_url(start, end), timeout=HTTP_TIMEOUT))
+        route = _parse_osrm_route(r_res)
+        route_cache.put(cache_key, route)
+        return route, "osrm"
 
     except Exception as e:
         print(f"DEBUG: OSRM Failed: {e}")
-        
-    # STRATEGY 3: Mock Fallback (Last Resort for Demo)
-    mock_val = mock_routes.get((p_key, d_key))
-    if mock_val: 
-        return mock_val
-        
-    # If everything fails, return basic/default or raise error
-    # For safety in demo, return a safe default but log error
-    print("DEBUG: All routing failed. Using safe default.")
-    return {"distance": 15, "duration": 30, "note": "Estimated due to routing error"}
+
+    route = _fallback_route(pickup, drop)
+    return route, _fallback_strategy(route)
+
+# --- Non-blocking variant on the shared keep-alive client (async endpoints) ---
+
+async def _geocode_async(place: str, fetch, *args, remember_miss: bool = True):
+    coords = _cached_coords(*await geocode_cache.get_async(place), place)
+    if coords:
+        return coords
+    try:
+        coords = await fetch(place, *args)
+    except GeocodeNotFound:
+        if remember_miss:
+            await geocode_cache.put_async(place, None)
+        raise
+    await geocode_cache.put_async(place, coords)
+    return coords
+
+async def _geocode_ors_async(place: str):
+    with upstream_call("ors_geocode") as call:
+        res = call.check(await get_http_client().get(ORS_GEOCODE_URL, params=_ors_geocode_params(place), headers=_ors_headers(), timeout=HTTP_TIMEOUT))
+    return _parse_ors_geocode(res, place)
+
+async def _geocode_nominatim_async(place: str, label: str):
+    try:
+        with upstream_call("nominatim") as call:
+            res = call.check(await get_http_client().get(NOMINATIM_URL, params=_nominatim_params(place), headers=NOMINATIM_HEADERS, timeout=HTTP_TIMEOUT))
+        return _parse_nominatim(res, place)
+    except Exception as e:
+        print(f"DEBUG: Geocoding {label} failed: {e}")
+        raise e
+
+async def _resolve_async(coords, place: str, fetch, *args, remember_miss: bool = True):
+    return coords or await _geocode_async(place, fetch, *args, remember_miss=remember_miss)
+
+async def get_route_data_async(pickup: str, drop: str, p_coords: tuple = None, d_coords: tuple = None):
+    """Async get_route_data: same strategies and fallbacks, without blocking the event loop."""
+    start = time.perf_counter()
+    # Stays "cancelled" if the caller's deadline cancels the lookup
+    strategy = "cancelled"
+    try:
+        route, strategy = await _route_data_async(pickup, drop, p_coords, d_coords)
+        return route
+    finally:
+        _record_route(strategy, start)
+
+async def _route_data_async(pickup: str, drop: str, p_coords: tuple = None, d_coords: tuple = None):
+    p_coords, d_coords, error = _validate_coords(p_coords, d_coords)
+    if error:
+        return error, "invalid"
+
+    cache_key = route_cache.route_key(pickup, drop, p_coords, d_coords)
+    cached = route_cache.get(cache_key)
+    if cached:
+        return cached, "cache"
+
+    client = get_http_client()
+
+    # STRATEGY 1: OpenRouteService (Needs Key)
+    if ORS_API_KEY != "your_key_here":
+        try:
+            # Pickup and drop geocodes don't depend on each other
+            with metrics.stage("get_route_data", "geocode"):
+                start, end = await asyncio.gather(
+                    _resolve_async(p_coords, pickup, _geocode_ors_async, remember_miss=False),
+                    _resolve_async(d_coords, drop, _geocode_ors_async, remember_miss=False),
+                )
+
+            with metrics.stage("get_route_data", "directions"), upstream_call("ors_directions") as call:
+                route_res = call.check(await client.get(
+                    ORS_DIRECTIONS_URL, params=_ors_directions_params(start, end),
+                    headers=_ors_headers(), timeout=HTTP_TIMEOUT
+                ))
+            route = _parse_ors_route(route_res)
+            if route:
+                route_cache.put(cache_key, route)
+                return route, "ors"
+        except Exception as e:
+            print(f"DEBUG: ORS Failed ({e}). Trying OSRM fallback...")
+
+    # STRATEGY 2: OSRM + Nominatim (Free, No Key)
+    try:
+        print("DEBUG: Attempting Free OSRM + Nominatim Routing...")
+
+        with metrics.stage("get_route_data", "geocode"):
+            start, end = await asyncio.gather(
+                _resolve_async(p_coords, pickup, _geocode_nominatim_async, "pickup"),
+                _resolve_async(d_coords, drop, _geocode_nominatim_async, "drop"),
+            )
+
+        print(f"DEBUG: OSRM Routing: {start[0]},{start[1]} -> {end[0]},{end[1]}")
+
+        with metrics.stage("get_route_data", "directions"), upstream_call("osrm") as call:
+            r_res = call.check(await client.get(_osrm_route_url(start, end), timeout=HTTP_TIMEOUT))
+        route = _parse_osrm_route(r_res)
+        route_cache.put(cache_key, route)
+        return route, "osrm"
+
+    except Exception as e:
+        print(f"DEBUG: OSRM Failed: {e}")
+
+    route = _fallback_route(pickup, drop)
+    return route, _fallback_strategy(route)
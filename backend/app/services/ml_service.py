@@ -1,65 +1,548 @@
-import joblib
-import pandas as pd
+import asyncio
+import numpy as np
 import os
 import gc
+import time
 import logging
+import threading
+import weakref
+from app.core import artifact_store
+from app.core.compiled_forest import CompiledForest
+from app.core.fast_encoder import FastEncoder
+from app.core.fare_surface import FareSurface
+from app.core.micro_batcher import MicroBatcher
+from app.core import metrics
+from app.core.ttl_cache import TTLCache
+
+# joblib, pandas and sklearn (pulled in by unpickling the preprocessor) are imported
+# where they are used, so importing the app stays fast and the model can load in the
+# background after the server is already accepting requests.
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Exact column order as expected by the preprocessor
+FEATURE_COLS = [
+    'ride_type', 'time_of_day', 'day_type', 'demand_level', 
+    'traffic_condition', 'weather_condition', 'pickup_zone', 'distance'
+]
+
+# Marks a cache miss (cached fares are never None, but keep lookups explicit)
+_MISS = object()
+
+# Rides every newly loaded model must answer before it is swapped in
+CANNED_RIDES = [
+    {'ride_type': 'Taxi', 'time_of_day': 'Morning', 'day_type': 'Weekday', 'demand_level': 'High',
+     'traffic_condition': 'Heavy', 'weather_condition': 'Rainy', 'pickup_zone': 'Airport', 'distance': 18.5},
+    {'ride_type': 'Bike', 'time_of_day': 'Night', 'day_type': 'Weekend', 'demand_level': 'Low',
+     'traffic_condition': 'Light', 'weather_condition': 'Clear', 'pickup_zone': 'Residential', 'distance': 3.2},
+    {'ride_type': 'Taxi', 'time_of_day': 'Evening', 'day_type': 'Weekday', 'demand_level': 'Medium',
+     'traffic_condition': 'Moderate', 'weather_condition': 'Foggy', 'pickup_zone': 'IT Park', 'distance': 42.0},
+]
+
+# How long a reload waits for requests still holding the version before the current one
+RELOAD_DRAIN_SECONDS = float(os.getenv("ML_RELOAD_DRAIN_SECONDS", "30"))
+
+class ModelNotReady(RuntimeError):
+    """The model is still loading (or failed to load); callers answer 503 or fall back."""
+
+class ModelBundle:
+    """
+    Everything one model version needs to serve: estimator, preprocessor, encoder,
+    optional fare surface and its own prediction cache. Bundles are never modified
+    after loading; MLService swaps whole bundles, so a request that picked one up
+    finishes on it even if a reload lands meanwhile. Files a bundle memory-maps are
+    never rewritten either: new artifacts go to new version directories
+    (app/core/artifact_store.py).
+    """
+
+    def __init__(self, model, preprocessor, encoder, surface, engine, model_version, cache):
+        self.model = model
+        self.preprocessor = preprocessor
+        self.encoder = encoder
+        self.surface = surface
+        self.engine = engine
+        self.model_version = model_version
+        self.cache = cache
+
+    def encode(self, rides: list) -> np.ndarray:
+        if self.encoder is not None:
+            if len(rides) == 1:
+                return self.encoder.transform_one(rides[0])
+            return self.encoder.transform(rides)
+        import pandas as pd
+        return self.preprocessor.transform(pd.DataFrame(rides, columns=FEATURE_COLS))
+
 class MLService:
     def __init__(self):
-        self.model = None
-        self.preprocessor = None
+        # Current ModelBundle; replaced as a whole by load_model / reload_model
+        self.bundle = None
+        # One load at a time, and the bundle it replaced, so at most two versions are ever in memory
+        self._reload_lock = threading.Lock()
+        self._retired = None
+        self.reloads = 0
+        self.last_reload_error = None
+        self.last_load_seconds = None
+        # "idle" until the first load starts, then "loading", "ready" or "failed"
+        self.load_state = "idle"
+        self.load_started = None
+        self.load_error = None
         
         # Absolute paths for reliability
         self.base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         self.model_path = os.path.join(self.base_dir, 'ml', 'model.pkl')
         self.preprocessor_path = os.path.join(self.base_dir, 'ml', 'preprocessor.pkl')
+        self.compiled_model_path = os.path.join(self.base_dir, 'ml', 'model_arrays')
+        self.surface_path = os.getenv("ML_SURFACE_PATH", os.path.join(self.base_dir, 'ml', 'fare_surface'))
+
+        # "auto" uses the compiled forest when ml/compile_model.py has been run,
+        # "compiled" requires it, "sklearn" always unpickles model.pkl.
+        # "surface" answers from a precomputed fare table (see app/core/fare_surface.py),
+        # with the auto-selected model behind it for rides the table doesn't cover.
+        self.engine_preference = os.getenv("ML_ENGINE", "auto").lower()
+        self.surface_step = float(os.getenv("ML_SURFACE_STEP", "0.05"))
+        # Knot intervals where the model jumps by more than this (fare units) go to the model
+        self.surface_tolerance = float(os.getenv("ML_SURFACE_TOLERANCE", "0.5"))
+        # Surfaces whose measured p99 or max error exceeds these (fare units) are not used
+        self.surface_max_p99_error = float(os.getenv("ML_SURFACE_MAX_P99_ERROR", "1"))
+        self.surface_max_error = float(os.getenv("ML_SURFACE_MAX_ERROR", "2.5"))
+        # Memory-map the compiled arrays (shared page cache across workers); "none" reads them into RAM
+        mmap_mode = os.getenv("ML_MMAP_MODE", "r")
+        self.mmap_mode = None if mmap_mode.lower() == "none" else mmap_mode
+
+        # Prediction cache keyed on the feature tuple. With a distance step > 0,
+        # distance is snapped to that grid (and predicted at the snapped value).
+        self.cache_size = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+        self.cache_ttl = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+        self.cache_distance_step = float(os.getenv("PREDICTION_CACHE_DISTANCE_STEP", "0"))
+
+        # Concurrent single predictions that miss the cache share one model call
+        # (app/core/micro_batcher.py). A lone request goes out at once; while a batch
+        # is running, the next one waits at most ML_BATCH_MAX_WAIT_MS or until it has
+        # ML_BATCH_MAX_SIZE rows. A size of 1 turns batching off.
+        self.batcher = MicroBatcher(
+            self._predict_rows_async,
+            max_size=max(1, int(os.getenv("ML_BATCH_MAX_SIZE", "64"))),
+            max_wait=float(os.getenv("ML_BATCH_MAX_WAIT_MS", "2")) / 1000,
+            on_batch=lambda size: metrics.BATCH_SIZE.observe(size),
+        )
+
+    # Read-only views of the current bundle
+
+    @property
+    def model(self):
+        return self.bundle.model if self.bundle is not None else None
+
+    @property
+    def preprocessor(self):
+        return self.bundle.preprocessor if self.bundle is not None else None
+
+    @property
+    def encoder(self):
+        return self.bundle.encoder if self.bundle is not None else None
+
+    @property
+    def surface(self):
+        return self.bundle.surface if self.bundle is not None else None
+
+    @property
+    def engine(self):
+        return self.bundle.engine if self.bundle is not None else None
+
+    @property
+    def model_version(self):
+        # Changes whenever different artifacts are loaded (keys per-model caches)
+        return self.bundle.model_version if self.bundle is not None else None
+
+    @property
+    def cache(self):
+        return self.bundle.cache if self.bundle is not None else TTLCache(maxsize=self.cache_size, ttl=self.cache_ttl)
+
+    def _uses_compiled(self) -> bool:
+        return self.engine_preference == "compiled" or (
+            self.engine_preference in ("auto", "surface")
+            and artifact_store.resolve(self.compiled_model_path) is not None
+        )
+
+    def _artifact_version(self, engine: str, model_file: str) -> str:
+        # Retraining rewrites the model, preprocessor and metrics together
+        stamps = [int(os.stat(p).st_mtime) for p in (model_file, self.preprocessor_path) if os.path.exists(p)]
+        return f"{engine}-{max(stamps, default=0)}"
+
+    def artifact_version(self) -> str:
+        """Version the artifacts currently on disk would load as (compare with model_version)."""
+        if self._uses_compiled():
+            path = artifact_store.resolve(self.compiled_model_path) or self.compiled_model_path
+            return self._artifact_version("compiled", os.path.join(path, 'manifest.json'))
+        return self._artifact_version("sklearn", self.model_path)
+
+    def _load_estimator(self):
+        """(estimator, engine, model_version) for the artifacts on disk."""
+        if self._uses_compiled():
+            # Resolve the current version once, so the label and the arrays always match
+            path = artifact_store.resolve(self.compiled_model_path) or self.compiled_model_path
+            version = self._artifact_version("compiled", os.path.join(path, 'manifest.json'))
+            return CompiledForest.load(path, mmap_mode=self.mmap_mode), "compiled", version
+        import joblib
+        version = self._artifact_version("sklearn", self.model_path)
+        return joblib.load(self.model_path), "sklearn", version
+
+    def _build_encoder(self, preprocessor):
+        """Fast encoder for the fitted preprocessor, or None if it can't reproduce transform exactly."""
+        import pandas as pd
+        try:
+            encoder = FastEncoder.from_column_transformer(preprocessor)
+            sample = encoder.sample_rides()
+            expected = preprocessor.transform(pd.DataFrame(sample, columns=FEATURE_COLS))
+            if not np.array_equal(encoder.transform(sample), expected):
+                raise ValueError("output differs from preprocessor.transform")
+            return encoder
+        except Exception as e:
+            logger.warning(f"Fast encoder disabled, using ColumnTransformer: {str(e)}")
+            return None
+
+    def _build_surface(self, model, encoder, engine, model_version):
+        """Fare surface for the loaded model (reused from disk when up to date), or None."""
+        try:
+            if encoder is None:
+                raise ValueError("needs the fast encoder")
+            surface = FareSurface.load(self.surface_path, source_version=model_version, mmap_mode=self.mmap_mode)
+            if surface is not None and (surface.step, surface.tolerance) != (self.surface_step, self.surface_tolerance):
+                # Built with other settings
+                surface = None
+            if surface is None:
+                logger.info("Building fare surface...")
+                forest = model if isinstance(model, CompiledForest) else CompiledForest.from_sklearn(model)
+                # The model is flat in distance outside its outermost distance splits,
+                # so the table only has to span those (and clamping is exact)
+                _, idx, mean, scale = encoder.numeric[0]
+                internal = forest.children[0::2] != np.arange(forest.n_nodes)
+                thresholds = forest.threshold[internal & (forest.feature == idx)].astype(np.float64) * scale + mean
+                start = np.floor(thresholds.min() / self.surface_step) * self.surface_step
+                end = np.ceil(thresholds.max() / self.surface_step) * self.surface_step
+
+                surface = FareSurface.build(model.predict, encoder, start, end, self.surface_step, self.surface_tolerance)
+                surface.check(model.predict, encoder)
+                surface.save(self.surface_path, source_version=model_version)
+
+            logger.info(
+                f"Fare surface: {surface.table.shape[0]} combinations x {surface.n_knots} knots, "
+                f"max error {surface.max_error:.4f}, p99 error {surface.p99_error:.4f}, "
+                f"answers {surface.coverage:.1%} of rides"
+            )
+            if surface.p99_error > self.surface_max_p99_error:
+                raise ValueError(f"p99 error {surface.p99_error:.4f} exceeds ML_SURFACE_MAX_P99_ERROR")
+            if surface.max_error > self.surface_max_error:
+                raise ValueError(f"max error {surface.max_error:.4f} exceeds ML_SURFACE_MAX_ERROR")
+            return surface
+        except Exception as e:
+            logger.warning(f"Fare surface disabled, using the {engine} model: {str(e)}")
+            return None
+
+    def _load_bundle(self) -> ModelBundle:
+        """Load, validate and warm a bundle from the artifacts on disk."""
+        import joblib
+        model, engine, model_version = self._load_estimator()
+        preprocessor = joblib.load(self.preprocessor_path)
+        encoder = self._build_encoder(preprocessor)
+        surface = None
+        if self.engine_preference == "surface":
+            surface = self._build_surface(model, encoder, engine, model_version)
+            if surface is not None:
+                engine = "surface"
+        bundle = ModelBundle(
+            model, preprocessor, encoder, surface, engine, model_version,
+            # Fresh cache per bundle: fares from a previous model are never served for the new one
+            cache=TTLCache(maxsize=self.cache_size, ttl=self.cache_ttl),
+        )
+        self._validate(bundle)
+        return bundle
+
+    def _validate(self, bundle: ModelBundle):
+        """Canned predictions through every path; also pages in mmapped arrays before serving."""
+        n_features = getattr(bundle.model, 'n_features', None) or getattr(bundle.model, 'n_features_in_', None)
+        encoded = bundle.encode(CANNED_RIDES)
+        if n_features is not None and encoded.shape[1] != n_features:
+            raise ValueError(f"preprocessor produces {encoded.shape[1]} features, model expects {n_features}")
+
+        batch = np.asarray(bundle.model.predict(encoded), dtype=np.float64)
+        single = np.array([float(bundle.model.predict(bundle.encode([ride]))[0]) for ride in CANNED_RIDES])
+        if not np.all(np.isfinite(batch)) or not np.allclose(batch, single, rtol=0, atol=1e-9):
+            raise ValueError("canned predictions are not finite or differ between single and batch")
+        if bundle.surface is not None:
+            bundle.surface.predict(CANNED_RIDES)
 
     def load_model(self):
         """Load model and preprocessor once at startup."""
-        if self.model is None or self.preprocessor is None:
-            logger.info("Initializing ML models for the first time...")
+        if self.bundle is None:
+            with self._reload_lock:
+                if self.bundle is not None:
+                    return
+                logger.info("Initializing ML models for the first time...")
+                if self.load_state != "loading":
+                    self.load_state = "loading"
+                    self.load_started = time.monotonic()
+                try:
+                    started = time.perf_counter()
+                    self.bundle = self._load_bundle()
+                    self.last_load_seconds = time.perf_counter() - started
+                    self.load_state = "ready"
+                    self.load_error = None
+                    
+                    logger.info(f"ML components loaded successfully (engine: {self.engine}).")
+                    gc.collect()
+                except Exception as e:
+                    self.load_state = "failed"
+                    self.load_error = str(e)
+                    logger.error(f"Critical Error: Failed to load ML components: {str(e)}")
+                    raise RuntimeError(f"ML engine failed to initialize: {str(e)}")
+
+    def load_in_background(self) -> asyncio.Task:
+        """Start loading the first model in a worker thread; the server serves meanwhile."""
+        # Marked before the task runs, so no request tries to load it inline in the meantime
+        self.load_state = "loading"
+        self.load_started = time.monotonic()
+
+        async def _load():
             try:
-                # Load models normally into RAM
-                self.model = joblib.load(self.model_path)
-                self.preprocessor = joblib.load(self.preprocessor_path)
-                
-                logger.info("ML components loaded successfully.")
+                await asyncio.to_thread(self.load_model)
+            except RuntimeError:
+                # Logged by load_model and reported by /ready; a reload can still recover
+                pass
+
+        return asyncio.create_task(_load())
+
+    def _serving_bundle(self) -> ModelBundle:
+        """Bundle for one request. Loads inline only if nothing has started a load (scripts)."""
+        bundle = self.bundle
+        if bundle is not None:
+            return bundle
+        if self.load_state == "idle":
+            self.load_model()
+            return self.bundle
+        if self.load_state == "failed":
+            raise ModelNotReady(f"ML model failed to load: {self.load_error}")
+        raise ModelNotReady("ML model is still loading")
+
+    def readiness(self) -> dict:
+        """Load state and timing for the /ready probe."""
+        info = {"status": self.load_state}
+        if self.load_state == "loading" and self.load_started is not None:
+            info["elapsed_seconds"] = round(time.monotonic() - self.load_started, 3)
+        elif self.load_state == "ready":
+            info["engine"] = self.engine
+            info["model_version"] = self.model_version
+            info["load_seconds"] = round(self.last_load_seconds, 3) if self.last_load_seconds is not None else None
+        elif self.load_state == "failed":
+            info["error"] = self.load_error
+        return info
+
+    def reload_model(self, force: bool = False) -> dict:
+        """
+        Load the artifacts on disk next to the current model and swap them in.
+
+        The current bundle keeps serving until the new one has loaded and passed
+        validation; a failed reload leaves it in place and raises RuntimeError.
+        """
+        with self._reload_lock:
+            if not force and self.bundle is not None and self.artifact_version() == self.model_version:
+                return {"status": "unchanged", "engine": self.engine, "model_version": self.model_version}
+
+            # Wait until requests still running on the bundle replaced last time have let go of it
+            deadline = time.monotonic() + RELOAD_DRAIN_SECONDS
+            while self._retired is not None and self._retired() is not None:
                 gc.collect()
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Previous model version is still in use, try again later")
+                time.sleep(0.05)
+
+            logger.info("Reloading ML models...")
+            started = time.perf_counter()
+            try:
+                bundle = self._load_bundle()
             except Exception as e:
-                logger.error(f"Critical Error: Failed to load ML components: {str(e)}")
-                raise RuntimeError(f"ML engine failed to initialize: {str(e)}")
+                self.last_reload_error = str(e)
+                logger.error(f"Model reload failed, keeping version {self.model_version}: {str(e)}")
+                raise RuntimeError(f"Model reload failed: {str(e)}")
+
+            previous = self.bundle
+            # Single reference assignment: each request sees either the old or the new bundle
+            self.bundle = bundle
+            self._retired = weakref.ref(previous) if previous is not None else None
+            del previous
+            gc.collect()
+
+            self.reloads += 1
+            self.last_reload_error = None
+            # A successful reload also recovers from a failed first load
+            self.load_state = "ready"
+            self.load_error = None
+            self.last_load_seconds = time.perf_counter() - started
+            logger.info(f"ML models reloaded (engine: {self.engine}, version: {self.model_version}).")
+            return {
+                "status": "reloaded",
+                "engine": self.engine,
+                "model_version": self.model_version,
+                "load_seconds": round(self.last_load_seconds, 3),
+            }
+
+    async def watch(self, interval: float):
+        """Lifespan task: reload when the artifacts on disk change and then stay unchanged for one poll."""
+        pending = None
+        failed = None
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                version = self.artifact_version()
+            except OSError:
+                continue
+            if version in (self.model_version, failed):
+                pending = None
+                continue
+            if version != pending:
+                # Training writes several files; give it one more interval to finish
+                pending = version
+                continue
+            try:
+                await asyncio.to_thread(self.reload_model)
+            except RuntimeError:
+                # Don't retry the same broken artifacts every poll
+                failed = version
+
+    def _cache_key(self, ride_data: dict) -> tuple:
+        distance = float(ride_data.get('distance'))
+        if self.cache_distance_step > 0:
+            distance = round(round(distance / self.cache_distance_step) * self.cache_distance_step, 6)
+        return tuple(ride_data.get(col) for col in FEATURE_COLS[:-1]) + (distance,)
+
+    def _cache_input(self, ride_data: dict, key: tuple) -> dict:
+        """Model input for a cache key: the ride with its (possibly snapped) distance."""
+        if self.cache_distance_step > 0:
+            return {**ride_data, 'distance': key[-1]}
+        return ride_data
 
     def predict_base_fare(self, ride_data: dict) -> float:
         """Prediction using pre-loaded models."""
-        if self.model is None or self.preprocessor is None:
-            self.load_model()
+        # Pin one bundle for the whole request
+        bundle = self._serving_bundle()
 
-        # Define exact column order as expected by the preprocessor
-        feature_cols = [
-            'ride_type', 'time_of_day', 'day_type', 'demand_level', 
-            'traffic_condition', 'weather_condition', 'pickup_zone', 'distance'
-        ]
-        
-        # Create single-row DataFrame efficiently
-        # Using a list of dictionaries for single row is fast
-        df = pd.DataFrame([ride_data], columns=feature_cols)
-        
-        # Process and Predict
-        processed_data = self.preprocessor.transform(df)
-        prediction = self.model.predict(processed_data)
+        if bundle.surface is not None:
+            fare = bundle.surface.predict_one(ride_data)
+            if fare is not None:
+                return fare
+
+        key = self._cache_key(ride_data)
+        cached = bundle.cache.get(key, _MISS)
+        if cached is not _MISS:
+            return cached
+
+        # Encode straight into a NumPy row (no DataFrame on the hot path)
+        processed_data = bundle.encode([self._cache_input(ride_data, key)])
+        prediction = bundle.model.predict(processed_data)
         
         # Return serializable float
         result = float(prediction[0])
-        
-        # Explicitly delete temporary large objects and collect garbage if necessary
-        # (Though single row is small, it's good practice for memory-constrained envs)
-        del df, processed_data
-        
+        bundle.cache.set(key, result)
         return result
 
+    async def predict_base_fare_async(self, ride_data: dict) -> float:
+        """
+        predict_base_fare for request handlers. Surface and cache hits are answered
+        right away; misses are grouped with other concurrent requests into one
+        transform and model call on the inference executor.
+        """
+        bundle = self._serving_bundle()
+
+        if bundle.surface is not None:
+            fare = bundle.surface.predict_one(ride_data)
+            if fare is not None:
+                return fare
+
+        key = self._cache_key(ride_data)
+        cached = bundle.cache.get(key, _MISS)
+        if cached is not _MISS:
+            return cached
+
+        # Batches are grouped by model version and evaluated on that version, so the
+        # request still finishes on the bundle it pinned if a reload lands meanwhile
+        model_input = self._cache_input(ride_data, key)
+        try:
+            if self.batcher.max_size > 1:
+                result = await self.batcher.submit(model_input, group=bundle.model_version)
+            else:
+                result = (await self._predict_rows_async(bundle.model_version, [model_input]))[0]
+        except ModelNotReady:
+            if self.bundle is bundle or self.bundle is None:
+                raise
+            # Process workers only hold the current version: start over on it
+            return await self.predict_base_fare_async(ride_data)
+        # predict_rows skips the cache (and may run in another process), so fill it here
+        bundle.cache.set(key, result)
+        return result
+
+    async def _predict_rows_async(self, model_version: str, rides: list) -> list:
+        # Imported here: the executor imports this module
+        from app.services.inference_executor import inference_executor
+        return await inference_executor.run("predict_rows", rides, model_version)
+
+    def _bundle_for(self, model_version: str) -> ModelBundle:
+        """The current or the retired bundle with this version; requests may still hold the retired one."""
+        bundle = self._serving_bundle()
+        if bundle.model_version == model_version:
+            return bundle
+        retired = self._retired() if self._retired is not None else None
+        if retired is not None and retired.model_version == model_version:
+            return retired
+        raise ModelNotReady(f"Model version {model_version} is no longer loaded")
+
+    def predict_rows(self, rides: list, model_version: str = None) -> list:
+        """Model output for rides as floats, without the surface or the cache."""
+        bundle = self._serving_bundle() if model_version is None else self._bundle_for(model_version)
+        return np.asarray(bundle.model.predict(bundle.encode(rides)), dtype=np.float64).tolist()
+
+    def predict_base_fares(self, rides: list) -> np.ndarray:
+        """Batch prediction: one transform and one model call for all rides."""
+        bundle = self._serving_bundle()
+
+        if bundle.surface is not None:
+            results, known = bundle.surface.predict(rides)
+            if not known.all():
+                rest = np.flatnonzero(~known)
+                results[rest] = self._predict_cached(bundle, [rides[i] for i in rest])
+            return results
+        return self._predict_cached(bundle, rides)
+
+    def _predict_cached(self, bundle: ModelBundle, rides: list) -> np.ndarray:
+        keys = [self._cache_key(r) for r in rides]
+        results = np.empty(len(rides), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = bundle.cache.get(key, _MISS)
+            if cached is _MISS:
+                missing.append(i)
+            else:
+                results[i] = cached
+
+        if missing:
+            processed_data = bundle.encode([self._cache_input(rides[i], keys[i]) for i in missing])
+            predictions = np.asarray(bundle.model.predict(processed_data), dtype=np.float64)
+            results[missing] = predictions
+            for i, value in zip(missing, predictions.tolist()):
+                bundle.cache.set(keys[i], value)
+
+        return results
+
+    def status(self) -> dict:
+        return {
+            "state": self.load_state,
+            "engine": self.engine,
+            "model_version": self.model_version,
+            "artifact_version": self.artifact_version(),
+            "reloads": self.reloads,
+            "last_load_seconds": round(self.last_load_seconds, 3) if self.last_load_seconds is not None else None,
+            "last_reload_error": self.last_reload_error,
+        }
+
 # Singleton instance exported
 ml_service = MLService()
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from sqlalchemy import func
+from app.database import SessionLocal, ReadSessionLocal
+from app.models.prediction import Prediction
+from app.services.rollup_service import record_predictions
+
+logger = logging.getLogger(__name__)
+
+# Queue item that tells the flush loop to write what it has and exit
+_STOP = object()
+
+
+class PredictionWriter:
+    """
+    Write-behind logging of Prediction rows.
+
+    Handlers enqueue rows and return immediately; a background task collects them
+    and writes one bulk INSERT when `batch_size` rows are pending or `flush_interval`
+    seconds have passed since the first one. The queue is bounded, so a stalled
+    database slows submitters down (backpressure) instead of growing memory.
+    """
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 0.25, max_queue: int = 10000,
+                 version_ttl: float = 5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        # Highest prediction id known to be committed; the dashboard's data version
+        self.version_ttl = version_ttl
+        self._last_id = None
+        self._last_id_checked = None
+        self.queue = None
+        self._task = None
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, after=None):
+        """Start the flush loop; with `after` (a task), rows queue up until it has finished."""
+        if self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(after))
+
+    async def stop(self):
+        """Flush everything still queued, then stop the background task."""
+        if not self.running:
+            return
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, row: dict):
+        await self.submit_many([row])
+
+    async def submit_many(self, rows: list):
+        """Queue rows for insertion; rows from one call are always written together."""
+        if not rows:
+            return
+        # Stamp now, not at flush time
+        created_at = datetime.utcnow()
+        rows = [{"created_at": created_at, **row} for row in rows]
+
+        if not self.running:
+            # No lifespan (scripts, bare TestClient): write through
+            await asyncio.to_thread(self._write, rows)
+            return
+        await self.queue.put(rows)
+
+    def _write(self, rows: list):
+        db = SessionLocal()
+        try:
+            # Rows and their dashboard rollups commit together
+            record_predictions(db, rows)
+            last_id = db.query(func.max(Prediction.id)).scalar()
+            db.commit()
+        finally:
+            db.close()
+        self._set_last_id(last_id)
+
+    def _set_last_id(self, last_id):
+        self._last_id = last_id or 0
+        self._last_id_checked = time.monotonic()
+
+    def last_prediction_id(self) -> int:
+        """
+        Id of the newest committed prediction. Our own flushes update it directly;
+        it is re-read from the database at most every `version_ttl` seconds so rows
+        written by other workers show up too.
+        """
+        checked = self._last_id_checked
+        if checked is None or time.monotonic() - checked > self.version_ttl:
+            db = ReadSessionLocal()
+            try:
+                self._set_last_id(db.query(func.max(Prediction.id)).scalar())
+            finally:
+                db.close()
+        return self._last_id
+
+    async def _flush(self, rows: list):
+        try:
+            await asyncio.to_thread(self._write, rows)
+            self.rows_written += len(rows)
+            self.flushes += 1
+        except Exception as e:
+            self.rows_failed += len(rows)
+            logger.error(f"Failed to write {len(rows)} predictions: {str(e)}")
+
+    async def _run(self, after=None):
+        if after is not None:
+            # wait() rather than await: a failed or cancelled task must not stop the writer
+            await asyncio.wait({after})
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+
+            rows = list(item)
+            deadline = loop.time() + self.flush_interval
+            while len(rows) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                rows.extend(item)
+
+            await self._flush(rows)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue": self.max_queue,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "flushes": self.flushes,
+        }
+
+
+prediction_writer = PredictionWriter(
+    batch_size=int(os.getenv("PREDICTION_WRITE_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("PREDICTION_FLUSH_INTERVAL", "0.25")),
+    max_queue=int(os.getenv("PREDICTION_QUEUE_SIZE", "10000")),
+    version_ttl=float(os.getenv("DASHBOARD_VERSION_TTL", "5")),
+)
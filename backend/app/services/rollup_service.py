@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import func, insert, delete
+from sqlalchemy.orm import Session
+from app.models.prediction import Prediction, PredictionRollup
+
+logger = logging.getLogger(__name__)
+
+# Columns the dashboard groups by
+ROLLUP_DIMENSIONS = ("demand_level", "time_of_day", "ride_type")
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    # SQLite's date() returns 'YYYY-MM-DD'
+    return date.fromisoformat(str(value)[:10])
+
+
+def _aggregate(rows: list) -> dict:
+    """{(day, dimension, value): [count, fare_sum]} for a batch of prediction rows."""
+    totals = defaultdict(lambda: [0, 0.0])
+    for row in rows:
+        day = _as_date(row.get("created_at") or datetime.utcnow())
+        for dimension in ROLLUP_DIMENSIONS:
+            entry = totals[(day, dimension, row.get(dimension) or "")]
+            entry[0] += 1
+            entry[1] += row.get("final_fare") or 0.0
+    return totals
+
+
+def _upsert(db: Session, totals: dict):
+    """Add counts and sums onto existing rollup rows, creating missing ones."""
+    if not totals:
+        return
+    params = [
+        {"day": day, "dimension": dimension, "value": value, "count": count, "fare_sum": fare_sum}
+        for (day, dimension, value), (count, fare_sum) in totals.items()
+    ]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(PredictionRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PredictionRollup.day, PredictionRollup.dimension, PredictionRollup.value],
+            set_={
+                "count": PredictionRollup.count + stmt.excluded.count,
+                "fare_sum": PredictionRollup.fare_sum + stmt.excluded.fare_sum,
+            },
+        )
+        db.execute(stmt, params)
+        return
+
+    # Generic fallback for other databases
+    for p in params:
+        rollup = db.get(PredictionRollup, (p["day"], p["dimension"], p["value"]))
+        if rollup is None:
+            db.add(PredictionRollup(**p))
+        else:
+            rollup.count += p["count"]
+            rollup.fare_sum += p["fare_sum"]
+
+
+def record_predictions(db: Session, rows: list):
+    """Insert prediction rows and update the rollups in the same transaction (caller commits)."""
+    db.execute(insert(Prediction), rows)
+    _upsert(db, _aggregate(rows))
+
+
+def rebuild_rollups(db: Session) -> int:
+    """
+    Recompute all rollups from the predictions table and, for archived days, from
+    the Parquet archive (their rows are no longer in the table). Returns the number
+    of rollup rows.
+    """
+    # Imported here: archive_service imports this module
+    from app.services.archive_service import aggregate_archive_days, archived_until
+
+    totals = defaultdict(lambda: [0, 0.0])
+    # Read the archive before deleting anything, so a failure leaves the rollups intact
+    if archived_until() is not None:
+        for archived_day, groups in aggregate_archive_days():
+            for group in groups:
+                count, fare_sum = group[-2:]
+                for dimension, value in zip(ROLLUP_DIMENSIONS, group):
+                    entry = totals[(archived_day, dimension, value or "")]
+                    entry[0] += count
+                    entry[1] += fare_sum
+
+    day = func.date(Prediction.created_at)
+    for dimension in ROLLUP_DIMENSIONS:
+        column = getattr(Prediction, dimension)
+        results = db.query(
+            day.label("day"),
+            column.label("value"),
+            func.count(Prediction.id).label("count"),
+            func.sum(Prediction.final_fare).label("fare_sum"),
+        ).group_by(day, column).all()
+        for r in results:
+            if r.day is None:
+                continue
+            entry = totals[(_as_date(r.day), dimension, r.value or "")]
+            entry[0] += r.count
+            entry[1] += r.fare_sum or 0.0
+
+    rows = [
+        {"day": d, "dimension": dimension, "value": value, "count": count, "fare_sum": fare_sum}
+        for (d, dimension, value), (count, fare_sum) in totals.items()
+    ]
+    db.execute(delete(PredictionRollup))
+    if rows:
+        db.execute(insert(PredictionRollup), rows)
+    db.commit()
+    return len(rows)
+
+
+def ensure_rollups(db: Session):
+    """Backfill on first start after upgrading: predictions exist but no rollups yet."""
+    has_rollups = db.query(PredictionRollup.day).first() is not None
+    if not has_rollups and db.query(Prediction.id).first() is not None:
+        logger.info("Prediction rollups are empty, rebuilding from predictions...")
+        count = rebuild_rollups(db)
+        logger.info(f"Rebuilt {count} rollup rows.")
+
+
+class RollupBackfill:
+    """
+    ensure_rollups as a lifespan task, so a long backfill doesn't delay port binding.
+
+    Rollup-backed dashboard endpoints answer 503 while it runs, and the prediction
+    writer and archiver wait for it: rows they wrote meanwhile would be counted twice
+    or dropped by the rebuild. "idle" means no lifespan started one (scripts, bare
+    TestClient), which serves as before.
+    """
+
+    def __init__(self):
+        self.state = "idle"  # idle -> running -> ready | failed
+        self.error = None
+        self.started = None
+        self.seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state != "running"
+
+    def start(self) -> asyncio.Task:
+        from app.database import SessionLocal
+
+        # Marked before the task runs, so requests in the meantime already see it
+        self.state = "running"
+        self.error = None
+        self.started = time.monotonic()
+
+        def _backfill():
+            db = SessionLocal()
+            try:
+                ensure_rollups(db)
+            finally:
+                db.close()
+
+        async def _run():
+            try:
+                await asyncio.to_thread(_backfill)
+                self.state = "ready"
+            except Exception as e:
+                # Dashboards serve what the rollup table has; `rebuild` can fix it later
+                logger.error(f"Rollup backfill failed: {str(e)}")
+                self.error = str(e)
+                self.state = "failed"
+            self.seconds = time.monotonic() - self.started
+
+        return asyncio.create_task(_run())
+
+    def status(self) -> dict:
+        info = {"status": self.state}
+        if self.state == "running":
+            info["elapsed_seconds"] = round(time.monotonic() - self.started, 3)
+        elif self.seconds is not None:
+            info["seconds"] = round(self.seconds, 3)
+        if self.error:
+            info["error"] = self.error
+        return info
+
+
+rollup_backfill = RollupBackfill()
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal, engine, Base
+
+    parser = argparse.ArgumentParser(description="Maintain dashboard rollup tables.")
+    parser.add_argument("command", choices=["rebuild"], help="rebuild: recompute rollups from all predictions, archived ones included")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        count = rebuild_rollups(session)
+        print(f"Rebuilt {count} rollup rows.")
+    finally:
+        session.close()
@@ -0,0 +1,50 @@
+import os
+from app.core.ttl_cache import TTLCache
+from app.core.routes_data import ROUTES
+from app.services.geocode_cache import normalize_place
+
+# Distance/duration cache for origin-destination pairs, in front of ORS and OSRM.
+# Coordinates are snapped to a grid (default 0.005 deg, roughly 500 m) so nearby
+# pickups share an entry; requests without coordinates key on normalized place names.
+ROUTE_CACHE_GRID_DEG = float(os.getenv("ROUTE_CACHE_GRID_DEG", "0.005"))
+ROUTE_CACHE_TTL = float(os.getenv("ROUTE_CACHE_TTL", str(6 * 3600)))
+
+_cache = TTLCache(maxsize=int(os.getenv("ROUTE_CACHE_SIZE", "4096")), ttl=ROUTE_CACHE_TTL)
+# Known routes never expire and are never evicted
+_seeded = {}
+
+
+def _snap(value: float) -> int:
+    return round(value / ROUTE_CACHE_GRID_DEG)
+
+
+def route_key(pickup: str, drop: str, p_coords: tuple = None, d_coords: tuple = None) -> tuple:
+    if p_coords and d_coords:
+        return ("coords", _snap(p_coords[0]), _snap(p_coords[1]), _snap(d_coords[0]), _snap(d_coords[1]))
+    return ("names", normalize_place(pickup), normalize_place(drop))
+
+
+def get(key):
+    route = _seeded.get(key) or _cache.get(key)
+    return dict(route) if route else None
+
+
+def put(key, route: dict):
+    _cache.set(key, {"distance": route["distance"], "duration": route["duration"]})
+
+
+def seed(routes: dict):
+    """Pin {(pickup, drop): {"distance", "duration"}} entries by place name."""
+    for (pickup, drop), route in routes.items():
+        _seeded[route_key(pickup, drop)] = {"distance": route["distance"], "duration": route["duration"]}
+
+
+def stats() -> dict:
+    return {**_cache.stats(), "seeded": len(_seeded)}
+
+
+# app/core/routes_data uses distance_km / avg_time_min
+seed({
+    key: {"distance": route["distance_km"], "duration": route["avg_time_min"]}
+    for key, route in ROUTES.items()
+})
@@ -1,3 +1,11 @@
+import numpy as np
+
+# Condition -> surge increment, shared by the scalar and vectorized calculators
+HIGH_DEMAND_LEVELS = ['High', 'Very High']
+PEAK_TIMES = ['Morning', 'Evening']
+HEAVY_TRAFFIC = ['Heavy', 'Jam']
+BAD_WEATHER = ['Rainy', 'Stormy', 'Snow', 'Bad', 'Storm']
+
 def calculate_surge_multiplier(
     demand_level: str,
     time_of_day: str,
@@ -29,23 +37,40 @@ def calculate_surge_multiplier(
     
     # 1. Demand Level
     # Assuming 'High' or 'Very High' counts as High Demand
-    if demand_level in ['High', 'Very High']:
+    if demand_level in HIGH_DEMAND_LEVELS:
         multiplier += 0.20
         
     # 2. Peak Time
     # Usually Morning (rush hour) and Evening (rush hour)
-    if time_of_day in ['Morning', 'Evening']:
+    if time_of_day in PEAK_TIMES:
         multiplier += 0.15
         
     # 3. Traffic Condition
-    if traffic_condition in ['Heavy', 'Jam']: # Assuming 'Jam' might exist, but 'Heavy' is standard
+    if traffic_condition in HEAVY_TRAFFIC: # Assuming 'Jam' might exist, but 'Heavy' is standard
         multiplier += 0.10
         
     # 4. Weather Condition
-    if weather_condition in ['Rainy', 'Stormy', 'Snow', 'Bad', 'Storm']:
+    if weather_condition in BAD_WEATHER:
         multiplier += 0.08
         
     return round(multiplier, 2)
 
+def calculate_surge_multipliers(
+    demand_levels,
+    times_of_day,
+    traffic_conditions,
+    weather_conditions
+) -> np.ndarray:
+    """
+    Vectorized calculate_surge_multiplier over equally sized sequences.
+    Applies the increments in the same order so results match the scalar version exactly.
+    """
+    multiplier = np.ones(len(demand_levels))
+    multiplier += np.where(np.isin(demand_levels, HIGH_DEMAND_LEVELS), 0.20, 0.0)
+    multiplier += np.where(np.isin(times_of_day, PEAK_TIMES), 0.15, 0.0)
+    multiplier += np.where(np.isin(traffic_conditions, HEAVY_TRAFFIC), 0.10, 0.0)
+    multiplier += np.where(np.isin(weather_conditions, BAD_WEATHER), 0.08, 0.0)
+    return np.round(multiplier, 2)
+
 def calculate_final_fare(base_fare: float, multiplier: float) -> float:
     return round(base_fare * multiplier, 2)
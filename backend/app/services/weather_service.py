@@ -1,21 +1,44 @@
 import os
+import asyncio
+import threading
 import requests
 from dotenv import load_dotenv
+from app.core import metrics
+from app.core.http_clients import get_http_client, HTTP_TIMEOUT
+from app.core.metrics import upstream_call
+from app.core.ttl_cache import TTLCache
 
 load_dotenv()
 
 API_KEY = os.getenv("OPENWEATHER_API_KEY", "your_key_here")
+WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
 
-def get_real_weather(location: str = None, lat: float = None, lon: float = None):
-    """
-    Fetches real weather for a location string OR lat/lon coordinates.
-    """
-    
-    if API_KEY == "your_key_here":
-        print(f"Using mock weather (No API Key)")
-        return "Clear"
+# City-scale weather changes on the order of minutes, so the mapped category is cached
+# per coarse geo cell (default 0.1 deg, roughly 11 km) or per normalized city name.
+# Failed lookups are cached briefly too, which bounds the upstream call rate at any QPS.
+# Lookups return (category, is_fallback); is_fallback is set whenever the category is
+# the "Clear" default rather than an observed condition (no key, upstream error,
+# unknown condition), so callers can report it.
+WEATHER_CELL_DEG = float(os.getenv("WEATHER_CELL_DEG", "0.1"))
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+WEATHER_ERROR_TTL = float(os.getenv("WEATHER_ERROR_TTL", "60"))
+
+_cache = TTLCache(maxsize=int(os.getenv("WEATHER_CACHE_SIZE", "1024")), ttl=WEATHER_CACHE_TTL)
+_MISS = object()
+
+# Single-flight: concurrent misses on one key share a single upstream fetch
+_inflight = {}  # key -> asyncio.Task (async callers)
+_key_locks = [threading.Lock() for _ in range(64)]  # striped by key (threadpool callers)
+
+def _weather_key(location: str = None, lat: float = None, lon: float = None):
+    if lat is not None and lon is not None:
+        return ("cell", round(lat / WEATHER_CELL_DEG), round(lon / WEATHER_CELL_DEG))
+    if location:
+        return ("city", " ".join(location.lower().split()))
+    return None
 
-    url = "https://api.openweathermap.org/data/2.5/weather"
+def _weather_params(location: str = None, lat: float = None, lon: float = None):
+    """Query params for OpenWeather, or None when there is nothing to look up."""
     params = {"appid": API_KEY, "units": "metric"}
 
     if lat is not None and lon is not None:
@@ -24,25 +47,106 @@ def get_real_weather(location: str = None, lat: float = None, lon: float = None)
     elif location:
         params["q"] = location
     else:
-        return "Clear"
-    
+        return None
+    return params
+
+def _map_weather(response):
+    """((category, is_fallback), ttl) for an OpenWeather response; non-200 answers get the short error TTL."""
+    if response.status_code == 200:
+        data = response.json()
+        main_weather = data['weather'][0]['main'].lower()
+
+        # Smart Mapping: API -> ML Model Categories
+        if "rain" in main_weather or "drizzle" in main_weather or "thunderstorm" in main_weather:
+            return ("Rainy", False), WEATHER_CACHE_TTL
+        elif "cloud" in main_weather or "mist" in main_weather or "fog" in main_weather or "haze" in main_weather:
+            return ("Foggy", False), WEATHER_CACHE_TTL
+        elif "clear" in main_weather or "sun" in main_weather:
+            return ("Clear", False), WEATHER_CACHE_TTL
+        else:
+            # A condition the model has no category for (smoke, dust, ...)
+            return ("Clear", True), WEATHER_CACHE_TTL
+
+    metrics.FALLBACKS.inc(operation="get_real_weather", kind="weather")
+    return ("Clear", True), WEATHER_ERROR_TTL
+
+def get_real_weather(location: str = None, lat: float = None, lon: float = None):
+    """
+    Fetches real weather for a location string OR lat/lon coordinates.
+    """
+    return lookup_weather(location, lat, lon)[0]
+
+def lookup_weather(location: str = None, lat: float = None, lon: float = None):
+    """get_real_weather as (category, is_fallback)."""
+
+    if API_KEY == "your_key_here":
+        print(f"Using mock weather (No API Key)")
+        return "Clear", True
+
+    params = _weather_params(location, lat, lon)
+    if params is None:
+        return "Clear", True
+
+    key = _weather_key(location, lat, lon)
+    weather = _cache.get(key, _MISS)
+    if weather is not _MISS:
+        return weather
+
+    with _key_locks[hash(key) % len(_key_locks)]:
+        # Another thread may have filled it while we waited
+        weather = _cache.get(key, _MISS)
+        if weather is not _MISS:
+            return weather
+
+        try:
+            with upstream_call("openweather") as call:
+                response = call.check(requests.get(WEATHER_URL, params=params, timeout=HTTP_TIMEOUT))
+            weather, ttl = _map_weather(response)
+        except Exception as e:
+            print(f"Weather API error: {e}")
+            metrics.FALLBACKS.inc(operation="get_real_weather", kind="weather")
+            weather, ttl = ("Clear", True), WEATHER_ERROR_TTL
+
+        _cache.set(key, weather, ttl=ttl)
+        return weather
+
+async def _fetch_weather_async(key, params):
     try:
-        response = requests.get(url, params=params, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            main_weather = data['weather'][0]['main'].lower()
-            
-            # Smart Mapping: API -> ML Model Categories
-            if "rain" in main_weather or "drizzle" in main_weather or "thunderstorm" in main_weather:
-                return "Rainy"
-            elif "cloud" in main_weather or "mist" in main_weather or "fog" in main_weather or "haze" in main_weather:
-                return "Foggy" 
-            elif "clear" in main_weather or "sun" in main_weather:
-                return "Clear"
-            else:
-                return "Clear"
-                
-        return "Clear"
+        with upstream_call("openweather") as call:
+            response = call.check(await get_http_client().get(WEATHER_URL, params=params, timeout=HTTP_TIMEOUT))
+        weather, ttl = _map_weather(response)
     except Exception as e:
         print(f"Weather API error: {e}")
-        return "Clear"
+        metrics.FALLBACKS.inc(operation="get_real_weather", kind="weather")
+        weather, ttl = ("Clear", True), WEATHER_ERROR_TTL
+
+    _cache.set(key, weather, ttl=ttl)
+    return weather
+
+async def get_real_weather_async(location: str = None, lat: float = None, lon: float = None):
+    """Async lookup_weather on the shared keep-alive client: (category, is_fallback)."""
+
+    if API_KEY == "your_key_here":
+        print(f"Using mock weather (No API Key)")
+        return "Clear", True
+
+    params = _weather_params(location, lat, lon)
+    if params is None:
+        return "Clear", True
+
+    key = _weather_key(location, lat, lon)
+    weather = _cache.get(key, _MISS)
+    if weather is not _MISS:
+        return weather
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_weather_async(key, params))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    # Shield so one cancelled caller doesn't cancel the fetch the others are waiting on
+    return await asyncio.shield(task)
+
+def stats() -> dict:
+    return {**_cache.stats(), "inflight": len(_inflight)}
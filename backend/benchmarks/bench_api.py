@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import tempfile
+import contextlib
+from collections import Counter
+import numpy as np
+
+# Make `app.*` and `benchmarks.*` importable when run as `python benchmarks/bench_api.py`
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))
+
+from benchmarks.common import (
+    BACKEND_DIR, random_ride, summarize, peak_rss_mb, current_rss_mb, environment, print_table, write_report,
+)
+
+# Load test of the API in one process: the app runs behind httpx's ASGI transport (no
+# sockets, no server), external providers are replaced by benchmarks/stubs.py, and each
+# scenario sends --requests requests from --concurrency concurrent clients.
+# Predictions are logged to a throwaway copy of predictions.db unless --database-url is given.
+
+parser = argparse.ArgumentParser(description="Benchmark the API endpoints in-process with stubbed providers.")
+parser.add_argument("--scenarios", default="all",
+                    help="comma separated scenario names, or 'all' (see --list)")
+parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+parser.add_argument("--requests", type=int, default=1000, help="timed requests per scenario (default: 1000)")
+parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients (default: 16)")
+parser.add_argument("--warmup", type=int, default=50, help="untimed requests before each scenario (default: 50)")
+parser.add_argument("--upstream-latency-ms", type=float, default=20.0,
+                    help="simulated latency of each provider call (default: 20)")
+parser.add_argument("--upstream-failure-rate", type=float, default=0.0,
+                    help="fraction of provider calls that return 503 (default: 0)")
+parser.add_argument("--places", type=int, default=50,
+                    help="distinct place names used by smart-predict and mobility-context (default: 50)")
+parser.add_argument("--ride-pool", type=int, default=0,
+                    help="distinct rides sent to the predict scenarios; 0 makes every ride new (default: 0)")
+parser.add_argument("--batch-size", type=int, default=50, help="rides per predict-batch request (default: 50)")
+parser.add_argument("--seed", type=int, default=0, help="random seed for request bodies")
+parser.add_argument("--database-url", default=None,
+                    help="database to run against (default: a temporary copy of predictions.db)")
+parser.add_argument("--show-app-output", action="store_true", help="don't silence the app's prints and logs")
+parser.add_argument("--output", default=None, help="write the JSON report to this path")
+args = parser.parse_args()
+
+# The database URL and engine are read when app.database is imported
+work_dir = tempfile.mkdtemp(prefix="fare-bench-")
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+else:
+    db_path = os.path.join(work_dir, "predictions.db")
+    shutil.copyfile(os.path.join(BACKEND_DIR, "predictions.db"), db_path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+import httpx
+from benchmarks import stubs
+from app.main import app
+from app.services.prediction_writer import prediction_writer
+from app.services.ml_service import ml_service
+
+PLACES = [f"Benchmark Place {i}" for i in range(args.places)]
+
+
+def _ride(rng, pool):
+    return pool[rng.integers(len(pool))] if pool else random_ride(rng)
+
+
+def _smart_request(rng, pool):
+    pickup, drop = rng.choice(len(PLACES), size=2, replace=False)
+    body = {
+        "pickup": PLACES[pickup],
+        "drop": PLACES[drop],
+        "ride_type": _ride(rng, pool)["ride_type"],
+    }
+    if rng.random() < 0.25:
+        # Map-picked locations skip geocoding
+        body["pickup_coords"] = list(stubs.place_coords(body["pickup"]))
+        body["drop_coords"] = list(stubs.place_coords(body["drop"]))
+    return body
+
+
+# name -> (method, path, request kwargs for (rng, ride pool, state))
+SCENARIOS = {
+    "predict": ("POST", "/api/predict", lambda rng, pool, state: {"json": _ride(rng, pool)}),
+    "predict-batch": ("POST", "/api/predict/batch",
+                      lambda rng, pool, state: {"json": [_ride(rng, pool) for _ in range(args.batch_size)]}),
+    "smart-predict": ("POST", "/api/smart-predict", lambda rng, pool, state: {"json": _smart_request(rng, pool)}),
+    "mobility-context": ("GET", "/api/mobility-context",
+                         lambda rng, pool, state: {"params": {"location": PLACES[rng.integers(len(PLACES))]}}),
+    "dashboard-summary": ("GET", "/api/dashboard/summary", lambda rng, pool, state: {}),
+    "dashboard-summary-304": ("GET", "/api/dashboard/summary",
+                              lambda rng, pool, state: {"headers": {"If-None-Match": state["etag"]}}),
+    "dashboard-demand-trend": ("GET", "/api/dashboard/demand-trend", lambda rng, pool, state: {}),
+    "dashboard-time-price": ("GET", "/api/dashboard/time-price", lambda rng, pool, state: {}),
+    "dashboard-ride-distribution": ("GET", "/api/dashboard/ride-distribution", lambda rng, pool, state: {}),
+    "dashboard-model-metrics": ("GET", "/api/dashboard/model-metrics", lambda rng, pool, state: {}),
+}
+
+
+async def send_all(client, method, path, bodies, concurrency):
+    """Latencies (ms) and status counts for `bodies`, sent by `concurrency` workers."""
+    latencies = []
+    statuses = Counter()
+    pending = iter(bodies)
+
+    async def worker():
+        for kwargs in pending:
+            start = time.perf_counter()
+            try:
+                res = await client.request(method, path, **kwargs)
+                statuses[res.status_code] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses
+
+
+async def settle(client, state):
+    """Let the previous scenario's queued prediction logs reach the database first."""
+    while prediction_writer.queue is not None and not prediction_writer.queue.empty():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(prediction_writer.flush_interval * 2)
+    state["etag"] = (await client.get("/api/dashboard/summary")).headers.get("etag", "")
+
+
+async def run_scenario(client, name, upstream, state):
+    method, path, make = SCENARIOS[name]
+    await settle(client, state)
+    rng = np.random.default_rng(args.seed)
+    pool = [random_ride(rng) for _ in range(args.ride_pool)]
+    # Bodies are generated up front so only the requests are timed
+    warmup = [make(rng, pool, state) for _ in range(args.warmup)]
+    bodies = [make(rng, pool, state) for _ in range(args.requests)]
+
+    await send_all(client, method, path, warmup, args.concurrency)
+    calls_before = Counter(upstream.calls)
+    start = time.perf_counter()
+    latencies, statuses = await send_all(client, method, path, bodies, args.concurrency)
+    wall = time.perf_counter() - start
+
+    ok = sum(count for status, count in statuses.items() if status in (200, 304))
+    return {
+        "scenario": name,
+        "method": method,
+        "path": path,
+        **summarize(latencies, wall),
+        "errors": args.requests - ok,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "upstream_calls": dict(upstream.calls - calls_before),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_mb": current_rss_mb(),
+    }
+
+
+async def main(names):
+    upstream = stubs.Upstream(latency_ms=args.upstream_latency_ms, failure_rate=args.upstream_failure_rate)
+    stubs.install(upstream)
+    quiet = open(os.devnull, "w")
+    if not args.show_app_output:
+        logging.disable(logging.WARNING)
+
+    results = []
+    startup = {"peak_rss_mb_before": peak_rss_mb()}
+    async with contextlib.AsyncExitStack() as stack:
+        if not args.show_app_output:
+            stack.enter_context(contextlib.redirect_stdout(quiet))
+        start = time.perf_counter()
+        await stack.enter_async_context(app.router.lifespan_context(app))
+        startup["seconds"] = round(time.perf_counter() - start, 3)
+        # The model loads in the background; scenarios start once it is ready
+        while ml_service.load_state == "loading":
+            await asyncio.sleep(0.05)
+        startup["ready_seconds"] = round(time.perf_counter() - start, 3)
+        startup["model_state"] = ml_service.load_state
+        startup["peak_rss_mb"] = peak_rss_mb()
+
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        )
+        state = {}
+        for name in names:
+            print(f"Running {name}...", file=sys.__stdout__, flush=True)
+            results.append(await run_scenario(client, name, upstream, state))
+    quiet.close()
+    return startup, results
+
+
+if args.list:
+    for name, (method, path, _) in SCENARIOS.items():
+        print(f"{name:<28} {method:<5} {path}")
+    exit(0)
+
+names = list(SCENARIOS) if args.scenarios == "all" else [n.strip() for n in args.scenarios.split(",") if n.strip()]
+unknown = [n for n in names if n not in SCENARIOS]
+if unknown:
+    print(f"Error: unknown scenario(s) {', '.join(unknown)}; use --list")
+    exit(1)
+
+print(f"{args.requests} requests per scenario, concurrency {args.concurrency}, "
+      f"upstream latency {args.upstream_latency_ms:g} ms")
+try:
+    startup, results = asyncio.run(main(names))
+finally:
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+print()
+print(f"Startup: {startup['seconds']:.2f}s, model {startup['model_state']} after {startup['ready_seconds']:.2f}s, "
+      f"peak RSS {startup['peak_rss_mb']} MB")
+print_table(results, [
+    ("scenario", "scenario", 28), ("rps", "req/s", 9), ("p50_ms", "p50 ms", 9), ("p95_ms", "p95 ms", 9),
+    ("p99_ms", "p99 ms", 9), ("errors", "errors", 7), ("peak_rss_mb", "peak MB", 8),
+])
+
+if args.output:
+    write_report(args.output, {
+        "benchmark": "api",
+        "environment": environment(args),
+        "startup": startup,
+        "scenarios": results,
+    })
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Make `app.*` and `benchmarks.*` importable when run as `python benchmarks/bench_predict.py`
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))
+
+from benchmarks.common import random_ride, summarize, peak_rss_mb, current_rss_mb, environment, print_table, write_report
+
+# Micro-benchmark of MLService inference without the HTTP layer: predict_base_fare for
+# one ride and predict_base_fares for batches of increasing size. The prediction cache
+# is off unless --cache is given, so every call reaches the encoder and the model.
+
+parser = argparse.ArgumentParser(description="Benchmark MLService.predict_base_fare(s) by batch size.")
+parser.add_argument("--batch-sizes", default="1,10,100,1000,10000",
+                    help="comma separated batch sizes; 1 uses predict_base_fare (default: 1,10,100,1000,10000)")
+parser.add_argument("--rows", type=int, default=20000,
+                    help="approximate rides predicted per batch size, at least 5 calls each (default: 20000)")
+parser.add_argument("--engine", default=None, help="ML_ENGINE to load (default: the environment's, else auto)")
+parser.add_argument("--cache", action="store_true", help="keep the prediction cache on (PREDICTION_CACHE_SIZE)")
+parser.add_argument("--seed", type=int, default=0, help="random seed for the rides")
+parser.add_argument("--output", default=None, help="write the JSON report to this path")
+args = parser.parse_args()
+
+# MLService reads its settings when the singleton is created
+if args.engine:
+    os.environ["ML_ENGINE"] = args.engine
+if not args.cache:
+    os.environ["PREDICTION_CACHE_SIZE"] = "0"
+
+from app.services.ml_service import ml_service
+
+batch_sizes = [int(v) for v in args.batch_sizes.split(",") if v.strip()]
+rng = np.random.default_rng(args.seed)
+rides = [random_ride(rng) for _ in range(max(batch_sizes) * 5)]
+
+print("Loading model...")
+start = time.perf_counter()
+ml_service.load_model()
+load_seconds = time.perf_counter() - start
+print(f"Engine: {ml_service.engine}, loaded in {load_seconds:.2f}s")
+
+results = []
+for size in batch_sizes:
+    calls = max(5, args.rows // size)
+    batches = [[rides[(i * size + j) % len(rides)] for j in range(size)] for i in range(calls)]
+    if size == 1:
+        predict = lambda batch: ml_service.predict_base_fare(batch[0])
+    else:
+        predict = ml_service.predict_base_fares
+
+    predict(batches[0])  # warm-up
+    samples = []
+    wall = time.perf_counter()
+    for batch in batches:
+        start = time.perf_counter()
+        predict(batch)
+        samples.append((time.perf_counter() - start) * 1000)
+    wall = time.perf_counter() - wall
+
+    summary = summarize(samples, wall)
+    results.append({
+        "batch_size": size,
+        "method": "predict_base_fare" if size == 1 else "predict_base_fares",
+        "calls": summary.pop("count"),
+        **summary,
+        "rows_per_second": round(calls * size / wall, 1),
+        "us_per_row": round(wall / (calls * size) * 1e6, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_mb": current_rss_mb(),
+    })
+
+print()
+print_table(results, [
+    ("batch_size", "batch", 7), ("calls", "calls", 7), ("p50_ms", "p50 ms", 9), ("p95_ms", "p95 ms", 9),
+    ("p99_ms", "p99 ms", 9), ("rows_per_second", "rows/s", 11), ("us_per_row", "us/row", 8),
+    ("peak_rss_mb", "peak MB", 8),
+])
+
+if args.output:
+    write_report(args.output, {
+        "benchmark": "predict",
+        "environment": environment(args),
+        "engine": ml_service.engine,
+        "model_version": ml_service.model_version,
+        "load_seconds": round(load_seconds, 3),
+        "cache": args.cache,
+        "batches": results,
+    })
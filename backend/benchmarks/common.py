@@ -0,0 +1,114 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Shared helpers for the benchmark scripts: input generators, latency summaries and
+# the JSON report. Reports are flat and key-sorted so two runs can be diffed directly.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+# Values the trained model knows (see data/dynamic_pricing_rides_dataset.csv)
+CATEGORIES = {
+    "ride_type": ["Bike", "Taxi"],
+    "time_of_day": ["Early Morning", "Morning", "Afternoon", "Evening", "Night"],
+    "day_type": ["Weekday", "Weekend"],
+    "demand_level": ["Low", "Medium", "High", "Very High"],
+    "traffic_condition": ["Light", "Moderate", "Heavy"],
+    "weather_condition": ["Clear", "Cloudy", "Rainy", "Storm"],
+    "pickup_zone": ["Airport", "Commercial", "IT Park", "Metro Station", "Residential"],
+}
+
+
+def random_ride(rng) -> dict:
+    """A /api/predict body with random categories and a 1-40 km distance."""
+    ride = {col: values[rng.integers(len(values))] for col, values in CATEGORIES.items()}
+    ride["distance"] = round(float(rng.uniform(1, 40)), 2)
+    return ride
+
+
+def summarize(samples_ms, wall_seconds: float = None) -> dict:
+    """Latency percentiles in ms (and throughput when the wall time is known)."""
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if len(samples) == 0:
+        return {"count": 0}
+    summary = {
+        "count": int(len(samples)),
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "max_ms": round(float(samples.max()), 4),
+    }
+    if wall_seconds:
+        summary["rps"] = round(len(samples) / wall_seconds, 2)
+    return summary
+
+
+def peak_rss_mb():
+    """High-water mark of this process; it only grows, so compare it across a run's stages."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def current_rss_mb():
+    """Resident set size right now (Linux only)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def environment(args) -> dict:
+    """What the numbers were measured on, stored with every report."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ml_engine": os.getenv("ML_ENGINE", "auto"),
+        "args": vars(args),
+    }
+
+
+def print_table(results: list, columns: list):
+    """columns: (key, title, width); the first column is left aligned."""
+    print(" ".join(f"{title:>{width}}" if i else f"{title:<{width}}" for i, (_, title, width) in enumerate(columns)))
+    for result in results:
+        cells = []
+        for i, (key, _, width) in enumerate(columns):
+            value = result.get(key)
+            if value is None:
+                value = "-"
+            elif isinstance(value, float):
+                value = f"{value:.0f}" if abs(value) >= 1000 else f"{value:.4g}"
+            cells.append(f"{value:>{width}}" if i else f"{value:<{width}}")
+        print(" ".join(cells))
+
+
+def write_report(path: str, report: dict):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4, sort_keys=True)
+    print(f"Report saved to {path}")
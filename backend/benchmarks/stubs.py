@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+import httpx
+
+# In-process stand-ins for the external providers (ORS, Nominatim, OSRM, OpenWeather).
+# Responses have the providers' shapes and are deterministic per place / coordinate
+# pair, so the geocode, route and weather caches behave as they would in production.
+# An optional latency and failure rate simulate a slow or flaky upstream.
+
+# Coimbatore, where the default geocode boundary points
+CENTER = (11.0168, 76.9558)
+WEATHER = ["Clear", "Clouds", "Rain", "Drizzle", "Thunderstorm", "Mist"]
+
+
+def _fraction(text: str) -> float:
+    """Stable value in [0, 1) for a string."""
+    return int(hashlib.md5(text.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+
+def place_coords(place: str):
+    """(lat, lon) within roughly 15 km of the city centre."""
+    return (
+        round(CENTER[0] + (_fraction(place + ":lat") - 0.5) * 0.27, 6),
+        round(CENTER[1] + (_fraction(place + ":lon") - 0.5) * 0.27, 6),
+    )
+
+
+def _road_route(start, end):
+    """(metres, seconds): straight line plus 30% detour at 25 km/h."""
+    dlat = math.radians(end[0] - start[0])
+    dlon = math.radians(end[1] - start[1])
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(start[0])) * math.cos(math.radians(end[0])) * math.sin(dlon / 2) ** 2
+    metres = max(6371000 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)) * 1.3, 300.0)
+    return metres, metres / (25 / 3.6)
+
+
+def _lon_lat(value: str):
+    lon, lat = value.split(",")
+    return float(lat), float(lon)
+
+
+class Upstream:
+    def __init__(self, latency_ms: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._n = 0
+
+    def _fails(self) -> bool:
+        # Every k-th call fails, so runs with the same settings see the same failures
+        if self.failure_rate <= 0:
+            return False
+        with self._lock:
+            self._n += 1
+            return (self._n * self.failure_rate) % 1 < self.failure_rate
+
+    def respond(self, url: str, params: dict):
+        """(status, JSON body) for a provider request."""
+        parts = urlsplit(url)
+        host, path = parts.netloc, parts.path
+        if host == "api.openrouteservice.org" and path.startswith("/geocode"):
+            provider = "ors_geocode"
+        elif host == "api.openrouteservice.org":
+            provider = "ors_directions"
+        elif host == "nominatim.openstreetmap.org":
+            provider = "nominatim"
+        elif host == "router.project-osrm.org":
+            provider = "osrm"
+        elif host == "api.openweathermap.org":
+            provider = "openweather"
+        else:
+            return 404, {"error": f"no stub for {host}"}
+
+        with self._lock:
+            self.calls[provider] += 1
+        if self._fails():
+            return 503, {"error": "simulated upstream failure"}
+
+        if provider == "ors_geocode":
+            lat, lon = place_coords(params["text"])
+            return 200, {"features": [{"geometry": {"coordinates": [lon, lat]}}]}
+        if provider == "nominatim":
+            lat, lon = place_coords(params["q"])
+            return 200, [{"lat": str(lat), "lon": str(lon)}]
+        if provider == "ors_directions":
+            metres, seconds = _road_route(_lon_lat(params["start"]), _lon_lat(params["end"]))
+            return 200, {"features": [{"properties": {"segments": [{"distance": metres, "duration": seconds}]}}]}
+        if provider == "osrm":
+            start, end = path.rsplit("/", 1)[-1].split(";")
+            metres, seconds = _road_route(_lon_lat(start), _lon_lat(end))
+            return 200, {"routes": [{"distance": metres, "duration": seconds}]}
+        key = params.get("q") or f"{params.get('lat')},{params.get('lon')}"
+        return 200, {"weather": [{"main": WEATHER[int(_fraction(key) * len(WEATHER))]}]}
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        """httpx.MockTransport handler for the shared AsyncClient."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        status, body = self.respond(str(request.url.copy_with(query=None)), dict(request.url.params))
+        return httpx.Response(status, json=body)
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        """Stand-in for requests.get in the synchronous code paths."""
+        if self.latency:
+            time.sleep(self.latency)
+        query = dict(httpx.URL(url).params)
+        query.update({k: str(v) for k, v in (params or {}).items()})
+        status, body = self.respond(str(httpx.URL(url).copy_with(query=None)), query)
+        return httpx.Response(status, json=body)
+
+
+def install(upstream: Upstream):
+    """
+    Route every provider call to `upstream`. Call before the app's lifespan starts:
+    the lifespan keeps an already-created shared client.
+    """
+    from app.core import http_clients
+    from app.services import location_service, weather_service
+
+    http_clients._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(upstream.handle), timeout=http_clients.HTTP_TIMEOUT,
+    )
+    stub_requests = SimpleNamespace(get=upstream.get)
+    location_service.requests = stub_requests
+    weather_service.requests = stub_requests
+    # Real keys are never sent anywhere, but they switch on the provider code paths
+    location_service.ORS_API_KEY = "benchmark"
+    weather_service.API_KEY = "benchmark"
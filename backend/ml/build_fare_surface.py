@@ -0,0 +1,28 @@
+import os
+import sys
+import time
+
+# Make `app.*` importable when run as `python ml/build_fare_surface.py`
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))
+
+# Prebuild the fare table for ML_ENGINE=surface so API workers only have to load it.
+# Honours ML_SURFACE_STEP / ML_SURFACE_TOLERANCE / ML_SURFACE_PATH like the API does.
+os.environ["ML_ENGINE"] = "surface"
+
+from app.services.ml_service import MLService
+
+service = MLService()
+print(f"Building fare surface in {service.surface_path} (step {service.surface_step} km)...")
+start = time.perf_counter()
+service.load_model()
+if service.surface is None:
+    print("Error: fare surface could not be built or exceeds its error bounds (see log).")
+    exit(1)
+
+surface = service.surface
+print(f"Combinations: {surface.table.shape[0]}, knots: {surface.n_knots} ({surface.start:g} to {surface.end:g} km)")
+print(f"Table size: {surface.nbytes / 1024 / 1024:.2f} MB")
+print(f"Max abs error: {surface.max_error:.4f}, p99: {surface.p99_error:.4f}")
+print(f"Answered from the table: {surface.coverage:.1%} of rides (the rest go to the model)")
+print(f"Done in {time.perf_counter() - start:.1f}s.")
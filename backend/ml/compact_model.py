@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+
+# Make `app.*` importable when run as `python ml/compact_model.py`
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))
+
+from app.core import artifact_store
+from app.core.compiled_forest import CompiledForest
+from app.core.fast_encoder import FastEncoder
+
+# Builds smaller variants of the trained forest and measures each one:
+# accuracy on the held-out split, artifact size, load time and predict latency.
+# Pick a candidate from the report and install it with --install NAME.
+
+parser = argparse.ArgumentParser(description="Compare compacted variants of the trained forest.")
+parser.add_argument("--data", default=os.path.join(script_dir, '../data/dynamic_pricing_rides_dataset.csv'),
+                    help="CSV the model was trained on (the held-out split is rebuilt as in train_model.py)")
+parser.add_argument("--test-size", type=float, default=0.2, help="held-out fraction used by train_model.py")
+parser.add_argument("--chunk-size", type=int, default=100000, help="rows per CSV chunk")
+parser.add_argument("--max-eval-rows", type=int, default=50000, help="cap on held-out rows to score")
+parser.add_argument("--selection-rows", type=int, default=5000,
+                    help="training rows used to choose which trees to keep")
+parser.add_argument("--trees", default="50,25,10", help="tree counts to try (comma separated)")
+parser.add_argument("--depths", default="10,8,6", help="depth limits to try (comma separated)")
+parser.add_argument("--merge", default="1,5", help="leaf merge tolerances in fare units (comma separated)")
+parser.add_argument("--batch-size", type=int, default=256, help="rows per batch latency sample")
+parser.add_argument("--out-dir", default=os.path.join(script_dir, 'compact_candidates'),
+                    help="where candidate artifacts are written")
+parser.add_argument("--report", default=os.path.join(script_dir, 'compaction_report.json'),
+                    help="JSON report path")
+parser.add_argument("--install", default=None, metavar="NAME",
+                    help="also write candidate NAME to ml/model_arrays for serving")
+args = parser.parse_args()
+
+model_path = os.path.join(script_dir, 'model.pkl')
+preprocessor_path = os.path.join(script_dir, 'preprocessor.pkl')
+arrays_path = os.path.join(script_dir, 'model_arrays')
+
+
+def parse_list(value, kind):
+    return [kind(v) for v in value.split(",") if v.strip()]
+
+
+def dir_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def timed_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def latency(predict, X, batch_size):
+    """p50/p99 in ms for single rows and for batches of `batch_size` rows."""
+    predict(X[:1])  # warm-up
+    n = min(len(X), 500)
+    single = []
+    for i in range(n):
+        row = X[i:i + 1]
+        start = time.perf_counter()
+        predict(row)
+        single.append((time.perf_counter() - start) * 1000)
+
+    batch = X[:batch_size]
+    batched = timed_ms(lambda: predict(batch), 50)
+    return {
+        "single_p50_ms": round(float(np.percentile(single, 50)), 4),
+        "single_p99_ms": round(float(np.percentile(single, 99)), 4),
+        "batch_size": len(batch),
+        "batch_p50_ms": round(float(np.percentile(batched, 50)), 4),
+        "batch_p99_ms": round(float(np.percentile(batched, 99)), 4),
+    }
+
+
+def accuracy(y_true, y_pred):
+    return {
+        "r2_score": round(float(r2_score(y_true, y_pred)), 4),
+        "mae": round(float(mean_absolute_error(y_true, y_pred)), 4),
+        "rmse": round(float(np.sqrt(mean_squared_error(y_true, y_pred))), 4),
+    }
+
+
+def greedy_tree_order(forest, X, y):
+    """Trees in the order that most reduces squared error of the running average (forward selection)."""
+    outputs = forest.tree_predictions(X)
+    total = np.zeros(len(y))
+    remaining = list(range(forest.n_trees))
+    order = []
+    for k in range(1, forest.n_trees + 1):
+        errors = (((total[None, :] + outputs[remaining]) / k - y[None, :]) ** 2).mean(axis=1)
+        best = remaining.pop(int(np.argmin(errors)))
+        order.append(best)
+        total += outputs[best]
+    return order
+
+
+# 1. Load the trained model
+print("Loading model...")
+if os.path.exists(model_path):
+    sklearn_model = joblib.load(model_path)
+    forest = CompiledForest.from_sklearn(sklearn_model)
+elif artifact_store.resolve(arrays_path) is not None:
+    sklearn_model = None
+    forest = CompiledForest.load(arrays_path, mmap_mode=None)
+else:
+    print("Error: no trained model found. Run train_model.py first.")
+    exit(1)
+preprocessor = joblib.load(preprocessor_path)
+encoder = FastEncoder.from_column_transformer(preprocessor)
+print(f"Trees: {forest.n_trees}, nodes: {forest.n_nodes}, max depth: {forest.max_depth}")
+
+# 2. Rebuild train_model.py's split (same seeded per-row draw) and encode
+print(f"Loading held-out rows from {args.data}...")
+features = list(preprocessor.feature_names_in_)
+rng = np.random.default_rng(42)
+X_parts, y_parts, sel_X_parts, sel_y_parts = [], [], [], []
+n_eval = n_sel = 0
+for chunk in pd.read_csv(args.data, chunksize=args.chunk_size):
+    chunk = chunk.rename(columns={'distance_km': 'distance', 'final_fare': 'fare'})
+    test_mask = rng.random(len(chunk)) < args.test_size
+    if n_eval < args.max_eval_rows:
+        test = chunk[test_mask].iloc[:args.max_eval_rows - n_eval]
+        X_parts.append(encoder.transform_frame(test[features], out=np.empty((len(test), encoder.n_features), np.float32)))
+        y_parts.append(test['fare'].to_numpy(dtype=np.float64))
+        n_eval += len(test)
+    if n_sel < args.selection_rows:
+        train = chunk[~test_mask].iloc[:args.selection_rows - n_sel]
+        sel_X_parts.append(encoder.transform_frame(train[features], out=np.empty((len(train), encoder.n_features), np.float32)))
+        sel_y_parts.append(train['fare'].to_numpy(dtype=np.float64))
+        n_sel += len(train)
+    if n_eval >= args.max_eval_rows and n_sel >= args.selection_rows:
+        break
+X_test, y_test = np.concatenate(X_parts), np.concatenate(y_parts)
+X_sel, y_sel = np.concatenate(sel_X_parts), np.concatenate(sel_y_parts)
+print(f"Scoring on {len(y_test)} held-out rows, selecting trees on {len(y_sel)} training rows")
+
+# 3. Build candidates
+print("Building candidates...")
+order = greedy_tree_order(forest, X_sel, y_sel)
+tree_counts = [k for k in parse_list(args.trees, int) if 0 < k < forest.n_trees]
+depths = [d for d in parse_list(args.depths, int) if 0 < d < forest.max_depth]
+
+candidates = {"full": forest, "float32": forest.astype(np.float32)}
+for k in tree_counts:
+    candidates[f"trees-{k}"] = forest.select_trees(order[:k])
+for d in depths:
+    candidates[f"depth-{d}"] = forest.truncate(d)
+for tol in parse_list(args.merge, float):
+    candidates[f"merge-{tol:g}"] = forest.merge_leaves(tol)
+if tree_counts and depths:
+    # Everything at once, at the mildest setting of each
+    candidates[f"trees-{max(tree_counts)}+depth-{max(depths)}+float32"] = (
+        forest.select_trees(order[:max(tree_counts)]).truncate(max(depths)).astype(np.float32)
+    )
+
+# 4. Measure
+results = []
+if sklearn_model is not None:
+    print("Measuring sklearn...")
+    results.append({
+        "name": "sklearn",
+        "trees": forest.n_trees,
+        "nodes": forest.n_nodes,
+        "max_depth": forest.max_depth,
+        **accuracy(y_test, sklearn_model.predict(X_test)),
+        "artifact_bytes": dir_size(model_path),
+        "load_ms": round(float(np.median(timed_ms(lambda: joblib.load(model_path), 3))), 2),
+        "load_mmap_ms": None,
+        **latency(sklearn_model.predict, X_test, args.batch_size),
+    })
+
+for name, candidate in candidates.items():
+    print(f"Measuring {name}...")
+    # save() returns the version directory it wrote (see app/core/artifact_store.py)
+    path = candidate.save(os.path.join(args.out_dir, name))
+    results.append({
+        "name": name,
+        "trees": candidate.n_trees,
+        "nodes": candidate.n_nodes,
+        "max_depth": candidate.max_depth,
+        **accuracy(y_test, candidate.predict(X_test)),
+        "artifact_bytes": dir_size(path),
+        "load_ms": round(float(np.median(timed_ms(lambda: CompiledForest.load(path, mmap_mode=None), 5))), 2),
+        "load_mmap_ms": round(float(np.median(timed_ms(lambda: CompiledForest.load(path, mmap_mode="r"), 5))), 2),
+        **latency(candidate.predict, X_test, args.batch_size),
+    })
+
+# 5. Report
+columns = [
+    ("name", "candidate", 34), ("r2_score", "R2", 7), ("mae", "MAE", 9), ("rmse", "RMSE", 9),
+    ("artifact_bytes", "size KB", 9), ("load_ms", "load ms", 8), ("single_p50_ms", "1-row p50", 10),
+    ("single_p99_ms", "1-row p99", 10), ("batch_p50_ms", "batch p50", 10), ("batch_p99_ms", "batch p99", 10),
+]
+print()
+print(" ".join(f"{title:>{width}}" if i else f"{title:<{width}}" for i, (_, title, width) in enumerate(columns)))
+for result in results:
+    cells = []
+    for i, (key, _, width) in enumerate(columns):
+        value = result[key]
+        if key == "artifact_bytes":
+            value = f"{value / 1024:.0f}"
+        elif isinstance(value, float):
+            value = f"{value:.4g}" if key.endswith("_ms") else f"{value:.4f}"
+        cells.append(f"{value:>{width}}" if i else f"{value:<{width}}")
+    print(" ".join(cells))
+print(f"\nLatencies in ms; batch = {args.batch_size} rows.")
+
+with open(args.report, 'w') as f:
+    json.dump({"eval_rows": len(y_test), "candidates": results}, f, indent=4)
+print(f"Report saved to {args.report}")
+
+if args.install:
+    if args.install not in candidates:
+        print(f"Error: unknown candidate {args.install!r}; choose from {', '.join(candidates)}")
+        exit(1)
+    # Published as a new version: workers serving the current arrays keep their
+    # mapped files and pick this one up on their next reload
+    print(f"Installing {args.install} to {arrays_path}...")
+    installed = candidates[args.install].save(arrays_path)
+    print(f"Installed as version {os.path.basename(installed)}.")
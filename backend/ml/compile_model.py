@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+# Make `app.*` importable when run as `python ml/compile_model.py`
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))
+
+from app.core.compiled_forest import CompiledForest
+
+model_path = os.path.join(script_dir, 'model.pkl')
+preprocessor_path = os.path.join(script_dir, 'preprocessor.pkl')
+data_path = os.path.join(script_dir, '../data/dynamic_pricing_rides_dataset.csv')
+output_path = os.path.join(script_dir, 'model_arrays')
+
+# 1. Load the trained forest
+print(f"Loading model from {model_path}...")
+if not os.path.exists(model_path):
+    print("Error: model.pkl not found. Run train_model.py first.")
+    exit(1)
+model = joblib.load(model_path)
+preprocessor = joblib.load(preprocessor_path)
+
+# 2. Pack into flat arrays
+print("Compiling forest...")
+compiled = CompiledForest.from_sklearn(model)
+print(f"Trees: {compiled.n_trees}, nodes: {compiled.n_nodes}, max depth: {compiled.max_depth}")
+print(f"Packed size: {compiled.nbytes / 1024 / 1024:.2f} MB")
+
+# 3. Verify against sklearn on real rows before writing anything
+print("Verifying predictions against sklearn...")
+df = pd.read_csv(data_path, nrows=5000).rename(columns={'distance_km': 'distance'})
+X = preprocessor.transform(df[list(preprocessor.feature_names_in_)])
+expected = model.predict(X)
+actual = compiled.predict(X)
+max_err = float(np.max(np.abs(expected - actual)))
+print(f"Max abs difference: {max_err:.3e}")
+if not np.allclose(expected, actual, rtol=0, atol=1e-9):
+    print("Error: compiled forest does not match sklearn predictions.")
+    exit(1)
+
+# 4. Single-row latency comparison
+row = X[:1]
+for name, fn in [("sklearn", model.predict), ("compiled", compiled.predict)]:
+    fn(row)
+    start = time.perf_counter()
+    for _ in range(200):
+        fn(row)
+    print(f"{name} single-row latency: {(time.perf_counter() - start) / 200 * 1e6:.1f} us")
+
+# 5. Save
+print(f"Saving compiled model to {output_path}...")
+compiled.save(output_path)
+print("Compilation completed successfully.")
@@ -1,40 +1,41 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 import joblib
+import json
 import os
+import sys
+import argparse
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Training streams the data twice in chunks and never builds a full DataFrame:
+#   pass 1 collects categories, row counts and the distance scaler statistics,
+#   pass 2 encodes each chunk straight into preallocated float32 train/test matrices.
+# Peak memory is roughly the encoded matrices plus one chunk, whatever the file size.
 
-# 1. Load Data
-# Construct path relative to this script ensuring it works from anywhere
 script_dir = os.path.dirname(os.path.abspath(__file__))
-data_path = os.path.join(script_dir, '../data/dynamic_pricing_rides_dataset.csv')
+sys.path.insert(0, os.path.dirname(script_dir))
+from app.core.fast_encoder import FastEncoder
+from app.core.compiled_forest import CompiledForest
 
-print(f"Loading data from {data_path}...")
-try:
-    df = pd.read_csv(data_path)
-    print(f"Columns in dataset: {df.columns.tolist()}")
-    
-    # Rename columns to match user requirements
-    # Dataset has 'distance_km' and 'final_fare' -> map to 'distance' and 'fare'
-    rename_map = {}
-    if 'distance_km' in df.columns:
-        rename_map['distance_km'] = 'distance'
-    if 'final_fare' in df.columns:
-        rename_map['final_fare'] = 'fare'
-    
-    if rename_map:
-        print(f"Renaming columns: {rename_map}")
-        df.rename(columns=rename_map, inplace=True)
-        
-except FileNotFoundError:
-    print(f"Error: Dataset not found at {data_path}")
-    exit(1)
+parser = argparse.ArgumentParser(description="Train the fare model.")
+parser.add_argument("--data", default=os.path.join(script_dir, '../data/dynamic_pricing_rides_dataset.csv'),
+                    help="training data: a CSV file, a Parquet file or a directory of Parquet files")
+parser.add_argument("--include-archive", action="store_true",
+                    help="also train on archived predictions (see app/services/archive_service.py)")
+parser.add_argument("--archive-dir", default=None, help="archive directory (default: ARCHIVE_DIR)")
+parser.add_argument("--chunk-size", type=int, default=100000, help="rows per chunk (default: 100000)")
+parser.add_argument("--test-size", type=float, default=0.2, help="fraction of rows held out (default: 0.2)")
+args = parser.parse_args()
 
-# 2. Define Features and Target
+# 1. Define Features and Target
 target = 'fare'
 
 categorical_features = [
@@ -49,53 +50,172 @@ categorical_features = [
 
 numerical_features = ['distance']
 
-# Check if columns exist
-required_columns = categorical_features + numerical_features + [target]
-missing_columns = [col for col in required_columns if col not in df.columns]
-if missing_columns:
-    print(f"Error: Missing columns in dataset: {missing_columns}")
+# Dataset has 'distance_km' and 'final_fare' -> map to 'distance' and 'fare'
+rename_map = {'distance_km': 'distance', 'final_fare': 'fare'}
+
+# Explicit dtypes: categories instead of Python strings, float32 features
+dtypes = {col: 'category' for col in categorical_features}
+dtypes.update({'distance': np.float32, 'distance_km': np.float32, 'fare': np.float64, 'final_fare': np.float64})
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def report_memory(stage):
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"  peak RSS after {stage}: {peak:.1f} MB")
+
+
+def _normalize(frame):
+    frame = frame.rename(columns=rename_map)
+    for col, dtype in dtypes.items():
+        if col in frame.columns and frame[col].dtype != dtype:
+            frame[col] = frame[col].astype(dtype)
+    return frame
+
+
+def _parquet_files(path):
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names if name.endswith('.parquet')
+        )
+    return [path]
+
+
+def iter_chunks():
+    """Yield normalized DataFrame chunks from the training data (and the archive)."""
+    wanted = set(categorical_features + numerical_features + [target]) | set(rename_map)
+
+    if os.path.isdir(args.data) or args.data.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for path in _parquet_files(args.data):
+            parquet = pq.ParquetFile(path)
+            columns = [c for c in parquet.schema_arrow.names if c in wanted]
+            for batch in parquet.iter_batches(batch_size=args.chunk_size, columns=columns):
+                yield _normalize(batch.to_pandas())
+    else:
+        header = pd.read_csv(args.data, nrows=0).columns
+        usecols = [c for c in header if c in wanted]
+        for chunk in pd.read_csv(args.data, usecols=usecols, chunksize=args.chunk_size,
+                                 dtype={c: d for c, d in dtypes.items() if c in usecols}):
+            yield _normalize(chunk)
+
+    if args.include_archive:
+        from app.services import archive_service
+        columns = categorical_features + numerical_features + ['final_fare']
+        for batch in archive_service.iter_archive_batches(columns, args.chunk_size,
+                                                          args.archive_dir or archive_service.ARCHIVE_DIR):
+            yield _normalize(batch.to_pandas())
+
+
+def split_masks():
+    """Deterministic train/test assignment, one draw per row in file order."""
+    rng = np.random.default_rng(42)
+    for chunk in iter_chunks():
+        yield chunk, rng.random(len(chunk)) >= args.test_size
+
+
+# 2. Pass 1: categories, counts and scaler statistics
+print(f"Loading data from {args.data}" + (" and the prediction archive" if args.include_archive else "") + "...")
+categories = {col: set() for col in categorical_features}
+scaler = StandardScaler()
+n_train = n_test = 0
+try:
+    for chunk, train_mask in split_masks():
+        missing_columns = [col for col in categorical_features + numerical_features + [target]
+                           if col not in chunk.columns]
+        if missing_columns:
+            print(f"Error: Missing columns in dataset: {missing_columns}")
+            exit(1)
+
+        train = chunk[train_mask]
+        n_train += len(train)
+        n_test += len(chunk) - len(train)
+        if len(train):
+            # Scaler statistics in float64, as fit() would compute them
+            scaler.partial_fit(train[numerical_features].astype(np.float64))
+        for col in categorical_features:
+            categories[col].update(train[col].dropna().unique().tolist())
+except FileNotFoundError:
+    print(f"Error: Dataset not found at {args.data}")
     exit(1)
 
-X = df[categorical_features + numerical_features]
-y = df[target]
+if n_train == 0 or n_test == 0:
+    print(f"Error: Not enough rows to train ({n_train} train / {n_test} test)")
+    exit(1)
+print(f"Rows: {n_train} train / {n_test} test")
+report_memory("pass 1")
 
 # 3. Preprocessing
 print("Preprocessing data...")
-# Use OneHotEncoder for categorical features and StandardScaler for numerical feature
+# Use OneHotEncoder for categorical features and StandardScaler for numerical feature.
+# Categories are given explicitly, so fitting on a single row yields the full encoder;
+# the scaler fitted incrementally in pass 1 is then swapped in.
+category_lists = [sorted(categories[col]) for col in categorical_features]
 preprocessor = ColumnTransformer(
     transformers=[
         ('num', StandardScaler(), numerical_features),
-        ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), categorical_features)
+        ('cat', OneHotEncoder(categories=category_lists, handle_unknown='ignore', sparse_output=False),
+         categorical_features)
     ],
     verbose_feature_names_out=False
 )
+seed_row = pd.DataFrame({col: [cats[0]] for col, cats in zip(categorical_features, category_lists)})
+seed_row['distance'] = 0.0
+preprocessor.fit(seed_row[categorical_features + numerical_features])
+preprocessor.transformers_ = [
+    (name, scaler if name == 'num' else transformer, columns)
+    for name, transformer, columns in preprocessor.transformers_
+]
+encoder = FastEncoder.from_column_transformer(preprocessor)
+
+# 4. Pass 2: encode straight into preallocated arrays.
+# float32 is what the forest uses internally, so fit() makes no copy of X.
+X_train_processed = np.empty((n_train, encoder.n_features), dtype=np.float32)
+X_test_processed = np.empty((n_test, encoder.n_features), dtype=np.float32)
+y_train = np.empty(n_train, dtype=np.float64)
+y_test = np.empty(n_test, dtype=np.float64)
+scratch = np.empty((args.chunk_size, encoder.n_features), dtype=np.float32)
 
-# 4. Model
+train_pos = test_pos = 0
+for chunk, train_mask in split_masks():
+    encoded = encoder.transform_frame(chunk, out=scratch[:len(chunk)])
+    fares = chunk[target].to_numpy(dtype=np.float64)
+
+    k = int(train_mask.sum())
+    X_train_processed[train_pos:train_pos + k] = encoded[train_mask]
+    y_train[train_pos:train_pos + k] = fares[train_mask]
+    train_pos += k
+
+    k = len(chunk) - k
+    X_test_processed[test_pos:test_pos + k] = encoded[~train_mask]
+    y_test[test_pos:test_pos + k] = fares[~train_mask]
+    test_pos += k
+del scratch
+report_memory("encoding")
+
+# 5. Model
 # Optimized for size to avoid Git LFS and fit in memory-constrained cloud environments
 model = RandomForestRegressor(
-    n_estimators=100, 
-    max_depth=12, 
-    min_samples_leaf=5, 
+    n_estimators=100,
+    max_depth=12,
+    min_samples_leaf=5,
     random_state=42,
     n_jobs=-1 # Faster training
 )
 
-# 5. Train-Test Split
-print("Splitting data...")
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Fit preprocessor on training data
-print("Fitting preprocessor...")
-X_train_processed = preprocessor.fit_transform(X_train)
-X_test_processed = preprocessor.transform(X_test)
-
 # Train the model
 print("Training RandomForestRegressor...")
 model.fit(X_train_processed, y_train)
-
-import json
-
-# ... (previous code)
+report_memory("training")
 
 # 6. Evaluation Metrics
 print("Evaluating model...")
@@ -131,4 +251,14 @@ metrics_data = {
 with open(metrics_output_path, 'w') as f:
     json.dump(metrics_data, f, indent=4)
 
+# 8. Export memory-mappable arrays for serving (see app/core/compiled_forest.py)
+arrays_output_path = os.path.join(script_dir, 'model_arrays')
+print(f"Exporting compiled model arrays to {arrays_output_path}...")
+compiled = CompiledForest.from_sklearn(model)
+if not np.allclose(compiled.predict(X_test_processed), y_pred, rtol=0, atol=1e-9):
+    print("Error: compiled forest does not match sklearn predictions.")
+    exit(1)
+compiled.save(arrays_output_path)
+
+report_memory("export")
 print("Training pipeline completed successfully.")
@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+# Tests import the app the way the scripts in ml/ and benchmarks/ do, and run against
+# a throwaway SQLite database and archive folder; predictions.db is never opened.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix="fare-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'test.db')}"
+os.environ["ARCHIVE_DIR"] = os.path.join(WORK_DIR, "archive")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Create the tables once, as the app does on import of its routes."""
+    from app.database import Base, engine
+    # Importing the models registers their tables on Base
+    import app.models.geocode_cache
+    import app.models.prediction
+    Base.metadata.create_all(bind=engine)
+
+CATEGORIES = {
+    "ride_type": ["Bike", "Taxi"],
+    "time_of_day": ["Morning", "Afternoon", "Evening", "Night"],
+    "day_type": ["Weekday", "Weekend"],
+    "demand_level": ["Low", "Medium", "High"],
+    "traffic_condition": ["Light", "Moderate", "Heavy"],
+    "weather_condition": ["Clear", "Rainy", "Foggy", "Cloudy"],
+    "pickup_zone": ["Airport", "Residential", "IT Park", "General"],
+}
+
+
+def random_rides(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    rides = [{col: str(rng.choice(cats)) for col, cats in CATEGORIES.items()} for _ in range(n)]
+    for ride, distance in zip(rides, rng.uniform(0.5, 45.0, n)):
+        ride["distance"] = round(float(distance), 2)
+    return rides
+
+
+def train_artifacts(ml_dir: str, seed: int = 0, fare_scale: float = 1.0):
+    """
+    Small stand-in for ml/train_model.py's output: model.pkl, preprocessor.pkl and a
+    published compiled forest in ml_dir/model_arrays. Returns the fitted model.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+    from app.core.compiled_forest import CompiledForest
+    from app.services.ml_service import FEATURE_COLS
+
+    rides = random_rides(3000, seed)
+    frame = pd.DataFrame(rides, columns=FEATURE_COLS)
+    surcharge = {"Taxi": 30.0, "Bike": 0.0, "High": 25.0, "Heavy": 15.0, "Rainy": 10.0}
+    fares = np.array([
+        fare_scale * (40 + 11 * r["distance"] + sum(surcharge.get(r[c], 0.0) for c in CATEGORIES))
+        for r in rides
+    ])
+
+    preprocessor = ColumnTransformer(transformers=[
+        ("num", StandardScaler(), ["distance"]),
+        ("cat", OneHotEncoder(categories=list(CATEGORIES.values()), handle_unknown="ignore", sparse_output=False),
+         list(CATEGORIES)),
+    ]).fit(frame)
+    model = RandomForestRegressor(n_estimators=12, max_depth=9, random_state=seed)
+    model.fit(preprocessor.transform(frame), fares)
+
+    os.makedirs(ml_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(ml_dir, "model.pkl"))
+    joblib.dump(preprocessor, os.path.join(ml_dir, "preprocessor.pkl"))
+    CompiledForest.from_sklearn(model).save(os.path.join(ml_dir, "model_arrays"))
+    return model
+
+
+@pytest.fixture(scope="session")
+def trained_ml_dir(tmp_path_factory):
+    ml_dir = str(tmp_path_factory.mktemp("ml"))
+    train_artifacts(ml_dir)
+    return ml_dir
+
+
+def make_service(ml_dir: str, **settings):
+    """An MLService reading its artifacts from ml_dir instead of backend/ml."""
+    from app.services.ml_service import MLService
+
+    service = MLService()
+    service.model_path = os.path.join(ml_dir, "model.pkl")
+    service.preprocessor_path = os.path.join(ml_dir, "preprocessor.pkl")
+    service.compiled_model_path = os.path.join(ml_dir, "model_arrays")
+    service.surface_path = os.path.join(ml_dir, "fare_surface")
+    for name, value in settings.items():
+        setattr(service, name, value)
+    return service
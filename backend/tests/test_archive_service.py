@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+pytest.importorskip("pyarrow")
+
+from app.database import Base
+from app.models.prediction import Prediction
+from app.services import archive_service
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _fill(db, days=3, per_day=10):
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    rows = [
+        {
+            "ride_type": ["Taxi", "Bike"][i % 2],
+            "demand_level": ["Low", "High"][i % 2],
+            "time_of_day": "Morning",
+            "final_fare": 100.0 + i,
+            "created_at": today - timedelta(days=days + 1 - d, minutes=i),
+        }
+        for d in range(days) for i in range(per_day)
+    ]
+    rows.sort(key=lambda r: r["created_at"])
+    db.execute(insert(Prediction), rows)
+    # Today's rows stay in the table
+    db.execute(insert(Prediction), [{"ride_type": "Taxi", "final_fare": 1.0, "created_at": today}])
+    db.commit()
+    return rows
+
+
+def test_archive_moves_old_rows(db, tmp_path):
+    rows = _fill(db)
+    directory = str(tmp_path / "archive")
+    assert archive_service.archive_predictions(db, 1, chunk_size=7, directory=directory) == len(rows)
+    assert db.query(func.count(Prediction.id)).scalar() == 1
+
+    table = archive_service.read_archive(directory=directory)
+    assert sorted(table["final_fare"].to_pylist()) == sorted(r["final_fare"] for r in rows)
+    groups = archive_service.aggregate_archive(directory=directory)
+    assert sum(g[-2] for g in groups) == len(rows)
+    assert archive_service.archived_until(directory).date() == datetime.utcnow().date() - timedelta(days=1)
+    # Nothing left to do
+    assert archive_service.archive_predictions(db, 1, chunk_size=7, directory=directory) == 0
+
+
+@pytest.mark.parametrize("rerun_chunk_size", [10, 4, 100])
+def test_rerun_after_interrupted_run_archives_each_row_once(db, tmp_path, monkeypatch, rerun_chunk_size):
+    rows = _fill(db)
+    directory = str(tmp_path / "archive")
+
+    # Stop after the second chunk's files are written, before its delete commits
+    commits = []
+    real_commit = db.commit
+
+    def crashing_commit():
+        commits.append(1)
+        if len(commits) == 2:
+            raise RuntimeError("killed")
+        real_commit()
+
+    monkeypatch.setattr(db, "commit", crashing_commit)
+    with pytest.raises(RuntimeError):
+        archive_service.archive_predictions(db, 1, chunk_size=10, directory=directory)
+    db.rollback()
+    monkeypatch.setattr(db, "commit", real_commit)
+    assert db.query(func.count(Prediction.id)).scalar() == len(rows) + 1 - 10
+
+    archive_service.archive_predictions(db, 1, chunk_size=rerun_chunk_size, directory=directory)
+    ids = archive_service.read_archive(["id"], directory=directory)["id"].to_pylist()
+    assert len(ids) == len(set(ids)) == len(rows)
+    assert sum(g[-2] for g in archive_service.aggregate_archive(directory=directory)) == len(rows)
@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from app.core import artifact_store
+from app.core.compiled_forest import CompiledForest
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(7)
+    X = rng.random((2000, 6))
+    X[:, 3:] = X[:, 3:] > 0.5  # one-hot style columns, like the encoded rides
+    y = 40 + 300 * X[:, 0] ** 2 + 25 * X[:, 3] - 10 * X[:, 4] + rng.normal(0, 3, len(X))
+    model = RandomForestRegressor(n_estimators=30, max_depth=10, random_state=0).fit(X, y)
+    return model, rng.random((500, 6))
+
+
+def test_matches_sklearn_bit_for_bit(fitted):
+    model, X = fitted
+    forest = CompiledForest.from_sklearn(model)
+    batch = forest.predict(X)
+    assert np.array_equal(batch, model.predict(X))
+    # One row at a time gives exactly the batch result
+    single = np.array([forest.predict(row)[0] for row in X[:100]])
+    assert np.array_equal(single, batch[:100])
+
+
+def test_tree_predictions(fitted):
+    model, X = fitted
+    forest = CompiledForest.from_sklearn(model)
+    per_tree = forest.tree_predictions(X)
+    assert per_tree.shape == (30, len(X))
+    assert np.array_equal(per_tree[3], model.estimators_[3].predict(X))
+
+
+def test_save_publishes_new_versions(fitted, tmp_path):
+    model, X = fitted
+    forest = CompiledForest.from_sklearn(model)
+    directory = str(tmp_path / "model_arrays")
+    first = forest.save(directory)
+    mapped = CompiledForest.load(directory)
+    expected = mapped.predict(X)
+
+    # Saving again never touches the files the loaded forest has mapped
+    second = forest.select_trees(range(10)).save(directory)
+    assert first != second
+    assert artifact_store.resolve(directory) == second
+    assert np.array_equal(mapped.predict(X), expected)
+    assert CompiledForest.load(directory).n_trees == 10
+
+
+def test_load_without_published_version(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        CompiledForest.load(str(tmp_path / "missing"))
+
+
+def test_compaction_keeps_predictions_close(fitted):
+    model, X = fitted
+    forest = CompiledForest.from_sklearn(model)
+    reference = forest.predict(X)
+    assert np.allclose(forest.astype(np.float32).predict(X), reference, atol=1e-3)
+    assert np.array_equal(forest.merge_leaves(0.0).predict(X), reference)
+    assert forest.truncate(4).max_depth <= 4
+    assert forest.select_trees([0]).predict(X).tolist() == model.estimators_[0].predict(X).tolist()
@@ -0,0 +1,52 @@
+import asyncio
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.prediction_writer import prediction_writer
+
+WINDOW = {"from": "2024-01-01T00:00:00", "to": "2030-01-01T00:00:00"}
+
+
+def _log_prediction():
+    row = {"ride_type": "Taxi", "demand_level": "High", "time_of_day": "Evening", "final_fare": 123.0}
+    asyncio.run(prediction_writer.submit(row))
+
+
+def test_summary_revalidates_with_etag():
+    client = TestClient(app)
+    _log_prediction()
+    first = client.get("/api/dashboard/summary")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    cached = client.get("/api/dashboard/summary", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    # Weak and listed validators match too
+    assert client.get("/api/dashboard/summary", headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+    # A new prediction changes the data version
+    _log_prediction()
+    fresh = client.get("/api/dashboard/summary", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+
+
+def test_window_is_part_of_the_etag():
+    client = TestClient(app)
+    everything = client.get("/api/dashboard/summary").headers["etag"]
+    windowed = client.get("/api/dashboard/summary", params=WINDOW)
+    assert windowed.headers["etag"] != everything
+    assert client.get("/api/dashboard/summary", params={"from": "2030-01-01", "to": "2024-01-01"}).status_code == 400
+
+
+def test_summary_matches_the_individual_endpoints():
+    client = TestClient(app)
+    _log_prediction()
+    for params in ({}, WINDOW):
+        summary = client.get("/api/dashboard/summary", params=params).json()
+        assert summary["demand_trend"] == client.get("/api/dashboard/demand-trend", params=params).json()
+        assert summary["time_price"] == client.get("/api/dashboard/time-price", params=params).json()
+        assert summary["ride_distribution"] == client.get("/api/dashboard/ride-distribution", params=params).json()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from app.core.fast_encoder import FastEncoder
+
+CATEGORIES = {
+    "ride_type": ["Bike", "Taxi"],
+    "time_of_day": ["Morning", "Afternoon", "Evening", "Night"],
+    "weather_condition": ["Clear", "Rainy", "Cloudy"],
+}
+
+
+@pytest.fixture(scope="module")
+def preprocessor():
+    rng = np.random.default_rng(3)
+    frame = pd.DataFrame({
+        "distance": rng.gamma(2.0, 6.0, 500),
+        **{col: rng.choice(cats, 500) for col, cats in CATEGORIES.items()},
+    })
+    return ColumnTransformer(transformers=[
+        ("num", StandardScaler(), ["distance"]),
+        ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), list(CATEGORIES)),
+    ]).fit(frame)
+
+
+def _rides():
+    rng = np.random.default_rng(5)
+    rides = [
+        {"distance": float(d), **{col: str(rng.choice(cats)) for col, cats in CATEGORIES.items()}}
+        for d in rng.gamma(2.0, 6.0, 200)
+    ]
+    # Unknown categories encode as all zeros, as with handle_unknown='ignore'
+    rides.append({"distance": 3.3, "ride_type": "Auto", "time_of_day": "Dawn", "weather_condition": "Snow"})
+    return rides
+
+
+def test_transform_matches_column_transformer(preprocessor):
+    encoder = FastEncoder.from_column_transformer(preprocessor)
+    rides = _rides()
+    expected = preprocessor.transform(pd.DataFrame(rides))
+    assert np.array_equal(encoder.transform(rides), expected)
+    assert np.array_equal(encoder.transform_frame(pd.DataFrame(rides)), expected)
+    for i in (0, 17, len(rides) - 1):
+        assert np.array_equal(encoder.transform_one(rides[i]), expected[i:i + 1])
+
+
+def test_reuses_output_buffers(preprocessor):
+    encoder = FastEncoder.from_column_transformer(preprocessor)
+    rides = _rides()
+    out = np.full((1, encoder.n_features), 9.0)
+    encoder.transform_one(rides[0], out)
+    assert np.array_equal(out, preprocessor.transform(pd.DataFrame(rides[:1])))
+
+    # Training writes float32 slices of a preallocated matrix
+    matrix = np.empty((len(rides), encoder.n_features), dtype=np.float32)
+    encoder.transform_frame(pd.DataFrame(rides), matrix)
+    assert np.array_equal(matrix, preprocessor.transform(pd.DataFrame(rides)).astype(np.float32))
+
+
+def test_rejects_transformers_it_cannot_reproduce():
+    frame = pd.DataFrame({"distance": [1.0, 2.0], "ride_type": ["Bike", "Taxi"]})
+    dropping = ColumnTransformer(transformers=[
+        ("cat", OneHotEncoder(drop="first", sparse_output=False), ["ride_type"]),
+    ]).fit(frame)
+    with pytest.raises(ValueError):
+        FastEncoder.from_column_transformer(dropping)
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.main import app
+from app.models.prediction import Prediction
+
+# Rows in a window of their own, so other tests' predictions don't show up
+START = datetime(2001, 1, 1)
+END = START + timedelta(days=1)
+
+
+@pytest.fixture(scope="module")
+def ids():
+    rows = []
+    for i in range(23):
+        # Groups of three share a timestamp, so the id tie-break matters
+        rows.append({"ride_type": "Taxi", "final_fare": float(i), "created_at": START + timedelta(minutes=i // 3)})
+    db = SessionLocal()
+    try:
+        db.execute(insert(Prediction), rows)
+        db.commit()
+        found = db.query(Prediction.id, Prediction.created_at).filter(Prediction.created_at >= START, Prediction.created_at < END).all()
+    finally:
+        db.close()
+    return [r.id for r in sorted(found, key=lambda r: (r.created_at, r.id), reverse=True)]
+
+
+def _pages(client, limit, **params):
+    cursor = None
+    while True:
+        query = {"limit": limit, "from": START.isoformat(), "to": END.isoformat(), **params}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get("/api/predictions/history", params=query)
+        assert response.status_code == 200
+        body = response.json()
+        yield [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return
+
+
+@pytest.mark.parametrize("limit", [1, 4, 6, 23, 100])
+def test_pages_cover_every_row_once_newest_first(ids, limit):
+    client = TestClient(app)
+    pages = list(_pages(client, limit))
+    assert [i for page in pages for i in page] == ids
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_rows_written_meanwhile_do_not_shift_pages(ids):
+    client = TestClient(app)
+    pages = _pages(client, 5)
+    first = next(pages)
+    newer = Prediction(ride_type="Bike", final_fare=1.0, created_at=START + timedelta(hours=5))
+    db = SessionLocal()
+    try:
+        db.add(newer)
+        db.commit()
+        rest = [i for page in pages for i in page]
+        assert first + rest == ids
+    finally:
+        db.delete(newer)
+        db.commit()
+        db.close()
+
+
+def test_invalid_cursor():
+    response = TestClient(app).get("/api/predictions/history", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_startup_drops_the_old_created_at_index():
+    import importlib
+    from sqlalchemy import inspect, text
+    from app.database import engine
+    from app.routes import predict
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_predictions_created_at ON predictions (created_at)"))
+    # Startup (importing the routes) brings the indexes up to date
+    importlib.reload(predict)
+    names = {index["name"] for index in inspect(engine).get_indexes("predictions")}
+    assert "ix_predictions_created_at" not in names
+    assert "ix_predictions_created_at_ride_type" in names
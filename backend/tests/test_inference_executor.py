@@ -0,0 +1,18 @@
+import pytest
+
+from app.services import inference_executor as executor_module
+from app.services.inference_executor import InferenceExecutor
+
+
+@pytest.mark.parametrize("cpus", [1, 2, 8])
+def test_auto_is_a_thread_pool_on_any_cpu_count(monkeypatch, cpus):
+    monkeypatch.setattr(executor_module, "_available_cpus", lambda: cpus)
+    executor = InferenceExecutor("auto")
+    assert executor.mode == "thread"
+    assert executor.workers == cpus
+
+
+def test_inline_only_when_asked(monkeypatch):
+    monkeypatch.setattr(executor_module, "_available_cpus", lambda: 1)
+    assert InferenceExecutor("inline").mode == "inline"
+    assert InferenceExecutor("thread", workers=3).workers == 3
@@ -0,0 +1,99 @@
+import asyncio
+import uuid
+import httpx
+import pytest
+
+from benchmarks.stubs import Upstream
+from app.core import http_clients
+from app.services import geocode_cache, location_service
+
+
+class OrsMisses(Upstream):
+    """ORS knows none of the places; Nominatim and OSRM answer as usual."""
+
+    def respond(self, url, params):
+        if url.startswith(location_service.ORS_GEOCODE_URL):
+            self.calls["ors_geocode"] += 1
+            return 200, {"features": []}
+        return super().respond(url, params)
+
+
+class NothingFound(Upstream):
+    def respond(self, url, params):
+        if url.startswith(location_service.ORS_GEOCODE_URL):
+            self.calls["ors_geocode"] += 1
+            return 200, {"features": []}
+        if url.startswith(location_service.NOMINATIM_URL):
+            self.calls["nominatim"] += 1
+            return 200, []
+        return super().respond(url, params)
+
+
+@pytest.fixture
+def upstream(monkeypatch, request):
+    stub = request.param()
+    monkeypatch.setattr(location_service, "requests", stub)
+    monkeypatch.setattr(location_service, "ORS_API_KEY", "test")
+    monkeypatch.setattr(http_clients, "_client", httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)))
+    return stub
+
+
+def _places():
+    # Fresh names, so neither the geocode nor the route cache has seen them
+    tag = uuid.uuid4().hex[:8]
+    return f"pickup {tag}", f"drop {tag}"
+
+
+@pytest.mark.parametrize("upstream", [OrsMisses], indirect=True)
+def test_ors_miss_falls_back_to_nominatim(upstream):
+    pickup, drop = _places()
+    route, strategy = location_service._route_data(pickup, drop)
+    assert strategy == "osrm"
+    assert "note" not in route
+    assert upstream.calls["nominatim"] == 2
+    # The places were found after all, so they are cached as hits
+    assert geocode_cache.get(pickup)[1] is not None
+
+    # A second route between the same places (after the route cache expires) still works
+    other = f"{drop} again"
+    route, strategy = location_service._route_data(pickup, other)
+    assert strategy == "osrm"
+
+
+@pytest.mark.parametrize("upstream", [OrsMisses], indirect=True)
+def test_ors_miss_falls_back_to_nominatim_async(upstream):
+    pickup, drop = _places()
+    route, strategy = asyncio.run(location_service._route_data_async(pickup, drop))
+    assert strategy == "osrm"
+    assert "note" not in route
+    assert upstream.calls["nominatim"] == 2
+    assert asyncio.run(geocode_cache.get_async(drop))[1] is not None
+
+
+@pytest.mark.parametrize("upstream", [NothingFound], indirect=True)
+def test_miss_on_every_provider_is_cached(upstream):
+    pickup, drop = _places()
+    route, strategy = location_service._route_data(pickup, drop)
+    assert strategy == "default"
+    assert geocode_cache.get(pickup) == (True, None)
+
+    calls = dict(upstream.calls)
+    location_service._route_data(pickup, f"{drop} again")
+    # The known-bad pickup is answered from the cache on both strategies
+    assert upstream.calls == calls
+
+
+def test_geocode_cache_survives_a_restart(monkeypatch):
+    place, _ = _places()
+    geocode_cache.put(f"  {place.upper()} ", (11.01, 76.95))
+    # A new process starts with an empty memory tier
+    monkeypatch.setattr(geocode_cache, "_memory", geocode_cache.TTLCache(maxsize=16))
+    assert geocode_cache.get(place) == (True, (11.01, 76.95))
+    assert asyncio.run(geocode_cache.get_async(place)) == (True, (11.01, 76.95))
+
+
+def test_expired_geocode_entries_are_misses(monkeypatch):
+    place, _ = _places()
+    monkeypatch.setattr(geocode_cache, "GEOCODE_NEGATIVE_TTL", -1)
+    geocode_cache.put(place, None)
+    assert geocode_cache.get(place) == (False, None)
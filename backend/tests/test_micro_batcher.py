@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+import pytest
+
+from app.core.micro_batcher import MicroBatcher
+from app.services import inference_executor as executor_module
+from app.services.inference_executor import InferenceExecutor
+from conftest import make_service, random_rides, train_artifacts
+
+
+class Recorder:
+    """predict_many that records each batch and can be held open."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, group, items):
+        self.batches.append((group, list(items)))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError("model exploded")
+        return [item * 10 for item in items]
+
+
+def test_lone_request_goes_out_alone():
+    predict = Recorder()
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_wait=5)
+        return await asyncio.wait_for(batcher.submit(1), 1)
+
+    assert asyncio.run(scenario()) == 10
+    assert predict.batches == [(None, [1])]
+
+
+def test_requests_arriving_together_share_a_batch():
+    predict = Recorder()
+
+    async def scenario():
+        batcher = MicroBatcher(predict)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [i * 10 for i in range(10)]
+    assert len(predict.batches) == 1
+    assert (stats["batches"], stats["items"], stats["inflight"]) == (1, 10, 0)
+
+
+def test_requests_queue_behind_a_running_batch():
+    predict = Recorder(delay=0.05)
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_wait=1)
+        first = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.01)
+        later = [asyncio.ensure_future(batcher.submit(i)) for i in range(1, 6)]
+        await asyncio.gather(first, *later)
+
+    asyncio.run(scenario())
+    # The running batch finishing (not max_wait) sends the rest out together
+    assert [items for _, items in predict.batches] == [[0], [1, 2, 3, 4, 5]]
+
+
+def test_batches_are_split_by_size_and_group():
+    predict = Recorder()
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_size=4)
+        calls = [batcher.submit(i, group="v1") for i in range(6)] + [batcher.submit(i, group="v2") for i in range(2)]
+        await asyncio.gather(*calls)
+
+    asyncio.run(scenario())
+    sizes = sorted((group, len(items)) for group, items in predict.batches)
+    assert sizes == [("v1", 2), ("v1", 4), ("v2", 2)]
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    predict = Recorder(fail=True)
+
+    async def scenario():
+        batcher = MicroBatcher(predict)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelled_callers_are_skipped():
+    predict = Recorder(delay=0.05)
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_wait=1)
+        running = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.01)
+        gone = asyncio.ensure_future(batcher.submit(1))
+        kept = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        gone.cancel()
+        return await asyncio.gather(running, kept)
+
+    assert asyncio.run(scenario()) == [0, 20]
+    assert [items for _, items in predict.batches] == [[0], [2]]
+
+
+def test_stop_sends_pending_items_and_waits():
+    predict = Recorder(delay=0.02)
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_wait=10)
+        first = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.005)
+        second = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0)
+        await batcher.stop()
+        assert first.done() and second.done()
+        assert batcher.stats()["inflight"] == 0 and not batcher._tasks
+        return first.result(), second.result()
+
+    assert asyncio.run(scenario()) == (0, 10)
+
+
+@pytest.fixture
+def ml_dir(tmp_path):
+    ml_dir = str(tmp_path / "ml")
+    train_artifacts(ml_dir)
+    return ml_dir
+
+
+@pytest.fixture
+def service(ml_dir, monkeypatch):
+    service = make_service(ml_dir)
+    service.load_model()
+    executor = InferenceExecutor("thread", workers=2)
+    monkeypatch.setattr(executor_module, "ml_service", service)
+    monkeypatch.setattr(executor_module, "inference_executor", executor)
+    yield service
+    executor.shutdown()
+
+
+def test_concurrent_predictions_match_single_ones(service):
+    rides = random_rides(40, 31)
+    expected = [service.predict_rows([ride])[0] for ride in rides]
+
+    async def scenario():
+        return await asyncio.gather(*(service.predict_base_fare_async(ride) for ride in rides))
+
+    assert asyncio.run(scenario()) == expected
+    assert service.batcher.batches < len(rides)
+
+
+def test_batches_use_the_bundle_each_caller_pinned(service, ml_dir):
+    rides = random_rides(8, 32)
+    expected = service.predict_rows(rides)
+    old_version = service.model_version
+    predict_many = service.batcher.predict_many
+
+    async def reload_first(version, items):
+        # A reload lands after the requests pinned the old bundle, before their batch runs
+        train_artifacts(ml_dir, seed=5, fare_scale=4.0)
+        stamp = time.time() + 5
+        os.utime(os.path.join(ml_dir, "preprocessor.pkl"), (stamp, stamp))
+        service.reload_model()
+        assert service.model_version != old_version
+        return await predict_many(version, items)
+
+    service.batcher.predict_many = reload_first
+
+    async def scenario():
+        return await asyncio.gather(*(service.predict_base_fare_async(ride) for ride in rides))
+
+    assert asyncio.run(scenario()) == expected
+    assert service.predict_rows(rides) != expected
@@ -0,0 +1,98 @@
+import asyncio
+import gc
+import os
+import time
+import numpy as np
+import pytest
+
+from app.core import artifact_store
+from app.core.compiled_forest import CompiledForest
+from app.services.ml_service import ModelNotReady
+from conftest import make_service, random_rides, train_artifacts
+
+RIDES = random_rides(50, 21)
+
+
+def _retrain(ml_dir, seed, fare_scale, age=0):
+    """Write new artifacts, stamped `age` seconds into the future (versions have 1 s resolution)."""
+    train_artifacts(ml_dir, seed=seed, fare_scale=fare_scale)
+    stamp = time.time() + age
+    manifest = os.path.join(artifact_store.resolve(os.path.join(ml_dir, "model_arrays")), "manifest.json")
+    for path in (manifest, os.path.join(ml_dir, "preprocessor.pkl")):
+        os.utime(path, (stamp, stamp))
+
+
+@pytest.fixture
+def ml_dir(tmp_path):
+    ml_dir = str(tmp_path / "ml")
+    _retrain(ml_dir, seed=0, fare_scale=1.0)
+    return ml_dir
+
+
+@pytest.fixture
+def service(ml_dir):
+    service = make_service(ml_dir)
+    service.load_model()
+    return service
+
+
+def test_reload_swaps_in_new_artifacts(service, ml_dir):
+    old_version = service.model_version
+    before = service.predict_base_fares(RIDES)
+    assert service.reload_model()["status"] == "unchanged"
+
+    _retrain(ml_dir, seed=1, fare_scale=2.0, age=5)
+    result = service.reload_model()
+    assert result["status"] == "reloaded"
+    assert service.model_version != old_version
+    assert service.model_version == service.artifact_version()
+    after = service.predict_base_fares(RIDES)
+    assert np.allclose(after / before, 2.0, rtol=0.25)
+    assert service.reloads == 1
+
+
+def test_failed_reload_keeps_serving_the_old_model(service, ml_dir):
+    version = service.model_version
+    before = service.predict_base_fares(RIDES)
+    # Arrays that don't fit the preprocessor's output
+    forest = CompiledForest.from_sklearn(train_artifacts(os.path.join(ml_dir, "other"), seed=2))
+    forest.n_features += 1
+    forest.save(os.path.join(ml_dir, "model_arrays"))
+
+    with pytest.raises(RuntimeError):
+        service.reload_model(force=True)
+    assert service.model_version == version
+    assert service.last_reload_error
+    assert np.array_equal(service.predict_base_fares(RIDES), before)
+
+
+def test_requests_finish_on_the_bundle_they_pinned(service, ml_dir):
+    pinned = service.bundle
+    expected = service.predict_rows(RIDES[:5])
+    _retrain(ml_dir, seed=3, fare_scale=3.0, age=5)
+    service.reload_model()
+
+    # The retired version stays reachable while a request holds it
+    assert service.predict_rows(RIDES[:5], model_version=pinned.model_version) == expected
+    old_version = pinned.model_version
+    del pinned
+    gc.collect()
+    with pytest.raises(ModelNotReady):
+        service.predict_rows(RIDES[:5], model_version=old_version)
+
+
+def test_watch_reloads_once_the_files_settle(service, ml_dir):
+    old_version = service.model_version
+
+    async def scenario():
+        watcher = asyncio.ensure_future(service.watch(0.02))
+        await asyncio.sleep(0.05)
+        await asyncio.to_thread(_retrain, ml_dir, 4, 1.5, 5)
+        deadline = time.monotonic() + 10
+        while service.model_version == old_version and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        watcher.cancel()
+
+    asyncio.run(scenario())
+    assert service.model_version != old_version
+    assert service.reloads == 1
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from app.core.ttl_cache import TTLCache
+from conftest import make_service, random_rides
+
+
+class CountingModel:
+    """Wraps the loaded estimator and counts the rows it is asked to predict."""
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = 0
+        self.n_features = model.n_features
+
+    def predict(self, X):
+        self.rows += len(X)
+        return self.model.predict(X)
+
+
+@pytest.fixture
+def service(trained_ml_dir):
+    service = make_service(trained_ml_dir)
+    service.load_model()
+    service.bundle.model = CountingModel(service.bundle.model)
+    return service
+
+
+def test_ttl_cache_lru_and_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.core.ttl_cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    cache.set("d", 4, ttl=None)
+    now[0] += 11
+    assert cache.get("c") is None  # expired
+    assert cache.get("d") == 4  # never expires
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"]) == (2, 1)
+
+
+def test_ttl_cache_size_zero_disables_it():
+    cache = TTLCache(maxsize=0)
+    cache.set("x", 1)
+    assert cache.get("x") is None
+
+
+def test_repeated_ride_is_answered_from_cache(service):
+    ride = random_rides(1, 11)[0]
+    first = service.predict_base_fare(ride)
+    # Same features in another key order, plus fields the model doesn't use
+    again = service.predict_base_fare({"note": "x", **dict(reversed(list(ride.items())))})
+    assert again == first
+    assert service.bundle.model.rows == 1
+    assert service.cache.stats()["hits"] == 1
+
+
+def test_batch_fills_and_uses_the_cache(service):
+    rides = random_rides(20, 12)
+    service.predict_base_fare(rides[0])
+    fares = service.predict_base_fares(rides)
+    assert service.bundle.model.rows == 20
+    assert np.array_equal(service.predict_base_fares(rides), fares)
+    assert service.bundle.model.rows == 20
+    assert [service.predict_base_fare(r) for r in rides] == fares.tolist()
+
+
+def test_distance_step_snaps_the_key_and_the_input(trained_ml_dir):
+    service = make_service(trained_ml_dir, cache_distance_step=0.5)
+    service.load_model()
+    ride = random_rides(1, 13)[0]
+    near = [{**ride, "distance": d} for d in (10.1, 10.2, 9.8)]
+    fares = {service.predict_base_fare(r) for r in near}
+    assert len(fares) == 1
+    assert fares == {service.predict_rows([{**ride, "distance": 10.0}])[0]}
+
+
+def test_each_bundle_has_its_own_cache(service):
+    ride = random_rides(1, 14)[0]
+    service.predict_base_fare(ride)
+    old = service.bundle
+    service.reload_model(force=True)
+    assert service.bundle is not old and len(service.cache) == 0
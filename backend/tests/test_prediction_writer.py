@@ -0,0 +1,109 @@
+import asyncio
+import uuid
+from sqlalchemy import func
+
+from app.database import SessionLocal
+from app.models.prediction import Prediction
+from app.services import prediction_writer as writer_module
+from app.services.prediction_writer import PredictionWriter
+
+
+def _rows(n):
+    tag = uuid.uuid4().hex[:8]
+    return tag, [{"ride_type": "Taxi", "pickup_zone": tag, "final_fare": 10.0 + i} for i in range(n)]
+
+
+def _count(tag):
+    db = SessionLocal()
+    try:
+        return db.query(func.count(Prediction.id)).filter(Prediction.pickup_zone == tag).scalar()
+    finally:
+        db.close()
+
+
+def test_rows_are_written_in_bulk_and_drained_on_stop():
+    writer = PredictionWriter(batch_size=50, flush_interval=10)
+    tag, rows = _rows(120)
+
+    async def scenario():
+        await writer.start()
+        for row in rows:
+            await writer.submit(row)
+        # Two full batches go out without waiting for the interval
+        while writer.rows_written < 100:
+            await asyncio.sleep(0.01)
+        assert writer.flushes == 2
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert _count(tag) == 120
+    assert (writer.rows_written, writer.flushes, writer.running) == (120, 3, False)
+    assert writer.last_prediction_id() >= 120
+
+
+def test_rows_submitted_together_are_written_together():
+    writer = PredictionWriter(batch_size=10, flush_interval=10)
+    tag, rows = _rows(25)
+
+    async def scenario():
+        await writer.start()
+        await writer.submit_many(rows)
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert _count(tag) == 25
+    assert writer.flushes == 1
+
+
+def test_writes_through_without_a_running_writer():
+    writer = PredictionWriter()
+    tag, rows = _rows(3)
+    asyncio.run(writer.submit_many(rows))
+    assert _count(tag) == 3
+
+
+def test_failed_flush_is_counted_and_the_writer_keeps_going(monkeypatch):
+    writer = PredictionWriter(batch_size=5, flush_interval=0.01)
+    calls = []
+    real = writer_module.record_predictions
+
+    def flaky(db, rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        real(db, rows)
+
+    monkeypatch.setattr(writer_module, "record_predictions", flaky)
+    tag, rows = _rows(10)
+
+    async def scenario():
+        await writer.start()
+        await writer.submit_many(rows[:5])
+        while not calls:
+            await asyncio.sleep(0.01)
+        await writer.submit_many(rows[5:])
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert (writer.rows_failed, writer.rows_written) == (5, 5)
+    assert _count(tag) == 5
+
+
+def test_full_queue_applies_backpressure():
+    writer = PredictionWriter(batch_size=1, flush_interval=10, max_queue=2)
+    _, rows = _rows(3)
+
+    async def scenario():
+        writer.queue = asyncio.Queue(maxsize=writer.max_queue)
+        # Pretend the flush loop is stalled on a slow database
+        writer._task = asyncio.get_running_loop().create_future()
+        await writer.submit(rows[0])
+        await writer.submit(rows[1])
+        blocked = asyncio.ensure_future(writer.submit(rows[2]))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        writer.queue.get_nowait()
+        await asyncio.wait_for(blocked, 1)
+        writer._task.cancel()
+
+    asyncio.run(scenario())
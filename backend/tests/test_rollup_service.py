@@ -0,0 +1,139 @@
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.main import app
+from app.models.prediction import Prediction, PredictionRollup
+from app.services import archive_service, rollup_service
+from app.services.prediction_writer import prediction_writer
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_backfill_runs_after_startup(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_ensure(db):
+        started.set()
+        release.wait(10)
+
+    monkeypatch.setattr(rollup_service, "ensure_rollups", slow_ensure)
+    written = prediction_writer.rows_written
+    try:
+        with TestClient(app) as client:
+            # The lifespan has returned (the port would be bound) while the backfill runs
+            assert started.wait(5)
+            assert client.get("/ready").json()["rollups"]["status"] == "running"
+            assert client.get("/api/dashboard/summary").status_code == 503
+            assert client.get("/api/dashboard/demand-trend").status_code == 503
+            assert client.get("/health").status_code == 200
+
+            # Predictions logged meanwhile wait in the queue
+            client.portal.call(prediction_writer.submit, {"ride_type": "Taxi", "final_fare": 100.0})
+            time.sleep(prediction_writer.flush_interval * 2)
+            assert prediction_writer.rows_written == written
+
+            release.set()
+            _wait_for(lambda: client.get("/ready").json()["rollups"]["status"] == "ready")
+            assert client.get("/api/dashboard/summary").status_code == 200
+            _wait_for(lambda: prediction_writer.rows_written == written + 1)
+    finally:
+        release.set()
+
+
+def test_failed_backfill_still_serves(monkeypatch):
+    def broken_ensure(db):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(rollup_service, "ensure_rollups", broken_ensure)
+    with TestClient(app) as client:
+        _wait_for(lambda: client.get("/ready").json()["rollups"]["status"] == "failed")
+        assert client.get("/ready").json()["rollups"]["error"] == "disk full"
+        assert client.get("/api/dashboard/summary").status_code == 200
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _rollups(db):
+    return {
+        (r.day, r.dimension, r.value): (r.count, round(r.fare_sum, 6))
+        for r in db.query(PredictionRollup).all()
+    }
+
+
+def _ride_rows(days=4, per_day=12):
+    start = datetime.utcnow().replace(hour=6, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    return [
+        {
+            "ride_type": ["Taxi", "Bike"][i % 2],
+            "demand_level": ["Low", "Medium", "High"][i % 3],
+            "time_of_day": ["Morning", "Evening", None][i % 3],
+            "final_fare": 50.0 + 3 * i + d,
+            "created_at": start + timedelta(days=d, minutes=i),
+        }
+        for d in range(days) for i in range(per_day)
+    ]
+
+
+def test_incremental_rollups_match_a_rebuild(db):
+    rows = _ride_rows()
+    # Written in several batches, as the prediction writer does
+    for i in range(0, len(rows), 7):
+        rollup_service.record_predictions(db, rows[i:i + 7])
+        db.commit()
+    incremental = _rollups(db)
+
+    assert sum(c for (_, dim, _), (c, _) in incremental.items() if dim == "ride_type") == len(rows)
+    assert rollup_service.rebuild_rollups(db) == len(incremental)
+    assert _rollups(db) == incremental
+    # Missing values are grouped under ""
+    assert any(value == "" for _, dim, value in incremental if dim == "time_of_day")
+
+
+def test_ensure_rollups_backfills_only_when_empty(db):
+    db.execute(insert(Prediction), _ride_rows(days=2))
+    db.commit()
+    assert _rollups(db) == {}
+    rollup_service.ensure_rollups(db)
+    backfilled = _rollups(db)
+    assert backfilled
+
+    rollup_service.record_predictions(db, _ride_rows(days=1, per_day=1))
+    db.commit()
+    rollup_service.ensure_rollups(db)  # already has rollups: no rebuild
+    assert _rollups(db) != backfilled
+
+
+def test_rebuild_keeps_archived_days(db):
+    pytest.importorskip("pyarrow")
+    rollup_service.record_predictions(db, _ride_rows())
+    db.commit()
+    before = _rollups(db)
+
+    # rebuild_rollups reads the configured ARCHIVE_DIR (a temporary folder in tests)
+    try:
+        assert archive_service.archive_predictions(db, 2) > 0
+        rollup_service.rebuild_rollups(db)
+        assert _rollups(db) == before
+    finally:
+        shutil.rmtree(archive_service.ARCHIVE_DIR, ignore_errors=True)
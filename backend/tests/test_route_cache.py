@@ -0,0 +1,51 @@
+import uuid
+import httpx
+import pytest
+
+from benchmarks.stubs import Upstream
+from app.core import http_clients
+from app.services import location_service, route_cache
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    stub = Upstream()
+    monkeypatch.setattr(location_service, "requests", stub)
+    monkeypatch.setattr(http_clients, "_client", httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)))
+    return stub
+
+
+def test_keys_snap_coordinates_and_normalize_names():
+    near = route_cache.route_key("a", "b", (11.0168, 76.9558), (11.0501, 76.9901))
+    assert route_cache.route_key("x", "y", (11.0170, 76.9560), (11.0499, 76.9899)) == near
+    assert route_cache.route_key("a", "b", (11.0268, 76.9558), (11.0501, 76.9901)) != near
+    assert route_cache.route_key("  Gandhipuram ", "RS  Puram") == route_cache.route_key("gandhipuram", "rs puram")
+
+
+def test_seeded_routes_are_pinned():
+    pickup, drop = next(iter(location_service.MOCK_ROUTES))
+    route = route_cache.get(route_cache.route_key(pickup.upper(), drop))
+    assert route == {k: location_service.MOCK_ROUTES[(pickup, drop)][k] for k in ("distance", "duration")}
+    # Callers get a copy
+    route["distance"] = -1
+    assert route_cache.get(route_cache.route_key(pickup, drop))["distance"] != -1
+
+
+def test_nearby_pickups_share_one_upstream_route(upstream):
+    tag = uuid.uuid4().int % 1000 / 1e5
+    start, end = (11.0012 + tag, 76.9512), (11.0431 + tag, 76.9911)
+    route, strategy = location_service._route_data("p", "d", start, end)
+    assert strategy == "osrm"
+    nearby = (start[0] + 0.0004, start[1] - 0.0003)
+    again, strategy = location_service._route_data("p", "d", nearby, end)
+    assert (again, strategy) == (route, "cache")
+    assert upstream.calls["osrm"] == 1
+
+
+def test_failed_routes_are_not_cached(monkeypatch):
+    stub = Upstream(failure_rate=1.0)
+    monkeypatch.setattr(location_service, "requests", stub)
+    start, end = (11.1, 76.9), (11.2, 77.0)
+    _, strategy = location_service._route_data("p", "d", start, end)
+    assert strategy == "default"
+    assert route_cache.get(route_cache.route_key("p", "d", start, end)) is None
@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+import httpx
+import pytest
+
+from app.core import http_clients
+from app.routes import smart_predict
+from app.services import weather_service
+
+
+def _serve(monkeypatch, status, body):
+    def handle(request):
+        return httpx.Response(status, json=body)
+
+    monkeypatch.setattr(weather_service, "API_KEY", "test")
+    monkeypatch.setattr(http_clients, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+    monkeypatch.setattr(weather_service, "requests", httpx.Client(transport=httpx.MockTransport(handle)))
+
+
+def _city():
+    return f"city {uuid.uuid4().hex[:8]}"
+
+
+@pytest.mark.parametrize("status, body, expected", [
+    (200, {"weather": [{"main": "Rain"}]}, ("Rainy", False)),
+    (200, {"weather": [{"main": "Haze"}]}, ("Foggy", False)),
+    (200, {"weather": [{"main": "Clear"}]}, ("Clear", False)),
+    (200, {"weather": [{"main": "Smoke"}]}, ("Clear", True)),
+    (503, {"error": "down"}, ("Clear", True)),
+    (200, {"unexpected": "shape"}, ("Clear", True)),
+])
+def test_fallback_flag(monkeypatch, status, body, expected):
+    _serve(monkeypatch, status, body)
+    city = _city()
+    assert asyncio.run(weather_service.get_real_weather_async(location=city)) == expected
+    # Cached answers keep the flag
+    assert asyncio.run(weather_service.get_real_weather_async(location=city)) == expected
+    assert weather_service.lookup_weather(location=_city()) == expected
+    assert weather_service.get_real_weather(location=_city()) == expected[0]
+
+
+def test_no_api_key_is_a_fallback(monkeypatch):
+    monkeypatch.setattr(weather_service, "API_KEY", "your_key_here")
+    assert asyncio.run(weather_service.get_real_weather_async(location=_city())) == ("Clear", True)
+
+
+@pytest.mark.parametrize("status, body, reported", [
+    (503, {"error": "down"}, True),
+    (200, {"weather": [{"main": "Rain"}]}, False),
+])
+def test_smart_predict_reports_weather_fallback(monkeypatch, status, body, reported):
+    _serve(monkeypatch, status, body)
+
+    async def route(*args):
+        return {"distance": 5.0, "duration": 12.0}
+
+    async def fare(ride):
+        return 100.0
+
+    monkeypatch.setattr(smart_predict, "get_route_data_async", route)
+    monkeypatch.setattr(smart_predict.ml_service, "predict_base_fare_async", fare)
+    request = smart_predict.SmartPredictRequest(pickup=_city(), drop="Airport", ride_type="Taxi")
+    response = asyncio.run(smart_predict.smart_predict(request))
+    assert ("weather" in response["fallbacks"]) is reported
+    assert response["fallbacks"] == (["weather"] if reported else [])
+
+
+def test_concurrent_misses_share_one_fetch(monkeypatch):
+    calls = []
+
+    async def handle(request):
+        calls.append(request.url)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"weather": [{"main": "Drizzle"}]})
+
+    monkeypatch.setattr(weather_service, "API_KEY", "test")
+    monkeypatch.setattr(http_clients, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+
+    async def burst():
+        # Points in the same 0.1 degree cell
+        lookups = [weather_service.get_real_weather_async(lat=11.01 + i * 0.001, lon=76.95) for i in range(20)]
+        return await asyncio.gather(*lookups)
+
+    assert asyncio.run(burst()) == [("Rainy", False)] * 20
+    assert len(calls) == 1
+    assert weather_service.stats()["inflight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_fetch(monkeypatch):
+    async def handle(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"weather": [{"main": "Clear"}]})
+
+    monkeypatch.setattr(weather_service, "API_KEY", "test")
+    monkeypatch.setattr(http_clients, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+    city = _city()
+
+    async def scenario():
+        first = asyncio.ensure_future(weather_service.get_real_weather_async(location=city))
+        second = asyncio.ensure_future(weather_service.get_real_weather_async(location=city))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == ("Clear", False)
@@ -45,17 +45,14 @@ const Dashboard = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [demandRes, timeRes, rideRes, metricsRes] = await Promise.all([
-          fetch(getApiUrl("/api/dashboard/demand-trend")),
-          fetch(getApiUrl("/api/dashboard/time-price")),
-          fetch(getApiUrl("/api/dashboard/ride-distribution")),
-          fetch(getApiUrl("/api/dashboard/model-metrics"))
-        ]);
+        // One request; the browser revalidates with the ETag and gets a 304 when nothing changed
+        const res = await fetch(getApiUrl("/api/dashboard/summary"));
+        const summary = await res.json();
 
-        const demand = await demandRes.json();
-        const time = await timeRes.json();
-        const ride = await rideRes.json();
-        const modelMetrics = await metricsRes.json();
+        const demand = summary.demand_trend;
+        const time = summary.time_price;
+        const ride = summary.ride_distribution;
+        const modelMetrics = summary.model_metrics;
 
         // Transform data for charts
         setDemandData(demand.map((d: any) => ({ demand: d.demand_level, fare: d.avg_fare })));